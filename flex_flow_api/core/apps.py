@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.core import checks
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import db_router
+        checks.register(db_router.check_sticky_cache, checks.Tags.caches)
+        from core import slow_queries
+        connection_created.connect(
+            slow_queries.install,
+            dispatch_uid='core.slow_queries.install',
+        )
+        from django.contrib.auth import get_user_model
+        from core import sharding
+        from core.models import Workflow
+        pre_save.connect(sharding.assign_shard, sender=Workflow)
+        post_save.connect(sharding.copy_workflow, sender=Workflow)
+        post_delete.connect(sharding.delete_workflow, sender=Workflow)
+        post_save.connect(sharding.copy_user, sender=get_user_model())
@@ -0,0 +1,36 @@
+"""
+Compressed JSON blobs.
+
+``pack`` serializes a JSON value and compresses it with one of ``CODECS``,
+``unpack`` reverses it. Used for the archived part of the history
+timelines, which is rarely read and compresses well.
+"""
+import json
+import lzma
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+CODECS = {
+    'zlib': (lambda data: zlib.compress(data, 9), zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+
+def dumps(value):
+    """The compact UTF-8 JSON ``pack`` compresses"""
+    return json.dumps(
+        value, cls=DjangoJSONEncoder, separators=(',', ':')
+    ).encode()
+
+
+def pack(value, codec='zlib'):
+    compress, _ = CODECS[codec]
+    return compress(dumps(value))
+
+
+def unpack(data, codec):
+    if data is None:
+        return None
+    _, decompress = CODECS[codec]
+    return json.loads(decompress(bytes(data)))
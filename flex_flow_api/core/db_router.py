@@ -0,0 +1,82 @@
+"""
+Routing of reads to database replicas.
+
+Reads only go to a replica while ``ReplicaRoutingMiddleware`` has marked
+the current request as replica-safe: a GET/HEAD/OPTIONS request from a
+client that did not write in the last ``REPLICA_STICKY_SECONDS``. Writes,
+reads inside a transaction on the primary and everything outside such a
+request (management commands, the webhook dispatcher, ...) use
+``default``.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+def replicas_enabled():
+    return _use_replica.get()
+
+
+def enable_replicas():
+    """Allow replica reads in the current context, returns a reset token"""
+    return _use_replica.set(bool(settings.DATABASE_REPLICAS))
+
+
+def reset(token):
+    _use_replica.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Read from the primary inside this block, e.g. right after a write"""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or \
+                connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def check_sticky_cache(app_configs=None, **kwargs):
+    """Replicas need a sticky cache shared by every worker"""
+    if not settings.DATABASE_REPLICAS:
+        return []
+    alias = settings.REPLICA_STICKY_CACHE_ALIAS
+    if isinstance(caches[alias], (LocMemCache, DummyCache)):
+        return [checks.Error(
+            f'REPLICA_STICKY_CACHE_ALIAS {alias!r} is not shared between '
+            f'processes, clients would not read their own writes.',
+            hint='Point it at a memcached, redis or database cache.',
+            id='core.E001',
+        )]
+    return []
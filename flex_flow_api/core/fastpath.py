@@ -0,0 +1,97 @@
+"""
+Read-only fast path for the hot list endpoints.
+
+A ``ValuesSerializer`` renders the dicts of ``QuerySet.values()`` instead
+of model instances: no instance is built per row and no serializer field
+runs ``to_representation``. The output key to ``values()`` lookup mapping
+is computed once per serializer. Only fields whose database value is
+already their JSON representation (ids, text, numbers, booleans) can be
+served this way; the lists using it must render exactly what their
+``ModelSerializer`` does.
+
+``ValuesListMixin`` serves a viewset's list through its
+``values_serializer_class`` and falls back to the regular serializer for
+``?expand=``, which needs the related objects.
+"""
+from rest_framework.exceptions import ParseError
+from rest_framework.response import Response
+
+from core.fieldsets import EXPAND_PARAM, FIELDS_PARAM, _parse_param
+
+
+class ValuesSerializer:
+    """
+    Serializer-like renderer of ``values()`` rows.
+
+    ``fields`` lists the output keys in order, ``sources`` maps the keys
+    read from another lookup, e.g. ``{'n_to': 'n_to_id'}``.
+    """
+    fields = ()
+    sources = {}
+
+    def __init__(self, instance=None, many=False, context=None,
+                 fields=None):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+        if fields is not None:
+            unknown = set(fields) - set(self.fields)
+            if unknown:
+                raise ParseError(
+                    f"Unknown fields: {', '.join(sorted(unknown))}"
+                )
+            # keep the declared order
+            fields = [name for name in self.fields if name in fields]
+        else:
+            fields = list(self.fields)
+        self.mapping = [
+            (name, self.sources.get(name, name)) for name in fields
+        ]
+        self.lookups = [lookup for _, lookup in self.mapping]
+        self.renamed = any(name != lookup for name, lookup in self.mapping)
+
+    def values(self, queryset):
+        """``queryset`` as the rows ``to_representation`` renders"""
+        lookups = self.lookups
+        if 'id' not in lookups:
+            # the cursor pagination reads it
+            lookups = [*lookups, 'id']
+        return queryset.values(*lookups)
+
+    def to_representation(self, row):
+        if not self.renamed and len(row) == len(self.mapping):
+            return row
+        return {name: row[lookup] for name, lookup in self.mapping}
+
+    @property
+    def data(self):
+        if self.many:
+            return [self.to_representation(row) for row in self.instance]
+        return self.to_representation(self.instance)
+
+
+class ValuesListMixin:
+    """List through ``values_serializer_class`` when nothing is expanded"""
+    values_serializer_class = None
+
+    def get_values_serializer(self, *args, **kwargs):
+        return self.values_serializer_class(
+            *args,
+            context=self.get_serializer_context(),
+            fields=_parse_param(self.request, FIELDS_PARAM),
+            **kwargs,
+        )
+
+    def list(self, request, *args, **kwargs):
+        if self.values_serializer_class is None or \
+                _parse_param(request, EXPAND_PARAM):
+            return super().list(request, *args, **kwargs)
+        queryset = self.get_values_serializer().values(
+            self.filter_queryset(self.get_queryset())
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_values_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_values_serializer(queryset, many=True)
+        return Response(serializer.data)
@@ -0,0 +1,103 @@
+"""
+Sparse fieldsets (``?fields=``) and embedded expansions (``?expand=``).
+
+Serializers using ``SparseFieldsMixin`` drop the fields a read request did
+not ask for and swap expandable relations for nested serializers. Views
+using ``SparseFieldsViewMixin`` restrict the queryset to the columns those
+fields need and fetch expansions with ``select_related`` or
+``prefetch_related`` instead of per-row lookups.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _parse_param(request, name):
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin honoring ``?fields=`` and ``?expand=``.
+
+    ``expandable_fields`` maps a field name to ``(serializer_class,
+    kwargs)`` used to render the related objects in place of their ids.
+    """
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = _parse_param(request, FIELDS_PARAM)
+        expand = _parse_param(request, EXPAND_PARAM) or set()
+        unknown = (expand - set(self.expandable_fields))
+        if fields is not None:
+            unknown |= fields - set(self.fields)
+        if unknown:
+            raise ParseError(
+                f"Unknown fields: {', '.join(sorted(unknown))}"
+            )
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+        for name in expand:
+            if name not in self.fields:
+                continue
+            serializer_class, field_kwargs = self.expandable_fields[name]
+            self.fields[name] = serializer_class(
+                read_only=True,
+                **field_kwargs,
+            )
+
+
+class SparseFieldsViewMixin:
+    """View mixin loading only what the sparse serializer renders"""
+
+    def get_requested_fields(self):
+        return _parse_param(self.request, FIELDS_PARAM)
+
+    def get_requested_expansions(self):
+        return _parse_param(self.request, EXPAND_PARAM) or set()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        fields = self.get_requested_fields()
+        expand = self.get_requested_expansions()
+        if fields is None and not expand:
+            return queryset
+        if not issubclass(self.get_serializer_class(), SparseFieldsMixin):
+            return queryset
+        serializer = self.get_serializer()
+        model = queryset.model
+        columns = {model._meta.pk.name}
+        prefetched = {
+            getattr(lookup, 'prefetch_to', lookup)
+            for lookup in queryset._prefetch_related_lookups
+        }
+        for name, field in serializer.fields.items():
+            source = field.source.split('.')[0]
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete:
+                columns.add(model_field.name)
+            if name not in expand:
+                continue
+            if model_field.many_to_one or model_field.one_to_one:
+                queryset = queryset.select_related(source)
+            elif source not in prefetched:
+                queryset = queryset.prefetch_related(source)
+        if fields is not None:
+            queryset = queryset.only(*columns)
+        return queryset
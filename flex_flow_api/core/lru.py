@@ -0,0 +1,85 @@
+"""
+Bounded, thread safe LRU cache with optional per-entry time to live.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Least recently used cache keeping at most ``maxsize`` entries"""
+
+    def __init__(self, maxsize=1024, ttl=None, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key, default=None, count=True):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                value, expires = item
+                if expires is not None and expires <= self._timer():
+                    del self._data[key]
+                    item = _MISSING
+            if item is _MISSING:
+                if count:
+                    self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            if count:
+                self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=_MISSING):
+        if ttl is _MISSING:
+            ttl = self.ttl
+        expires = None if ttl is None else self._timer() + ttl
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            return self._data.pop(key, _MISSING) is not _MISSING
+
+    def discard_if(self, predicate):
+        """Drop every entry for which ``predicate(key, value)`` is true"""
+        with self._lock:
+            keys = [
+                key for key, (value, _) in self._data.items()
+                if predicate(key, value)
+            ]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
@@ -0,0 +1,132 @@
+"""
+Django command to load test a running API server
+"""
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response, return its status code"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('Connection closed by server')
+    status = int(status_line.split()[1])
+    length = 0
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status
+
+
+async def _worker(host, port, request, count, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_benchmark(url, requests, concurrency, headers):
+    """Send ``requests`` GETs over ``concurrency`` keep-alive connections"""
+    parts = urlsplit(url)
+    path = parts.path or '/'
+    if parts.query:
+        path = f'{path}?{parts.query}'
+    lines = [f'GET {path} HTTP/1.1', f'Host: {parts.netloc}']
+    lines += [f'{name}: {value}' for name, value in headers.items()]
+    request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    latencies = []
+    statuses = {}
+    per_worker, extra = divmod(requests, concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(
+            parts.hostname,
+            parts.port or 80,
+            request,
+            per_worker + (1 if index < extra else 0),
+            latencies,
+            statuses,
+        )
+        for index in range(concurrency)
+    ))
+    return time.perf_counter() - start, latencies, statuses
+
+
+class Command(BaseCommand):
+    help = 'Measure throughput and latency of a GET endpoint, e.g. to ' \
+           'compare WSGI and ASGI deployments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='http:// URL to request')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument(
+            '--token',
+            default=None,
+            help='Sent as "Authorization: Token <token>"',
+        )
+        parser.add_argument(
+            '--header',
+            action='append',
+            default=[],
+            help='Extra "Name: value" header, can be repeated',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if urlsplit(options['url']).scheme != 'http':
+            raise CommandError('Only http:// URLs are supported')
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be >= 1')
+        headers = {'Connection': 'keep-alive'}
+        if options['token']:
+            headers['Authorization'] = f"Token {options['token']}"
+        for header in options['header']:
+            name, _, value = header.partition(':')
+            headers[name.strip()] = value.strip()
+        elapsed, latencies, statuses = asyncio.run(run_benchmark(
+            options['url'],
+            options['requests'],
+            min(options['concurrency'], options['requests']),
+            headers,
+        ))
+        latencies.sort()
+        self.stdout.write(
+            f'{len(latencies)} requests in {elapsed:.2f}s, '
+            f'{len(latencies) / elapsed:.1f} req/s'
+        )
+        self.stdout.write(
+            f'latency ms: mean {statistics.mean(latencies) * 1000:.1f} '
+            f'p50 {latencies[len(latencies) // 2] * 1000:.1f} '
+            f'p99 {latencies[int(len(latencies) * 0.99)] * 1000:.1f}'
+        )
+        self.stdout.write('status codes: ' + ', '.join(
+            f'{code}={count}' for code, count in sorted(statuses.items())
+        ))
@@ -0,0 +1,22 @@
+"""
+Django command to pre-generate the OpenAPI schema served at /api/schema/
+"""
+from django.core.management.base import BaseCommand
+
+from core.schema import write_schema
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema artifact served by the API'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=None,
+            help='File to write, defaults to OPENAPI_SCHEMA_FILE',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        path = write_schema(options['file'])
+        self.stdout.write(self.style.SUCCESS(f'Schema written to {path}'))
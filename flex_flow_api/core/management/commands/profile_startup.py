@@ -0,0 +1,79 @@
+"""
+Django command to report where worker startup time goes
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.startup import by_package, parse_importtime
+
+
+class Command(BaseCommand):
+    help = 'Profile imports, app ready() and the first request of a ' \
+           'fresh worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default='/metrics',
+            help='Path of the first request',
+        )
+        parser.add_argument(
+            '--depth',
+            type=int,
+            default=1,
+            help='Package components imports are grouped by, '
+                 '0 lists single modules',
+        )
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'core.startup',
+             '--path', options['path']],
+            cwd=settings.BASE_DIR,
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+        report = json.loads(result.stdout)
+        modules = parse_importtime(result.stderr.splitlines())
+        limit = options['limit']
+
+        self.stdout.write(
+            f"Time to first request: {report['total'] * 1000:.1f} ms "
+            f"(GET {options['path']} -> {report['status']}, "
+            f"{report['modules']} modules loaded)"
+        )
+        for name, seconds in report['phases'].items():
+            self.stdout.write(f'  {name:<30} {seconds * 1000:9.1f} ms')
+        self.stdout.write('\nAppConfig.ready():')
+        ready = sorted(report['ready'].items(), key=lambda item: -item[1])
+        for label, seconds in ready[:limit]:
+            self.stdout.write(f'  {label:<30} {seconds * 1000:9.1f} ms')
+
+        self.stdout.write(
+            f'\nImports ({len(modules)} modules, '
+            f'{sum(row[1] for row in modules) / 1000:.1f} ms):'
+        )
+        if options['depth']:
+            rows = by_package(modules, options['depth'])
+            for package, self_us, count in rows[:limit]:
+                self.stdout.write(
+                    f'  {package:<40} {self_us / 1000:9.1f} ms '
+                    f'{count:5} modules'
+                )
+        else:
+            rows = sorted(modules, key=lambda row: -row[2])
+            for module, self_us, cumulative_us in rows[:limit]:
+                self.stdout.write(
+                    f'  {module:<50} {self_us / 1000:9.1f} ms self '
+                    f'{cumulative_us / 1000:9.1f} ms cumulative'
+                )
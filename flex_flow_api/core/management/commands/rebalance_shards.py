@@ -0,0 +1,58 @@
+"""
+Django command to prepare the workflow shards and move workflows between
+them
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core import sharding
+from core.models import Workflow
+
+
+class Command(BaseCommand):
+    help = 'Show, prepare or rebalance the workflow shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prepare',
+            action='store_true',
+            help='Copy users to the shards and set their id ranges',
+        )
+        parser.add_argument(
+            '--workflow',
+            type=int,
+            help='Id of the workflow to move',
+        )
+        parser.add_argument(
+            '--to',
+            help='Alias of the shard to move the workflow to',
+        )
+        parser.add_argument(
+            '--grace',
+            type=float,
+            default=None,
+            help='Seconds to wait for every process to see the move, '
+                 'defaults to SHARD_MAP_CACHE_TTL',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if not sharding.sharding_enabled():
+            raise CommandError('DATABASE_SHARDS is not configured')
+        if options['prepare']:
+            sharding.prepare_shards()
+            self.stdout.write(self.style.SUCCESS('Shards prepared'))
+        if options['workflow'] is not None:
+            if not options['to']:
+                raise CommandError('--to is required with --workflow')
+            try:
+                sharding.move_workflow(
+                    options['workflow'],
+                    options['to'],
+                    grace=options['grace'],
+                    log=self.stdout.write,
+                )
+            except (ValueError, Workflow.DoesNotExist) as exc:
+                raise CommandError(exc)
+            return
+        for alias, count in sharding.shard_counts().items():
+            self.stdout.write(f'{alias}: {count} workflows')
@@ -0,0 +1,44 @@
+"""
+Django command to summarize the slow query log
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.slow_queries import read_entries, summarize
+
+
+class Command(BaseCommand):
+    help = 'Show the slowest queries by total time from the slow query log'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=None,
+            help='Log file to read, defaults to SLOW_QUERY_LOG_FILE',
+        )
+        parser.add_argument(
+            '--by',
+            choices=['sql', 'location'],
+            default='sql',
+            help='Group by normalized SQL or by the issuing project line',
+        )
+        parser.add_argument('--limit', type=int, default=10)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        path = options['file'] or str(settings.SLOW_QUERY_LOG_FILE)
+        groups = summarize(read_entries(path), group_by=options['by'])
+        if not groups:
+            self.stdout.write('No slow queries recorded')
+            return
+        self.stdout.write(
+            f"{'total ms':>12} {'count':>7} {'avg ms':>10} {'max ms':>10}"
+            f"  {options['by']}"
+        )
+        for group in groups[:options['limit']]:
+            average = group['total_ms'] / group['count']
+            self.stdout.write(
+                f"{group['total_ms']:>12.1f} {group['count']:>7}"
+                f" {average:>10.1f} {group['max_ms']:>10.1f}"
+                f"  {group['key']}"
+            )
@@ -0,0 +1,347 @@
+"""
+In-process metrics registry exposed in the Prometheus text format.
+
+Every worker keeps its own counters and histograms in memory. When
+``METRICS_MULTIPROC_DIR`` is set each worker also dumps a snapshot of its
+values into that directory, and the ``/metrics`` view merges the snapshots
+of all workers so a single scrape sees the whole deployment. Snapshots
+named after the pid of a process that is gone are removed when scraped.
+"""
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # alive, owned by another user
+        return True
+    return True
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    body = ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n')
+        )
+        for name, value in pairs
+    )
+    return '{' + body + '}'
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'{self.name} expects labels {self.labelnames}'
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError('Counters can only be incremented')
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {key: value for key, value in self._values.items()}
+
+    @staticmethod
+    def merge(into, values):
+        for key, value in values.items():
+            into[key] = into.get(key, 0) + value
+
+    def samples(self, values):
+        for key in sorted(values):
+            yield self.name, list(zip(self.labelnames, key)), values[key]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Counter):
+    """Fixed-bucket histogram, stores per-bucket counts plus sum and count"""
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def inc(self, amount=1, **labels):
+        raise TypeError('Use observe() on histograms')
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # one slot per bucket, then +Inf, sum
+                state = [0] * (len(self.buckets) + 1) + [0.0]
+                self._values[key] = state
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[index] += 1
+                    break
+            else:
+                state[len(self.buckets)] += 1
+            state[-1] += value
+
+    def value(self, **labels):
+        state = self._values.get(self._key(labels))
+        if state is None:
+            return 0
+        return sum(state[:-1])
+
+    def snapshot(self):
+        with self._lock:
+            return {key: list(state) for key, state in self._values.items()}
+
+    @staticmethod
+    def merge(into, values):
+        for key, state in values.items():
+            current = into.get(key)
+            if current is None:
+                into[key] = list(state)
+            else:
+                into[key] = [a + b for a, b in zip(current, state)]
+
+    def samples(self, values):
+        for key in sorted(values):
+            state = values[key]
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            bounds = self.buckets + (float('inf'),)
+            for bound, count in zip(bounds, state[:-1]):
+                cumulative += count
+                yield (
+                    f'{self.name}_bucket',
+                    labels + [('le', _format_value(bound))],
+                    cumulative,
+                )
+            yield f'{self.name}_sum', labels, state[-1]
+            yield f'{self.name}_count', labels, cumulative
+
+
+class Registry:
+    """Collection of metrics that can be rendered or shared between workers"""
+
+    def __init__(self, multiproc_dir=None, flush_interval=1.0,
+                 worker_id=None):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self.multiproc_dir = multiproc_dir
+        self.worker_id = worker_id
+        self.flush_interval = flush_interval
+        self._last_flush = 0.0
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(),
+                  buckets=DEFAULT_BUCKETS):
+        return self._register(
+            Histogram(name, documentation, labelnames, buckets)
+        )
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def reset(self):
+        for metric in self._metrics.values():
+            metric.reset()
+
+    def _get_multiproc_dir(self):
+        if self.multiproc_dir is not None:
+            return self.multiproc_dir
+        return getattr(settings, 'METRICS_MULTIPROC_DIR', None)
+
+    def _snapshot_path(self, directory):
+        worker_id = self.worker_id or os.getpid()
+        return os.path.join(directory, f'metrics_{worker_id}.json')
+
+    def needs_flush(self):
+        return bool(self._get_multiproc_dir()) and \
+            time.monotonic() - self._last_flush >= self.flush_interval
+
+    def flush(self, force=False):
+        """Write this worker's values to the shared directory, if any"""
+        directory = self._get_multiproc_dir()
+        if not directory:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        data = {
+            name: [
+                [list(key), value]
+                for key, value in metric.snapshot().items()
+            ]
+            for name, metric in self._metrics.items()
+        }
+        os.makedirs(directory, exist_ok=True)
+        path = self._snapshot_path(directory)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as fp:
+            json.dump(data, fp)
+        os.replace(tmp_path, path)
+
+    def collect(self):
+        """Return merged values of this worker and every other worker"""
+        merged = {
+            name: metric.snapshot() for name, metric in self._metrics.items()
+        }
+        directory = self._get_multiproc_dir()
+        if not directory or not os.path.isdir(directory):
+            return merged
+        own_path = self._snapshot_path(directory)
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            if not filename.endswith('.json') or path == own_path:
+                continue
+            worker_id = filename[len('metrics_'):-len('.json')]
+            if worker_id.isdigit() and not _pid_alive(int(worker_id)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as fp:
+                    data = json.load(fp)
+            except (OSError, ValueError):
+                continue
+            for name, rows in data.items():
+                metric = self._metrics.get(name)
+                if metric is None:
+                    continue
+                metric.merge(
+                    merged[name],
+                    {tuple(key): value for key, value in rows},
+                )
+        return merged
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        merged = self.collect()
+        lines = []
+        for name in sorted(self._metrics):
+            metric = self._metrics[name]
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.type_name}')
+            for sample, labels, value in metric.samples(merged[name]):
+                lines.append(
+                    f'{sample}{_format_labels(labels)} {_format_value(value)}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_requests_total = registry.counter(
+    'flexflow_http_requests_total',
+    'Total HTTP requests by view, method and status code.',
+    ['view', 'method', 'status'],
+)
+http_request_duration_seconds = registry.histogram(
+    'flexflow_http_request_duration_seconds',
+    'HTTP request latency by view.',
+    ['view', 'method'],
+)
+http_exceptions_total = registry.counter(
+    'flexflow_http_exceptions_total',
+    'Unhandled exceptions raised by views.',
+    ['view', 'exception'],
+)
+db_queries_total = registry.counter(
+    'flexflow_db_queries_total',
+    'Database queries executed while handling requests.',
+    ['view'],
+)
+db_query_duration_seconds = registry.histogram(
+    'flexflow_db_query_duration_seconds',
+    'Time spent in the database per request.',
+    ['view'],
+)
+messages_created_total = registry.counter(
+    'flexflow_messages_created_total',
+    'Messages submitted to a workflow.',
+)
+transitions_total = registry.counter(
+    'flexflow_transitions_total',
+    'Message holder transitions by outcome.',
+    ['outcome'],
+)
+holders_created_total = registry.counter(
+    'flexflow_holders_created_total',
+    'Pending message holders fanned out to nodes.',
+)
+join_arrivals_total = registry.counter(
+    'flexflow_join_arrivals_total',
+    'Branches reaching a join node, by whether they released the message.',
+    ['outcome'],
+)
+token_cache_lookups_total = registry.counter(
+    'flexflow_token_cache_lookups_total',
+    'Token authentication cache lookups by result.',
+    ['result'],
+)
+graph_cache_lookups_total = registry.counter(
+    'flexflow_graph_cache_lookups_total',
+    'Graph response cache lookups by result.',
+    ['result'],
+)
+events_published_total = registry.counter(
+    'flexflow_events_published_total',
+    'Message holder events published to event streams.',
+    ['event'],
+)
@@ -1,18 +1,284 @@
+import asyncio
+import hashlib
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
 from django.db.utils import IntegrityError
-from django.http import HttpResponse
-from rest_framework.status import HTTP_400_BAD_REQUEST
+from django.http import HttpResponse, JsonResponse
+from django.urls import Resolver404, get_resolver
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
 
+from core import db_router, metrics, sharding
+from history import audit
 
-class IntegrityMiddleware:
-    def __init__(self, get_response):
-        self.get_response = get_response
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
 
-    def __call__(self, request):
-        return self.get_response(request)
 
+class IntegrityMiddleware(MiddlewareMixin):
     def process_exception(self, request, exception):
         if isinstance(exception, IntegrityError):
             return HttpResponse(
                 content=str(exception),
                 status=HTTP_400_BAD_REQUEST,
             )
+
+
+class _QueryCounter:
+    """Execute wrapper counting queries and time spent in the database"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class MetricsMiddleware:
+    """
+    Record per-view request counts, latency and database usage.
+
+    Works in both sync and async stacks. Async views run their queries in
+    worker threads with their own connections, so database usage is only
+    counted for sync requests.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # mark this instance as a coroutine function for Django
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        queries = _QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            # replicas and shards included
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(queries)
+                )
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start, queries)
+        metrics.registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        # checked here, the file is only written once a flush is due
+        if metrics.registry.needs_flush():
+            await sync_to_async(metrics.registry.flush)()
+        return response
+
+    def _record(self, request, response, duration, queries=None):
+        view = self._view_name(request)
+        metrics.http_requests_total.inc(
+            view=view,
+            method=request.method,
+            status=response.status_code,
+        )
+        metrics.http_request_duration_seconds.observe(
+            duration,
+            view=view,
+            method=request.method,
+        )
+        if queries is not None:
+            metrics.db_queries_total.inc(queries.count, view=view)
+            metrics.db_query_duration_seconds.observe(
+                queries.duration,
+                view=view,
+            )
+
+    def process_exception(self, request, exception):
+        metrics.http_exceptions_total.inc(
+            view=self._view_name(request),
+            exception=type(exception).__name__,
+        )
+
+    @staticmethod
+    def _view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.view_name or match._func_path
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let safe requests read from the database replicas. A client that
+    sent a write is pinned to the primary for ``REPLICA_STICKY_SECONDS``
+    so it reads its own writes, clients are told apart by a hash of their
+    credentials.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # mark this instance as a coroutine function for Django
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        token = self._route(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                db_router.reset(token)
+        self._remember_write(request)
+        return response
+
+    async def __acall__(self, request):
+        token = self._route(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                db_router.reset(token)
+        self._remember_write(request)
+        return response
+
+    @staticmethod
+    def _sticky_key(request):
+        credentials = request.META.get('HTTP_AUTHORIZATION') or \
+            request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not credentials:
+            return None
+        digest = hashlib.sha1(credentials.encode()).hexdigest()
+        return f'replica-sticky:{digest}'
+
+    def _route(self, request):
+        if not settings.DATABASE_REPLICAS or \
+                request.method not in SAFE_METHODS:
+            return None
+        key = self._sticky_key(request)
+        if key is not None and \
+                caches[settings.REPLICA_STICKY_CACHE_ALIAS].get(key):
+            return None
+        return db_router.enable_replicas()
+
+    def _remember_write(self, request):
+        if not settings.DATABASE_REPLICAS or request.method in SAFE_METHODS:
+            return
+        key = self._sticky_key(request)
+        if key is not None:
+            caches[settings.REPLICA_STICKY_CACHE_ALIAS].set(
+                key, 1, settings.REPLICA_STICKY_SECONDS
+            )
+
+
+class ShardRoutingMiddleware:
+    """
+    Route the sharded models of a request to the shard of the workflow in
+    its URL, the ``workflow_pk`` kwarg unless the view names another in
+    ``shard_kwarg``. Writes to a workflow being moved between shards are
+    answered with 503 until the move finishes.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # mark this instance as a coroutine function for Django
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        placement = self._placement(request)
+        if placement is None:
+            return self.get_response(request)
+        if placement[1] and request.method not in SAFE_METHODS:
+            return self._moving()
+        with sharding.use_shard(placement[0]):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        placement = await sync_to_async(self._placement)(request)
+        if placement is None:
+            return await self.get_response(request)
+        if placement[1] and request.method not in SAFE_METHODS:
+            return self._moving()
+        with sharding.use_shard(placement[0]):
+            return await self.get_response(request)
+
+    @staticmethod
+    def _placement(request):
+        if not sharding.sharding_enabled():
+            return None
+        try:
+            match = get_resolver(
+                getattr(request, 'urlconf', None)
+            ).resolve(request.path_info)
+        except Resolver404:
+            return None
+        view_class = getattr(match.func, 'cls', None)
+        workflow_pk = match.kwargs.get(
+            getattr(view_class, 'shard_kwarg', 'workflow_pk')
+        )
+        if workflow_pk is None:
+            return None
+        return sharding.lookup_workflow(workflow_pk)
+
+    @staticmethod
+    def _moving():
+        response = JsonResponse(
+            {'detail': 'Workflow is being moved, retry shortly.'},
+            status=HTTP_503_SERVICE_UNAVAILABLE,
+        )
+        response['Retry-After'] = str(settings.SHARD_MAP_CACHE_TTL)
+        return response
+
+
+class AuditMiddleware:
+    """
+    Write the audit entries of the workflow definition changes made by a
+    request with one insert once its response is ready, see
+    ``history.audit``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # mark this instance as a coroutine function for Django
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        with audit.buffered() as buffer:
+            response = self.get_response(request)
+        buffer.flush(getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        with audit.buffered() as buffer:
+            response = await self.get_response(request)
+        if buffer.entries:
+            await sync_to_async(buffer.flush)(getattr(request, 'user', None))
+        return response
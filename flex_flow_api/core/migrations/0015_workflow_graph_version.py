@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflow',
+            name='graph_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workflow',
+            name='shard',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='workflow',
+            name='shard_moving',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+from django.utils.dateparse import parse_datetime
+
+
+def backfill(apps, schema_editor):
+    """Fill workflow, times and actors of the existing histories"""
+    db = schema_editor.connection.alias
+    History = apps.get_model('core', 'History')
+    HistoryActor = apps.get_model('core', 'HistoryActor')
+    MessageHolder = apps.get_model('core', 'MessageHolder')
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    User = apps.get_model('core', 'User')
+    message_type = ContentType.objects.using(db).filter(
+        app_label='core', model='message'
+    ).first()
+    if message_type is None:
+        return
+    user_ids = set(User.objects.using(db).values_list('id', flat=True))
+    histories = History.objects.using(db).filter(content_type=message_type)
+    for history in histories.iterator():
+        history.workflow_id = MessageHolder.objects.using(db).filter(
+            message_id=history.object_id
+        ).values_list('current_node__workflow_id', flat=True).first()
+        times = [
+            parse_datetime(entry['timestamp'])
+            for entry in history.histories
+            if isinstance(entry, dict) and entry.get('timestamp')
+        ]
+        times = [time for time in times if time is not None]
+        if times:
+            history.created_at, history.updated_at = min(times), max(times)
+        history.save(update_fields=['workflow', 'created_at', 'updated_at'])
+        HistoryActor.objects.using(db).bulk_create([
+            HistoryActor(history_id=history.id, user_id=user_id)
+            for user_id in {
+                entry.get('user') for entry in history.histories
+                if isinstance(entry, dict)
+            } & user_ids
+        ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_workflow_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='history',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='history',
+            name='updated_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='history',
+            name='workflow',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='message_histories', to='core.workflow'),
+        ),
+        migrations.CreateModel(
+            name='HistoryActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('history', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actors', to='core.history')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='historyactor',
+            index=models.Index(fields=['user', 'history'], name='core_histor_user_id_33259b_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='historyactor',
+            constraint=models.UniqueConstraint(fields=('history', 'user'), name='unique_history_actor'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
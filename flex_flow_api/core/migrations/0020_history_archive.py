@@ -0,0 +1,28 @@
+# Generated by Django 4.0.10 on 2026-10-19 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_history_filters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='history',
+            name='archive',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='history',
+            name='archive_codec',
+            field=models.CharField(blank=True, default='', max_length=8),
+        ),
+        migrations.AddField(
+            model_name='history',
+            name='archived_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,94 @@
+import ast
+import json
+import lzma
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations
+
+INDEX = 'core_history_entries_gin'
+# frozen copy of core.compression as of this migration
+CODECS = {
+    'zlib': (lambda data: zlib.compress(data, 9), zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress),
+}
+
+
+def pack(value, codec):
+    compress, _ = CODECS[codec]
+    return compress(json.dumps(
+        value, cls=DjangoJSONEncoder, separators=(',', ':')
+    ).encode())
+
+
+def unpack(data, codec):
+    if data is None:
+        return None
+    _, decompress = CODECS[codec]
+    return json.loads(decompress(bytes(data)))
+
+
+def _normalize(entry):
+    """Fix an entry written before the status and node_id fixes"""
+    if not isinstance(entry, dict):
+        return entry, False
+    changed = False
+    status = entry.get('status')
+    if isinstance(status, str) and status.startswith("('"):
+        entry['status'] = ast.literal_eval(status)[0]
+        changed = True
+    node = entry.get('node')
+    if 'node_id' not in entry and isinstance(node, str):
+        try:
+            entry['node_id'] = ast.literal_eval(node)['id']
+            changed = True
+        except (ValueError, SyntaxError, TypeError, KeyError):
+            pass
+    return entry, changed
+
+
+def normalize_entries(apps, schema_editor):
+    """Store the entry statuses as plain strings, add the node ids"""
+    db = schema_editor.connection.alias
+    History = apps.get_model('core', 'History')
+    for history in History.objects.using(db).iterator(chunk_size=500):
+        fields = []
+        if any([_normalize(entry)[1] for entry in history.histories]):
+            fields.append('histories')
+        if history.archived_count:
+            archived = unpack(history.archive, history.archive_codec)
+            if any([_normalize(entry)[1] for entry in archived]):
+                history.archive = pack(archived, history.archive_codec)
+                fields.append('archive')
+        if fields:
+            history.save(update_fields=fields)
+
+
+def create_index(apps, schema_editor):
+    """GIN index serving the containment queries of the activity report"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX} '
+        'ON core_history USING gin (histories jsonb_path_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {INDEX}')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run in a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0020_history_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_entries, migrations.RunPython.noop),
+        migrations.RunPython(create_index, drop_index),
+    ]
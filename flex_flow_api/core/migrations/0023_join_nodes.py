@@ -0,0 +1,33 @@
+# Generated by Django 4.0.10 on 2026-10-19 16:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_auditentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='node',
+            name='is_join_node',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='JoinArrival',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('arrivals', models.PositiveIntegerField(default=0)),
+                ('expected', models.PositiveIntegerField()),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.message')),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.node')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='joinarrival',
+            constraint=models.UniqueConstraint(fields=('message', 'node'), name='unique_join_arrival'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-19 16:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_join_nodes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='history',
+            name='object_id',
+            field=models.PositiveBigIntegerField(),
+        ),
+    ]
@@ -1,12 +1,16 @@
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (
     BaseUserManager,
     AbstractBaseUser,
     PermissionsMixin
 )
 
+from core.compression import unpack
+
 
 class CustomUserManager(BaseUserManager):
 
@@ -46,10 +50,30 @@ class Workflow(models.Model):
         on_delete=models.SET_NULL,
         null=True,
     )
+    # bumped whenever one of the workflow nodes or edges changes
+    graph_version = models.PositiveIntegerField(default=0)
+    # database holding the workflow's nodes, edges and messages, empty for
+    # the default database, see core.sharding
+    shard = models.CharField(max_length=64, blank=True, default='')
+    # set while rebalance_shards copies the workflow, writes are refused
+    shard_moving = models.BooleanField(default=False)
+
+    UPDATE_ONLY_FIELDS = ('graph_version', 'shard', 'shard_moving')
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # these are only ever changed by queryset updates, writing
+            # back stale in-memory values could undo them
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.UPDATE_ONLY_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     @classmethod
     def get_starting_nodes(cls, workflow):
         edges = Edge.objects.filter(workflow=workflow)
@@ -87,6 +111,8 @@ class Node(models.Model):
     title = models.CharField(max_length=255, blank=False)
     description = models.CharField(max_length=255)
     is_finishing_node = models.BooleanField(default=False)
+    # wait for every incoming branch before holding the message here
+    is_join_node = models.BooleanField(default=False)
 
     def __str__(self):
         return self.title
@@ -156,13 +182,201 @@ class MessageHolder(models.Model):
                 )
 
 
+class JoinArrival(models.Model):
+    """Incoming branches of a message that reached a join node"""
+    message = models.ForeignKey(Message, on_delete=models.CASCADE)
+    node = models.ForeignKey(Node, on_delete=models.CASCADE)
+    arrivals = models.PositiveIntegerField(default=0)
+    # in-degree of the node when the first branch arrived
+    expected = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['message', 'node'],
+                name='unique_join_arrival'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.message_id} at {self.node}: ' \
+               f'{self.arrivals}/{self.expected}'
+
+
 class History(models.Model):
     histories = models.JSONField()
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
-    object_id = models.PositiveIntegerField()
+    # big, message ids on shard N start at N * 10 ** 12
+    object_id = models.PositiveBigIntegerField()
     content_object = GenericForeignKey('content_type', 'object_id')
+    # denormalized from the entries so the history list can filter on them
+    workflow = models.ForeignKey(
+        Workflow,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='message_histories',
+    )
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # the oldest entries, moved out of histories by compact_history
+    archive = models.BinaryField(null=True, blank=True, editable=False)
+    archive_codec = models.CharField(max_length=8, blank=True, default='')
+    archived_count = models.PositiveIntegerField(default=0)
 
     class Meta:
+        # plus a GIN (jsonb_path_ops) index on histories, PostgreSQL only,
+        # see migration 0021
         indexes = [
             models.Index(fields=["content_type", "object_id"]),
         ]
+
+    def timeline(self):
+        """Every entry, the archived ones decompressed first"""
+        if not self.archived_count:
+            return list(self.histories)
+        return unpack(self.archive, self.archive_codec) + self.histories
+
+
+class HistoryActor(models.Model):
+    """A user who added an entry to a history"""
+    history = models.ForeignKey(
+        History,
+        on_delete=models.CASCADE,
+        related_name='actors',
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['history', 'user'],
+                name='unique_history_actor',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'history']),
+        ]
+
+
+class RevokedToken(models.Model):
+    """Identifier of a signed token revoked before its expiry"""
+    jti = models.CharField(max_length=64, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class WebhookSubscription(models.Model):
+    """HTTP endpoint receiving the events of a workflow"""
+    workflow = models.ForeignKey(
+        Workflow,
+        on_delete=models.CASCADE,
+        related_name='webhooks',
+    )
+    url = models.URLField(max_length=500)
+    # used to sign delivered batches, see workflow.outbox
+    secret = models.CharField(max_length=128, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    def __str__(self):
+        return self.url
+
+
+class OutboxEvent(models.Model):
+    """
+    Event waiting for delivery to one webhook subscription, written in
+    the same transaction as the change it describes.
+    """
+
+    class StatusChoices(models.TextChoices):
+        PENDING = 'pending', 'pending'
+        DELIVERED = 'delivered', 'delivered'
+        FAILED = 'failed', 'failed'
+
+    subscription = models.ForeignKey(
+        WebhookSubscription,
+        on_delete=models.CASCADE,
+        related_name='events',
+    )
+    event = models.CharField(max_length=64)
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(
+        choices=StatusChoices.choices,
+        default=StatusChoices.PENDING,
+        max_length=16,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.event} -> {self.subscription_id}'
+
+
+class ChangeLogEntry(models.Model):
+    """One create/update/delete of a replicated model, see history.changes"""
+
+    class ActionChoices(models.TextChoices):
+        CREATE = 'create', 'create'
+        UPDATE = 'update', 'update'
+        DELETE = 'delete', 'delete'
+
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    action = models.CharField(choices=ActionChoices.choices, max_length=8)
+    # plain id, entries must outlive the workflow they describe
+    workflow_id = models.BigIntegerField(null=True)
+    data = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    # PostgreSQL transaction id, the feed is ordered by (transaction_id, id)
+    transaction_id = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['transaction_id', 'id']),
+        ]
+
+    def __str__(self):
+        return f'{self.id} {self.action} {self.model} {self.object_id}'
+
+
+class AuditEntry(models.Model):
+    """One change of a workflow definition and its author, see history.audit"""
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.BigIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    action = models.CharField(
+        choices=ChangeLogEntry.ActionChoices.choices,
+        max_length=8,
+    )
+    # plain id, entries must outlive the workflow they describe
+    workflow_id = models.BigIntegerField(null=True)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='+',
+    )
+    data = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    # time of the change, the row is written when the request is done
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['workflow_id', 'id']),
+        ]
+
+    def __str__(self):
+        return f'{self.id} {self.action} {self.object_id} by {self.user_id}'
@@ -0,0 +1,15 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key.
+
+    Pages are fetched with ``WHERE id > <cursor> ORDER BY id LIMIT n`` so
+    the cost of a page does not grow with its position in the list.
+    """
+    page_size = settings.API_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.API_MAX_PAGE_SIZE
+    ordering = 'id'
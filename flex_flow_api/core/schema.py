@@ -0,0 +1,80 @@
+"""
+OpenAPI schema served from a pre-generated artifact.
+
+``python manage.py build_schema`` writes the schema to
+``OPENAPI_SCHEMA_FILE``, e.g. while building the image. A worker loads that
+file on its first schema request, or generates the schema once when the
+file is missing, and then serves the rendered document from memory with a
+strong ETag. drf-spectacular's generator is only imported when the schema
+has to be generated, so it adds nothing to worker startup.
+"""
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+
+JSON = 'json'
+YAML = 'yaml'
+CONTENT_TYPES = {
+    JSON: 'application/vnd.oai.openapi+json',
+    YAML: 'application/vnd.oai.openapi; charset=utf-8',
+}
+
+_lock = threading.Lock()
+_documents = {}
+
+
+def generate_schema():
+    """Introspect the API and return the schema as a dict"""
+    from drf_spectacular.settings import spectacular_settings
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    return generator.get_schema(request=None, public=True)
+
+
+def render_schema(schema, fmt):
+    from drf_spectacular.renderers import (
+        OpenApiJsonRenderer,
+        OpenApiYamlRenderer,
+    )
+    renderer = OpenApiJsonRenderer() if fmt == JSON else \
+        OpenApiYamlRenderer()
+    return renderer.render(schema, renderer_context={})
+
+
+def write_schema(path=None):
+    """Generate the schema and store it as the JSON artifact"""
+    path = path or settings.OPENAPI_SCHEMA_FILE
+    with open(path, 'wb') as artifact:
+        artifact.write(render_schema(generate_schema(), JSON))
+    return path
+
+
+def load_schema():
+    """The stored artifact, or a freshly generated schema without one"""
+    try:
+        with open(settings.OPENAPI_SCHEMA_FILE, 'rb') as artifact:
+            return json.load(artifact)
+    except FileNotFoundError:
+        return generate_schema()
+
+
+def get_document(fmt):
+    """Return ``(body, etag)`` of the schema rendered as ``fmt``"""
+    document = _documents.get(fmt)
+    if document is None:
+        with _lock:
+            if fmt not in _documents:
+                if 'schema' not in _documents:
+                    _documents['schema'] = load_schema()
+                body = render_schema(_documents['schema'], fmt)
+                digest = hashlib.sha1(body).hexdigest()
+                _documents[fmt] = (body, f'"{digest}"')
+            document = _documents[fmt]
+    return document
+
+
+def clear():
+    """Forget the loaded schema, the next request loads it again"""
+    with _lock:
+        _documents.clear()
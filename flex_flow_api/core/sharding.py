@@ -0,0 +1,354 @@
+"""
+Horizontal sharding of workflows across the ``DATABASE_SHARDS`` databases.
+
+``Workflow`` rows are the shard map: they live on ``default`` and their
+``shard`` column names the database holding the workflow's nodes, edges,
+messages, holders, message history, webhooks and outbox events. Requests
+are routed by their ``workflow_pk`` (``ShardRoutingMiddleware``), other
+code can pin a shard with ``use_shard``. Users and workflows are copied to
+the shards as reference rows so foreign keys hold on every database.
+
+Workflow ids come from ``default`` and are unique everywhere. On
+PostgreSQL ``prepare_shards`` gives each shard its own id range for the
+other tables, so ``move_workflow`` can copy rows between shards with their
+ids unchanged.
+
+Listings across workflows (the workflow list node ids and counts, the
+history list without ``?workflow=``, the change feed) read ``default``
+only. The change feed and graph versions stay on ``default`` and are
+written once a shard's transaction commits.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count
+
+from core.lru import LRUCache
+from core.models import (
+    Edge,
+    History,
+    HistoryActor,
+    JoinArrival,
+    Message,
+    MessageHolder,
+    Node,
+    OutboxEvent,
+    WebhookSubscription,
+    Workflow,
+)
+
+# rows living on the shard of their workflow, in foreign key order
+SHARDED_MODELS = (
+    Node,
+    Edge,
+    Message,
+    MessageHolder,
+    JoinArrival,
+    History,
+    HistoryActor,
+    WebhookSubscription,
+    OutboxEvent,
+)
+_sharded_labels = {model._meta.label_lower for model in SHARDED_MODELS}
+# ids of rows created on shard N start at N * ID_RANGE on PostgreSQL
+ID_RANGE = 10 ** 12
+
+_current_shard = contextvars.ContextVar('current_shard', default=None)
+_shard_map = None
+
+
+def sharding_enabled():
+    return bool(settings.DATABASE_SHARDS)
+
+
+def shard_aliases():
+    return list(settings.DATABASE_SHARDS) or [DEFAULT_DB_ALIAS]
+
+
+def is_sharded(model):
+    return model._meta.label_lower in _sharded_labels
+
+
+def current_shard():
+    return _current_shard.get()
+
+
+@contextmanager
+def use_shard(alias):
+    """Route the sharded models to ``alias`` inside this block"""
+    token = _current_shard.set(alias)
+    try:
+        yield
+    finally:
+        _current_shard.reset(token)
+
+
+def get_shard_map():
+    """Process wide cache of workflow id to ``(alias, moving)``"""
+    global _shard_map
+    if _shard_map is None:
+        _shard_map = LRUCache(
+            maxsize=settings.SHARD_MAP_CACHE_SIZE,
+            ttl=settings.SHARD_MAP_CACHE_TTL,
+        )
+    return _shard_map
+
+
+def lookup_workflow(workflow_id):
+    """Return ``(alias, moving)`` of a workflow, None if it does not exist"""
+    shard_map = get_shard_map()
+    key = str(workflow_id)
+    placement = shard_map.get(key)
+    if placement is None:
+        try:
+            row = Workflow.objects.using(DEFAULT_DB_ALIAS).filter(
+                pk=workflow_id
+            ).values_list('shard', 'shard_moving').first()
+        except ValueError:
+            return None
+        if row is None:
+            return None
+        placement = (row[0] or DEFAULT_DB_ALIAS, row[1])
+        shard_map.set(key, placement)
+    return placement
+
+
+def shard_for_workflow(workflow_id):
+    if not sharding_enabled():
+        return DEFAULT_DB_ALIAS
+    placement = lookup_workflow(workflow_id)
+    return DEFAULT_DB_ALIAS if placement is None else placement[0]
+
+
+def shard_counts():
+    """Number of workflows held by each shard"""
+    counts = dict(
+        Workflow.objects.using(DEFAULT_DB_ALIAS).values_list(
+            'shard'
+        ).annotate(count=Count('id')).order_by()
+    )
+    counts[DEFAULT_DB_ALIAS] = counts.get(DEFAULT_DB_ALIAS, 0) + \
+        counts.pop('', 0)
+    return {alias: counts.get(alias, 0) for alias in shard_aliases()}
+
+
+def pick_shard():
+    """The shard holding the fewest workflows"""
+    counts = shard_counts()
+    return min(counts, key=counts.get)
+
+
+class ShardRouter:
+    """Send sharded models to the shard of the current workflow"""
+
+    def _db(self, model, hints):
+        if not sharding_enabled() or not is_sharded(model):
+            return None
+        instance = hints.get('instance')
+        if instance is not None and is_sharded(type(instance)) and \
+                instance._state.db:
+            return instance._state.db
+        return _current_shard.get()
+
+    def db_for_read(self, model, **hints):
+        return self._db(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # users and content types are copied to every shard
+        if sharding_enabled() or _on_shard(obj1) or _on_shard(obj2):
+            return True
+        return None
+
+
+def is_shard_copy(instance, using):
+    """Whether ``instance`` on ``using`` is the shard copy of a workflow"""
+    return isinstance(instance, Workflow) and using != DEFAULT_DB_ALIAS
+
+
+def _on_shard(instance):
+    return instance._state.db not in (
+        None, DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS
+    )
+
+
+def _copy_row(instance, alias):
+    """Insert or update ``instance`` on ``alias`` without signals"""
+    model = type(instance)
+    fields = {
+        field.attname: field.value_from_object(instance)
+        for field in model._meta.concrete_fields
+    }
+    pk = fields.pop(model._meta.pk.attname)
+    manager = model._base_manager.using(alias)
+    if not manager.filter(pk=pk).update(**fields):
+        manager.bulk_create([model(pk=pk, **fields)])
+
+
+def assign_shard(sender, instance, raw=False, **kwargs):
+    """pre_save receiver for Workflow placing new workflows"""
+    if sharding_enabled() and not raw and instance._state.adding and \
+            not instance.shard:
+        instance.shard = pick_shard()
+
+
+def copy_workflow(sender, instance, raw=False, using=None, **kwargs):
+    """post_save receiver for Workflow keeping its shard copy current"""
+    if not sharding_enabled() or raw or using != DEFAULT_DB_ALIAS:
+        return
+    alias = instance.shard or DEFAULT_DB_ALIAS
+    if alias != DEFAULT_DB_ALIAS:
+        _copy_row(instance, alias)
+
+
+def delete_workflow(sender, instance, using=None, **kwargs):
+    """post_delete receiver for Workflow removing it from its shard"""
+    if not sharding_enabled() or using != DEFAULT_DB_ALIAS:
+        return
+    get_shard_map().delete(str(instance.pk))
+    alias = instance.shard or DEFAULT_DB_ALIAS
+    if alias != DEFAULT_DB_ALIAS:
+        with use_shard(alias):
+            Message.objects.filter(
+                id__in=list(MessageHolder.objects.filter(
+                    current_node__workflow_id=instance.pk
+                ).values_list('message_id', flat=True))
+            ).delete()
+            Workflow.objects.using(alias).filter(pk=instance.pk).delete()
+
+
+def copy_user(sender, instance, raw=False, using=None, **kwargs):
+    """post_save receiver for User copying it to every shard"""
+    if not sharding_enabled() or raw or using != DEFAULT_DB_ALIAS:
+        return
+    for alias in shard_aliases():
+        if alias != DEFAULT_DB_ALIAS:
+            _copy_row(instance, alias)
+
+
+def prepare_shards():
+    """
+    Copy every user to every shard and, on PostgreSQL, move the id
+    sequences of the sharded tables into each shard's own range.
+    """
+    users = list(get_user_model()._base_manager.using(DEFAULT_DB_ALIAS))
+    for index, alias in enumerate(shard_aliases()):
+        if alias == DEFAULT_DB_ALIAS:
+            continue
+        for user in users:
+            _copy_row(user, alias)
+        connection = connections[alias]
+        if connection.vendor != 'postgresql' or index == 0:
+            continue
+        with connection.cursor() as cursor:
+            for model in SHARDED_MODELS:
+                table = model._meta.db_table
+                cursor.execute(
+                    f"SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    f"GREATEST((SELECT COALESCE(MAX(id), 0) FROM {table}),"
+                    f" %s))",
+                    [table, index * ID_RANGE],
+                )
+
+
+def _workflow_querysets(alias, workflow_id):
+    """Querysets of the rows of a workflow on ``alias``, FK order"""
+    message_ids = list(
+        MessageHolder.objects.using(alias).filter(
+            current_node__workflow_id=workflow_id
+        ).values_list('message_id', flat=True).distinct()
+    )
+    message_type = ContentType.objects.db_manager(
+        DEFAULT_DB_ALIAS
+    ).get_for_model(Message)
+    return [
+        Node.objects.using(alias).filter(workflow_id=workflow_id),
+        Edge.objects.using(alias).filter(workflow_id=workflow_id),
+        Message.objects.using(alias).filter(id__in=message_ids),
+        MessageHolder.objects.using(alias).filter(
+            current_node__workflow_id=workflow_id
+        ),
+        JoinArrival.objects.using(alias).filter(
+            node__workflow_id=workflow_id
+        ),
+        History.objects.using(alias).filter(
+            content_type_id=message_type.id,
+            object_id__in=message_ids,
+        ),
+        HistoryActor.objects.using(alias).filter(
+            history__content_type_id=message_type.id,
+            history__object_id__in=message_ids,
+        ),
+        WebhookSubscription.objects.using(alias).filter(
+            workflow_id=workflow_id
+        ),
+        OutboxEvent.objects.using(alias).filter(
+            subscription__workflow_id=workflow_id
+        ),
+    ]
+
+
+def move_workflow(workflow_id, target, grace=None, log=print):
+    """
+    Move a workflow and its rows to the ``target`` shard.
+
+    Writes to the workflow are refused while it moves. ``grace`` seconds
+    (default ``SHARD_MAP_CACHE_TTL``) are waited after flagging the move,
+    so every process sees the flag, and again before deleting the source
+    rows, so every process routes to the new shard.
+    """
+    if target not in shard_aliases():
+        raise ValueError(f'Unknown shard {target}')
+    if grace is None:
+        grace = settings.SHARD_MAP_CACHE_TTL
+    workflow = Workflow.objects.using(DEFAULT_DB_ALIAS).get(pk=workflow_id)
+    source = workflow.shard or DEFAULT_DB_ALIAS
+    if source == target:
+        log(f'Workflow {workflow_id} is already on {target}')
+        return
+    shard_map = get_shard_map()
+    Workflow.objects.using(DEFAULT_DB_ALIAS).filter(pk=workflow_id).update(
+        shard_moving=True
+    )
+    shard_map.delete(str(workflow_id))
+    try:
+        time.sleep(grace)
+        with transaction.atomic(using=target):
+            if target != DEFAULT_DB_ALIAS:
+                _copy_row(workflow, target)
+            for queryset in _workflow_querysets(source, workflow_id):
+                rows = list(queryset)
+                queryset.model.objects.using(target).bulk_create(
+                    rows, batch_size=500
+                )
+                log(f'Copied {len(rows)} {queryset.model.__name__} rows')
+        Workflow.objects.using(DEFAULT_DB_ALIAS).filter(
+            pk=workflow_id
+        ).update(
+            shard='' if target == DEFAULT_DB_ALIAS else target,
+            shard_moving=False,
+        )
+    except BaseException:
+        Workflow.objects.using(DEFAULT_DB_ALIAS).filter(
+            pk=workflow_id
+        ).update(shard_moving=False)
+        raise
+    finally:
+        shard_map.delete(str(workflow_id))
+    time.sleep(grace)
+    with transaction.atomic(using=source):
+        # raw deletes, the rows still exist and no signal should fire
+        for queryset in reversed(_workflow_querysets(source, workflow_id)):
+            queryset._raw_delete(source)
+        if source != DEFAULT_DB_ALIAS:
+            Workflow.objects.using(source).filter(
+                pk=workflow_id
+            )._raw_delete(source)
+    log(f'Moved workflow {workflow_id} from {source} to {target}')
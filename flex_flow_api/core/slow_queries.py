@@ -0,0 +1,162 @@
+"""
+Opt-in slow query log.
+
+When ``SLOW_QUERY_THRESHOLD_MS`` is set, every database connection gets an
+execute wrapper that records queries slower than the threshold together
+with their parameters, duration and the project frames that issued them.
+Entries are written as JSON lines to a rotating log file and can be
+summarized with the ``slow_queries`` management command.
+"""
+import json
+import logging
+import os
+import re
+import time
+import traceback
+from collections import defaultdict
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+
+LOGGER_NAME = 'flexflow.slow_queries'
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_WHITESPACE = re.compile(r'\s+')
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def get_threshold():
+    """Return the threshold in seconds, None when the log is disabled"""
+    threshold = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+    if threshold in (None, ''):
+        return None
+    return float(threshold) / 1000
+
+
+def _configure_logger():
+    path = os.path.abspath(settings.SLOW_QUERY_LOG_FILE)
+    for handler in list(logger.handlers):
+        if getattr(handler, 'baseFilename', None) == path:
+            return
+        logger.removeHandler(handler)
+        handler.close()
+    handler = RotatingFileHandler(
+        path,
+        maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+        backupCount=settings.SLOW_QUERY_LOG_BACKUP_COUNT,
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def project_stack(depth=None):
+    """Return the innermost frames that belong to the project source"""
+    if depth is None:
+        depth = settings.SLOW_QUERY_STACK_DEPTH
+    root = str(settings.BASE_DIR) + os.sep
+    frames = []
+    for frame in traceback.extract_stack()[:-1]:
+        filename = frame.filename
+        if (not filename.startswith(root)
+                or 'site-packages' in filename
+                or filename == __file__):
+            continue
+        frames.append(
+            f'{os.path.relpath(filename, root)}:{frame.lineno}'
+            f' in {frame.name}'
+        )
+    return frames[-depth:]
+
+
+def _json_param(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return repr(value)
+
+
+def normalize_sql(sql):
+    """Collapse variable parts of a query so similar queries group up"""
+    sql = _WHITESPACE.sub(' ', sql).strip()
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+class SlowQueryLogger:
+    """Execute wrapper logging queries slower than ``threshold`` seconds"""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            if duration >= self.threshold:
+                self.record(sql, params, many, duration, context)
+
+    def record(self, sql, params, many, duration, context):
+        if many or params is None:
+            params = []
+        entry = {
+            'timestamp': time.time(),
+            'alias': context['connection'].alias,
+            'duration_ms': round(duration * 1000, 3),
+            'sql': sql,
+            'params': [_json_param(param) for param in params],
+            'stack': project_stack(),
+        }
+        _configure_logger()
+        logger.info(json.dumps(entry))
+
+
+def install(sender, connection, **kwargs):
+    """``connection_created`` receiver adding the wrapper once"""
+    threshold = get_threshold()
+    if threshold is None:
+        return
+    if any(
+        isinstance(wrapper, SlowQueryLogger)
+        for wrapper in connection.execute_wrappers
+    ):
+        return
+    connection.execute_wrappers.append(SlowQueryLogger(threshold))
+
+
+def read_entries(path):
+    """Yield log entries from ``path`` and its rotated backups"""
+    paths = [path] + [
+        f'{path}.{index}'
+        for index in range(1, settings.SLOW_QUERY_LOG_BACKUP_COUNT + 1)
+    ]
+    for log_path in paths:
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path) as fp:
+            for line in fp:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+
+def summarize(entries, group_by='sql'):
+    """Aggregate entries by normalized SQL or by issuing location"""
+    groups = defaultdict(lambda: {'count': 0, 'total_ms': 0.0, 'max_ms': 0})
+    for entry in entries:
+        if group_by == 'location':
+            stack = entry.get('stack') or ['<unknown>']
+            key = stack[-1]
+        else:
+            key = normalize_sql(entry['sql'])
+        group = groups[key]
+        group['count'] += 1
+        group['total_ms'] += entry['duration_ms']
+        group['max_ms'] = max(group['max_ms'], entry['duration_ms'])
+    return sorted(
+        ({'key': key, **values} for key, values in groups.items()),
+        key=lambda group: group['total_ms'],
+        reverse=True,
+    )
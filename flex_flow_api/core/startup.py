@@ -0,0 +1,142 @@
+"""
+Startup profiling of the API workers.
+
+``python -X importtime -m core.startup`` boots Django the way a worker
+does (``django.setup()``, the root URLconf, the middleware chain and a
+first request) and prints how long each phase and every
+``AppConfig.ready()`` took as JSON on stdout. The ``profile_startup``
+command runs it in a fresh interpreter and adds the per module import
+times Python writes to stderr.
+"""
+import argparse
+import io
+import json
+import re
+import sys
+import time
+
+IMPORTTIME = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$'
+)
+
+
+def parse_importtime(lines):
+    """
+    Parse ``-X importtime`` output into ``(module, self_us, cumulative_us)``
+    tuples, other lines are skipped.
+    """
+    modules = []
+    for line in lines:
+        match = IMPORTTIME.match(line.rstrip('\n'))
+        if match:
+            modules.append(
+                (match.group(4), int(match.group(1)), int(match.group(2)))
+            )
+    return modules
+
+
+def by_package(modules, depth=1):
+    """
+    Sum the self import time of ``modules`` per package of ``depth``
+    components, return ``(package, microseconds, module count)`` rows,
+    slowest first.
+    """
+    totals = {}
+    for module, self_us, _ in modules:
+        package = '.'.join(module.split('.')[:depth])
+        total, count = totals.get(package, (0, 0))
+        totals[package] = (total + self_us, count + 1)
+    return sorted(
+        ((package, total, count)
+         for package, (total, count) in totals.items()),
+        key=lambda row: row[1],
+        reverse=True,
+    )
+
+
+def _timed_ready(ready_times):
+    """Wrap the ready() of every app config created from now on"""
+    from django.apps.config import AppConfig
+    create = AppConfig.create.__func__
+
+    def timed_create(cls, entry):
+        app_config = create(cls, entry)
+        ready = app_config.ready
+
+        def timed():
+            start = time.perf_counter()
+            ready()
+            ready_times[app_config.label] = time.perf_counter() - start
+
+        app_config.ready = timed
+        return app_config
+
+    AppConfig.create = classmethod(timed_create)
+
+
+def _environ(path):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'SCRIPT_NAME': '',
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.url_scheme': 'http',
+        'wsgi.errors': sys.stderr,
+    }
+
+
+def profile(path):
+    """Boot Django like a WSGI worker and serve ``path`` once"""
+    phases = {}
+    ready_times = {}
+    start = last = time.perf_counter()
+
+    def phase(name):
+        nonlocal last
+        now = time.perf_counter()
+        phases[name] = now - last
+        last = now
+
+    import django
+    from django.conf import settings
+    settings.INSTALLED_APPS
+    phase('settings')
+    _timed_ready(ready_times)
+    django.setup(set_prefix=False)
+    phase('django.setup')
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+    phase('urlconf')
+    from django.core.handlers.wsgi import WSGIHandler
+    handler = WSGIHandler()
+    phase('middleware')
+    statuses = []
+    response = handler(
+        _environ(path), lambda status, headers: statuses.append(status)
+    )
+    b''.join(response)
+    response.close()
+    phase('first request')
+    return {
+        'phases': phases,
+        'ready': ready_times,
+        'total': time.perf_counter() - start,
+        'modules': len(sys.modules),
+        'status': statuses[0] if statuses else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--path', default='/metrics')
+    args = parser.parse_args(argv)
+    json.dump(profile(args.path), sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
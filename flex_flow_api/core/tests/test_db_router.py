@@ -0,0 +1,119 @@
+"""
+Test read replica routing
+"""
+from asgiref.sync import async_to_sync
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.db_router import (
+    ReplicaRouter,
+    check_sticky_cache,
+    enable_replicas,
+    reset,
+    use_primary,
+)
+from core.middleware import ReplicaRoutingMiddleware
+from core.models import Node
+
+REPLICAS = ['replica_0', 'replica_1']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTests(SimpleTestCase):
+    """Test the router only reads from replicas when allowed"""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_primary_by_default(self):
+        """Test reads outside a replica-safe request use the primary"""
+        self.assertEqual(self.router.db_for_read(Node), 'default')
+
+    def test_reads_and_writes_when_enabled(self):
+        """Test reads spread over replicas and writes stay on primary"""
+        token = enable_replicas()
+        try:
+            self.assertIn(self.router.db_for_read(Node), REPLICAS)
+            self.assertEqual(self.router.db_for_write(Node), 'default')
+            with use_primary():
+                self.assertEqual(self.router.db_for_read(Node), 'default')
+            self.assertIn(self.router.db_for_read(Node), REPLICAS)
+        finally:
+            reset(token)
+
+    def test_sticky_cache_must_be_shared(self):
+        """Test replicas with a per-process sticky cache fail the checks"""
+        errors = check_sticky_cache()
+        self.assertEqual([error.id for error in errors], ['core.E001'])
+        with self.settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                'LOCATION': 'sticky',
+            },
+        }):
+            self.assertEqual(check_sticky_cache(), [])
+        with self.settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(check_sticky_cache(), [])
+
+    def test_no_migrations_on_replicas(self):
+        """Test replicas are never migrated"""
+        self.assertFalse(self.router.allow_migrate('replica_0', 'core'))
+        self.assertIsNone(self.router.allow_migrate('default', 'core'))
+
+
+@override_settings(
+    DATABASE_REPLICAS=REPLICAS,
+    REPLICA_STICKY_CACHE_ALIAS='default',
+)
+class ReplicaRoutingMiddlewareTests(SimpleTestCase):
+    """Test safe requests read from replicas unless the client wrote"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+        self.read_from = []
+
+        def get_response(request):
+            self.read_from.append(self.router.db_for_read(Node))
+            return HttpResponse()
+
+        self.middleware = ReplicaRoutingMiddleware(get_response)
+
+    def _request(self, method, token='abc'):
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        self.middleware(getattr(self.factory, method)('/', **headers))
+        return self.read_from[-1]
+
+    def test_safe_request_reads_replica(self):
+        """Test GET requests are routed to a replica"""
+        self.assertIn(self._request('get'), REPLICAS)
+        self.assertEqual(self.router.db_for_read(Node), 'default')
+
+    def test_write_request_reads_primary(self):
+        """Test reads made while handling a write use the primary"""
+        self.assertEqual(self._request('post'), 'default')
+
+    def test_client_sticks_to_primary_after_write(self):
+        """Test a client reads its own writes, other clients do not pin"""
+        self._request('post')
+        self.assertEqual(self._request('get'), 'default')
+        self.assertIn(self._request('get', token='other'), REPLICAS)
+        caches['default'].clear()
+        self.assertIn(self._request('get'), REPLICAS)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Test nothing changes when no replica is configured"""
+        self.assertEqual(self._request('get'), 'default')
+
+    def test_async_requests(self):
+        """Test the middleware routes async requests the same way"""
+        async def get_response(request):
+            self.read_from.append(self.router.db_for_read(Node))
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        async_to_sync(middleware)(self.factory.get('/'))
+        self.assertIn(self.read_from[-1], REPLICAS)
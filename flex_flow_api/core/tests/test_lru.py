@@ -0,0 +1,40 @@
+"""
+Test the LRU cache
+"""
+from django.test import SimpleTestCase
+
+from core.lru import LRUCache
+
+
+class LRUCacheTests(SimpleTestCase):
+    """Test eviction, expiry and statistics"""
+
+    def test_least_recently_used_evicted(self):
+        """Test the oldest untouched entry is evicted first"""
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_entries_expire(self):
+        """Test entries are not returned after their ttl"""
+        now = [0]
+        cache = LRUCache(ttl=10, timer=lambda: now[0])
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        now[0] = 11
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_discard_if(self):
+        """Test dropping entries matching a predicate"""
+        cache = LRUCache()
+        cache.set('a', 1)
+        cache.set('b', 2)
+        self.assertEqual(cache.discard_if(lambda key, value: value == 2), 1)
+        self.assertEqual(len(cache), 1)
@@ -0,0 +1,155 @@
+"""
+Test the metrics registry and the /metrics endpoint
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+from unittest.mock import patch
+
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.metrics import Registry
+from core.middleware import MetricsMiddleware
+from workflow.tests.utills import (
+    create_user,
+    create_workflow,
+    create_node,
+)
+
+METRICS_URL = reverse('metrics')
+
+
+class RegistryTests(SimpleTestCase):
+    """Test counters, histograms and the text format"""
+
+    def test_counter_render(self):
+        """Test counters are rendered with their labels"""
+        registry = Registry()
+        counter = registry.counter('test_total', 'Test', ['view'])
+        counter.inc(view='a')
+        counter.inc(2, view='a')
+        output = registry.render()
+        self.assertIn('# TYPE test_total counter', output)
+        self.assertIn('test_total{view="a"} 3', output)
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test histogram buckets, sum and count"""
+        registry = Registry()
+        histogram = registry.histogram(
+            'test_seconds', 'Test', buckets=(0.1, 1.0)
+        )
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+        output = registry.render()
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', output)
+        self.assertIn('test_seconds_bucket{le="1"} 2', output)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 3', output)
+        self.assertIn('test_seconds_sum 5.55', output)
+        self.assertIn('test_seconds_count 3', output)
+
+    def test_wrong_labels_raise_error(self):
+        """Test using labels the metric was not declared with fails"""
+        counter = Registry().counter('test_total', 'Test', ['view'])
+        with self.assertRaises(ValueError):
+            counter.inc(method='GET')
+
+    def test_multiproc_aggregation(self):
+        """Test snapshots of other workers are merged on render"""
+        with tempfile.TemporaryDirectory() as directory:
+            worker = Registry(multiproc_dir=directory, worker_id='w1')
+            worker.counter('test_total', 'Test').inc(4)
+            worker.flush(force=True)
+            scraper = Registry(multiproc_dir=directory, worker_id='w2')
+            scraper.counter('test_total', 'Test').inc(1)
+            self.assertIn('test_total 5', scraper.render())
+
+    def test_dead_worker_snapshot_removed(self):
+        """Test the snapshot of an exited worker is dropped on render"""
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            worker = Registry(
+                multiproc_dir=directory, worker_id=str(process.pid)
+            )
+            worker.counter('test_total', 'Test').inc(4)
+            worker.flush(force=True)
+            scraper = Registry(multiproc_dir=directory, worker_id='w2')
+            scraper.counter('test_total', 'Test').inc(1)
+            self.assertIn('test_total 1', scraper.render())
+            self.assertEqual(os.listdir(directory), [])
+
+
+class MetricsApiTests(TestCase):
+    """Test the metrics endpoint and the collected values"""
+
+    def setUp(self):
+        metrics.registry.reset()
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(self.user)
+
+    def test_request_metrics_recorded(self):
+        """Test requests are counted per view"""
+        self.client.get(
+            reverse('node-list', kwargs={'workflow_pk': self.workflow.id})
+        )
+        res = self.client.get(METRICS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain'))
+        content = res.content.decode()
+        self.assertIn(
+            'flexflow_http_requests_total'
+            '{view="node-list",method="GET",status="200"} 1',
+            content
+        )
+        self.assertIn(
+            'flexflow_http_request_duration_seconds_count'
+            '{view="node-list",method="GET"} 1',
+            content
+        )
+        self.assertGreater(
+            metrics.db_queries_total.value(view='node-list'), 0
+        )
+
+    def test_domain_counters(self):
+        """Test message creation is counted"""
+        create_node(self.workflow)
+        url = reverse(
+            'message-list',
+            kwargs={'workflow_pk': self.workflow.id}
+        )
+        self.client.post(url, {'message': 'Hello'})
+        self.assertEqual(metrics.messages_created_total.value(), 1)
+
+    async def test_async_flush_off_event_loop(self):
+        """Test async requests write the snapshot from a worker thread"""
+        async def get_response(request):
+            return HttpResponse()
+
+        on_loop = []
+
+        def flush():
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+
+        middleware = MetricsMiddleware(get_response)
+        with patch.object(metrics.registry, 'needs_flush',
+                          return_value=True), \
+                patch.object(metrics.registry, 'flush', flush):
+            await middleware(RequestFactory().get('/'))
+        self.assertEqual(on_loop, [False])
@@ -0,0 +1,70 @@
+"""
+Test the pre-generated OpenAPI schema endpoint
+"""
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from core import schema
+
+SCHEMA_URL = reverse('schema')
+DOCUMENT = {'openapi': '3.0.3', 'info': {'title': 'Test'}, 'paths': {}}
+
+
+class SchemaViewTests(SimpleTestCase):
+    """Test the schema is loaded once and served with an ETag"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'openapi.json')
+        with open(self.path, 'w') as artifact:
+            json.dump(DOCUMENT, artifact)
+        override = override_settings(OPENAPI_SCHEMA_FILE=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        schema.clear()
+        self.addCleanup(schema.clear)
+
+    def test_serves_artifact(self):
+        """Test the stored schema is served as YAML or JSON"""
+        with mock.patch('core.schema.generate_schema') as generate:
+            res = self.client.get(SCHEMA_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertIn(b'title: Test', res.content)
+            res = self.client.get(SCHEMA_URL, {'format': 'json'})
+            self.assertEqual(json.loads(res.content), DOCUMENT)
+            res = self.client.get(SCHEMA_URL, HTTP_ACCEPT='application/json')
+            self.assertEqual(res['Content-Type'], schema.CONTENT_TYPES['json'])
+        generate.assert_not_called()
+
+    def test_not_modified(self):
+        """Test a matching If-None-Match is answered with 304"""
+        etag = self.client.get(SCHEMA_URL)['ETag']
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res['ETag'], etag)
+
+    def test_generated_once_without_artifact(self):
+        """Test the schema is generated on first use when not stored"""
+        os.remove(self.path)
+        with mock.patch(
+            'core.schema.generate_schema', return_value=DOCUMENT
+        ) as generate:
+            self.client.get(SCHEMA_URL)
+            self.client.get(SCHEMA_URL, {'format': 'json'})
+        generate.assert_called_once()
+
+    def test_write_schema(self):
+        """Test build_schema stores the generated schema"""
+        with mock.patch(
+            'core.schema.generate_schema', return_value=DOCUMENT
+        ):
+            schema.write_schema()
+        with open(self.path) as artifact:
+            self.assertEqual(json.load(artifact), DOCUMENT)
@@ -0,0 +1,284 @@
+"""
+Test workflow sharding
+"""
+import json
+import unittest
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import metrics, sharding
+from core.middleware import ShardRoutingMiddleware
+from core.models import (
+    AuditEntry,
+    ChangeLogEntry,
+    History,
+    Message,
+    MessageHolder,
+    Node,
+    User,
+    Workflow,
+)
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+    create_message,
+)
+
+SHARDS = ['default', 'shard_1']
+
+
+@override_settings(DATABASE_SHARDS=SHARDS)
+class ShardRouterTests(SimpleTestCase):
+    """Test sharded models follow the current shard"""
+
+    def setUp(self):
+        self.router = sharding.ShardRouter()
+
+    def test_sharded_models_use_current_shard(self):
+        """Test workflow scoped models are routed to the pinned shard"""
+        self.assertIsNone(self.router.db_for_read(Node))
+        with sharding.use_shard('shard_1'):
+            self.assertEqual(self.router.db_for_read(Node), 'shard_1')
+            self.assertEqual(self.router.db_for_write(Message), 'shard_1')
+            self.assertIsNone(self.router.db_for_read(Workflow))
+            self.assertIsNone(self.router.db_for_write(User))
+        self.assertIsNone(self.router.db_for_read(Node))
+
+    def test_instances_stay_on_their_database(self):
+        """Test a loaded row is written back where it was read from"""
+        node = Node()
+        node._state.db = 'shard_1'
+        self.assertEqual(
+            self.router.db_for_write(Node, instance=node), 'shard_1'
+        )
+
+    @override_settings(DATABASE_SHARDS=[])
+    def test_disabled_without_shards(self):
+        """Test nothing is routed when no shards are configured"""
+        with sharding.use_shard('shard_1'):
+            self.assertIsNone(self.router.db_for_read(Node))
+
+
+class ShardRoutingMiddlewareTests(TestCase):
+    """Test requests are routed to the shard of their workflow"""
+    databases = '__all__'
+
+    def setUp(self):
+        sharding.get_shard_map().clear()
+        self.addCleanup(sharding.get_shard_map().clear)
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.workflow = create_workflow(self.user)
+        Workflow.objects.filter(pk=self.workflow.pk).update(shard='shard_1')
+        self.factory = RequestFactory()
+        self.routed_to = []
+
+        def get_response(request):
+            self.routed_to.append(sharding.current_shard())
+            return HttpResponse()
+
+        self.middleware = ShardRoutingMiddleware(get_response)
+
+    def test_routes_by_workflow_in_url(self):
+        """Test the workflow_pk and workflow detail pk pick the shard"""
+        with self.settings(DATABASE_SHARDS=SHARDS):
+            self.middleware(self.factory.get(
+                f'/api/workflow/{self.workflow.pk}/nodes/'
+            ))
+            self.middleware(self.factory.get(
+                f'/api/workflow/{self.workflow.pk}/'
+            ))
+            self.middleware(self.factory.get('/api/workflow/'))
+        self.assertEqual(self.routed_to, ['shard_1', 'shard_1', None])
+
+    def test_writes_refused_while_moving(self):
+        """Test writes to a moving workflow get 503, reads go through"""
+        Workflow.objects.filter(pk=self.workflow.pk).update(
+            shard_moving=True
+        )
+        url = f'/api/workflow/{self.workflow.pk}/nodes/'
+        with self.settings(DATABASE_SHARDS=SHARDS):
+            res = self.middleware(self.factory.post(url))
+            self.assertEqual(res.status_code, 503)
+            self.assertIn('Retry-After', res)
+            res = self.middleware(self.factory.get(url))
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self.routed_to, ['shard_1'])
+
+
+@unittest.skipUnless(
+    'shard_1' in settings.DATABASES,
+    'needs a shard_1 database',
+)
+@override_settings(DATABASE_SHARDS=SHARDS)
+class MoveWorkflowTests(TestCase):
+    """Test moving a workflow and its rows between shards"""
+    databases = '__all__'
+
+    def setUp(self):
+        sharding.get_shard_map().clear()
+        self.addCleanup(sharding.get_shard_map().clear)
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.workflow = create_workflow(self.user, shard='default')
+        self.node = create_node(self.workflow)
+        self.message = create_message(self.user, self.node)
+
+    def test_move_workflow(self):
+        """Test rows are copied to the target and removed from the source"""
+        sharding.move_workflow(
+            self.workflow.pk, 'shard_1', grace=0, log=lambda line: None
+        )
+        self.workflow.refresh_from_db()
+        self.assertEqual(self.workflow.shard, 'shard_1')
+        self.assertFalse(self.workflow.shard_moving)
+        self.assertFalse(Node.objects.using('default').exists())
+        self.assertFalse(MessageHolder.objects.using('default').exists())
+        holder = MessageHolder.objects.using('shard_1').get()
+        self.assertEqual(holder.current_node_id, self.node.pk)
+        self.assertEqual(holder.message_id, self.message.pk)
+        with sharding.use_shard(
+            sharding.shard_for_workflow(self.workflow.pk)
+        ):
+            self.assertEqual(
+                list(Node.objects.values_list('pk', flat=True)),
+                [self.node.pk],
+            )
+
+    def test_new_workflows_go_to_least_loaded_shard(self):
+        """Test new workflows are placed on the emptiest shard"""
+        workflow = create_workflow(self.user)
+        self.assertEqual(workflow.shard, 'shard_1')
+        self.assertTrue(
+            Workflow.objects.using('shard_1').filter(pk=workflow.pk).exists()
+        )
+
+    def test_delete_workflow_recorded_once(self):
+        """Test deleting a sharded workflow is audited and fed once"""
+        workflow = create_workflow(self.user)
+        self.assertEqual(workflow.shard, 'shard_1')
+        pk = workflow.pk
+        with self.captureOnCommitCallbacks(execute=True), \
+                self.captureOnCommitCallbacks(using='shard_1', execute=True):
+            workflow.delete()
+        self.assertFalse(
+            Workflow.objects.using('shard_1').filter(pk=pk).exists()
+        )
+        deletes = {'object_id': pk, 'action': 'delete'}
+        self.assertEqual(
+            ChangeLogEntry.objects.filter(model='workflow', **deletes).count(),
+            1,
+        )
+        self.assertEqual(AuditEntry.objects.filter(**deletes).count(), 1)
+
+    def test_streamed_list_reads_workflow_shard(self):
+        """Test a streamed list is read from the shard of the workflow"""
+        workflow = create_workflow(self.user)
+        self.assertEqual(workflow.shard, 'shard_1')
+        with sharding.use_shard('shard_1'):
+            node = create_node(workflow)
+            message = create_message(self.user, node)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('message-list', kwargs={'workflow_pk': workflow.pk})
+        res = client.get(url, {'stream': 'true'})
+        self.assertEqual(res.status_code, 200)
+        body = json.loads(b''.join(res.streaming_content))
+        self.assertEqual([row['id'] for row in body], [message.pk])
+
+    def test_shard_queries_counted(self):
+        """Test request metrics count the queries sent to the shards"""
+        workflow = create_workflow(self.user)
+        self.assertEqual(workflow.shard, 'shard_1')
+        with sharding.use_shard('shard_1'):
+            create_node(workflow)
+        metrics.registry.reset()
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('node-list', kwargs={'workflow_pk': workflow.pk})
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections['shard_1']) as shard:
+            res = client.get(url)
+        self.assertEqual(res.status_code, 200)
+        self.assertGreater(len(shard), 0)
+        self.assertEqual(
+            metrics.db_queries_total.value(view='node-list'),
+            len(default) + len(shard),
+        )
+
+    def test_history_reads_workflow_shard(self):
+        """Test the history of a workflow is read from its shard"""
+        workflow = create_workflow(self.user)
+        self.assertEqual(workflow.shard, 'shard_1')
+        with sharding.use_shard('shard_1'):
+            node = create_node(workflow)
+            message = create_message(self.user, node)
+            history = History.objects.create(
+                histories=[{
+                    'user': self.user.pk,
+                    'timestamp': '2026-10-12T10:00:00Z',
+                    'status': 'approved',
+                    'node': '{}',
+                    'node_id': node.pk,
+                }],
+                content_object=message,
+                workflow=workflow,
+            )
+        client = APIClient()
+        client.force_authenticate(self.user)
+        res = client.get(
+            reverse('history:history-list'), {'workflow': workflow.pk}
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            [row['id'] for row in res.data['results']], [history.pk]
+        )
+        res = client.get(
+            reverse('history:history-activity'),
+            {'workflow': workflow.pk, 'status': 'approved'},
+        )
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            [row['id'] for row in res.data['results']], [history.pk]
+        )
+
+    def test_rolled_back_shard_change_not_published(self):
+        """Test a change rolled back on its shard is not fed nor versioned"""
+        workflow = create_workflow(self.user)
+        self.assertEqual(workflow.shard, 'shard_1')
+        with sharding.use_shard('shard_1'):
+            with self.captureOnCommitCallbacks(using='shard_1') as callbacks:
+                create_node(workflow)
+        workflow.refresh_from_db()
+        self.assertEqual(workflow.graph_version, 0)
+        self.assertFalse(
+            ChangeLogEntry.objects.filter(
+                model='node', workflow_id=workflow.pk
+            ).exists()
+        )
+        # committed on the shard
+        for callback in callbacks:
+            callback()
+        workflow.refresh_from_db()
+        self.assertEqual(workflow.graph_version, 1)
+        self.assertTrue(
+            ChangeLogEntry.objects.filter(
+                model='node', workflow_id=workflow.pk
+            ).exists()
+        )
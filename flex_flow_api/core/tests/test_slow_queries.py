@@ -0,0 +1,77 @@
+"""
+Test the slow query log and its summary command
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.models import Workflow
+from core.slow_queries import SlowQueryLogger, install, normalize_sql
+
+
+class SlowQueryLogTests(TestCase):
+    """Test recording and summarizing slow queries"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log_file = os.path.join(self.directory.name, 'slow.log')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _read_entries(self):
+        with open(self.log_file) as fp:
+            return [json.loads(line) for line in fp]
+
+    def test_slow_query_logged_with_project_stack(self):
+        """Test queries over the threshold are logged with their origin"""
+        with override_settings(SLOW_QUERY_LOG_FILE=self.log_file):
+            with connection.execute_wrapper(SlowQueryLogger(0)):
+                Workflow.objects.filter(title='slow').count()
+        entries = self._read_entries()
+        self.assertEqual(len(entries), 1)
+        self.assertIn('core_workflow', entries[0]['sql'])
+        self.assertEqual(entries[0]['params'], ['slow'])
+        self.assertTrue(
+            entries[0]['stack'][-1].startswith(
+                os.path.join('core', 'tests', 'test_slow_queries.py')
+            )
+        )
+
+    def test_fast_query_not_logged(self):
+        """Test queries under the threshold are ignored"""
+        with override_settings(SLOW_QUERY_LOG_FILE=self.log_file):
+            with connection.execute_wrapper(SlowQueryLogger(60)):
+                Workflow.objects.count()
+        self.assertFalse(os.path.exists(self.log_file))
+
+    def test_install_is_opt_in(self):
+        """Test the wrapper is only installed when a threshold is set"""
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=None):
+            install(sender=None, connection=connection)
+        self.assertFalse(any(
+            isinstance(wrapper, SlowQueryLogger)
+            for wrapper in connection.execute_wrappers
+        ))
+
+    def test_normalize_sql_collapses_in_lists(self):
+        """Test IN lists of different length are grouped together"""
+        self.assertEqual(
+            normalize_sql('SELECT 1 WHERE id IN (%s, %s)'),
+            normalize_sql('SELECT 1  WHERE id IN (%s)'),
+        )
+
+    def test_summary_command(self):
+        """Test the command lists offenders by total time"""
+        with override_settings(SLOW_QUERY_LOG_FILE=self.log_file):
+            with connection.execute_wrapper(SlowQueryLogger(0)):
+                Workflow.objects.filter(title='a').count()
+                Workflow.objects.filter(title='b').count()
+            out = StringIO()
+            call_command('slow_queries', '--by', 'location', stdout=out)
+        self.assertIn('test_slow_queries.py', out.getvalue())
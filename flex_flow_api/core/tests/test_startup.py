@@ -0,0 +1,62 @@
+"""
+Test startup profiling and the lazily loaded admin
+"""
+import io
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+
+from core.startup import by_package, parse_importtime
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     rest_framework.fields
+import time:       300 |        420 |   rest_framework.serializers
+import time:        50 |         50 |   workflow.events
+import time:        80 |        550 | workflow
+some other stderr line
+"""
+
+
+class StartupProfileTests(SimpleTestCase):
+    """Test the import time report"""
+
+    def test_parse_importtime(self):
+        """Test importtime lines are parsed and other lines skipped"""
+        self.assertEqual(
+            parse_importtime(IMPORTTIME.splitlines()),
+            [
+                ('rest_framework.fields', 120, 120),
+                ('rest_framework.serializers', 300, 420),
+                ('workflow.events', 50, 50),
+                ('workflow', 80, 550),
+            ],
+        )
+
+    def test_by_package(self):
+        """Test self times are summed per package, slowest first"""
+        modules = parse_importtime(IMPORTTIME.splitlines())
+        self.assertEqual(
+            by_package(modules),
+            [('rest_framework', 420, 2), ('workflow', 130, 2)],
+        )
+
+    def test_profile_startup_command(self):
+        """Test the command profiles a fresh worker"""
+        out = io.StringIO()
+        call_command('profile_startup', '--limit', '3', stdout=out)
+        output = out.getvalue()
+        self.assertIn('Time to first request', output)
+        self.assertIn('django.setup', output)
+        self.assertIn('AppConfig.ready()', output)
+
+
+class LazyAdminTests(TestCase):
+    """Test the admin still works when loaded on first use"""
+
+    def test_admin_login(self):
+        """Test the admin login page is served"""
+        res = self.client.get(reverse('admin:login'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
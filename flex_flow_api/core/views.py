@@ -0,0 +1,44 @@
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_GET, require_safe
+
+from core import metrics, schema
+
+
+@require_GET
+def metrics_view(request):
+    """Expose collected metrics for Prometheus scraping"""
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type=metrics.CONTENT_TYPE,
+    )
+
+
+@require_safe
+def schema_view(request):
+    """Serve the pre-generated OpenAPI schema, YAML unless JSON is asked"""
+    fmt = request.GET.get('format')
+    if fmt not in schema.CONTENT_TYPES:
+        fmt = schema.JSON if 'json' in request.headers.get('Accept', '') \
+            else schema.YAML
+    body, etag = schema.get_document(fmt)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type=schema.CONTENT_TYPES[fmt])
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    response['Vary'] = 'Accept'
+    return response
+
+
+_swagger_view = None
+
+
+def swagger_view(request, *args, **kwargs):
+    """Swagger UI, drf-spectacular's views are imported on first use"""
+    global _swagger_view
+    if _swagger_view is None:
+        from drf_spectacular.views import SpectacularSwaggerView
+        _swagger_view = SpectacularSwaggerView.as_view(url_name='schema')
+    return _swagger_view(request, *args, **kwargs)
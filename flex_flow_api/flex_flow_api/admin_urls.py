@@ -0,0 +1,12 @@
+"""
+URLs of the Django admin.
+
+Imported when an admin URL is first resolved or reversed instead of at
+startup, so workers only pay for admin autodiscovery and the ModelAdmin
+modules when the admin is actually used.
+"""
+from django.contrib import admin
+
+admin.autodiscover()
+
+urlpatterns = admin.site.get_urls()
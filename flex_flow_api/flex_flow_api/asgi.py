@@ -12,5 +12,10 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'flex_flow_api.settings')
+os.environ.setdefault('FLEXFLOW_ROOT_URLCONF', 'flex_flow_api.asgi_urls')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from workflow.event_stream import EventStreamASGIMiddleware  # noqa: E402
+
+application = EventStreamASGIMiddleware(django_application)
@@ -0,0 +1,39 @@
+"""
+URL configuration used under ASGI.
+
+The hot read endpoints are served by async views, every other route is
+the same as in flex_flow_api.urls.
+"""
+from django.urls import path
+
+from flex_flow_api import urls
+from history import async_views as history_views
+from workflow import async_views as workflow_views
+
+urlpatterns = [
+    path(
+        'api/workflow/<str:workflow_pk>/nodes/',
+        workflow_views.node_list,
+        name='async-node-list',
+    ),
+    path(
+        'api/workflow/<str:workflow_pk>/edges/',
+        workflow_views.edge_list,
+        name='async-edge-list',
+    ),
+    path(
+        'api/workflow/<str:workflow_pk>/messages/',
+        workflow_views.message_list,
+        name='async-message-list',
+    ),
+    path(
+        'api/workflow/<str:workflow_pk>/messages/<str:pk>/',
+        workflow_views.message_detail,
+        name='async-message-detail',
+    ),
+    path(
+        'api/history/',
+        history_views.history_list,
+        name='async-history-list',
+    ),
+] + urls.urlpatterns
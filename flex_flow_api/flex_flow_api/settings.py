@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -32,7 +33,9 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
-    'django.contrib.admin',
+    # no autodiscovery at startup, flex_flow_api.admin_urls runs it when
+    # the admin is first used
+    'django.contrib.admin.apps.SimpleAdminConfig',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
@@ -48,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -55,10 +59,14 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'core.middleware.IntegrityMiddleware'
+    'core.middleware.IntegrityMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
+    'core.middleware.ShardRoutingMiddleware',
+    'core.middleware.AuditMiddleware',
 ]
 
-ROOT_URLCONF = 'flex_flow_api.urls'
+# asgi.py switches to flex_flow_api.asgi_urls to serve the async views
+ROOT_URLCONF = os.environ.get('FLEXFLOW_ROOT_URLCONF', 'flex_flow_api.urls')
 
 TEMPLATES = [
     {
@@ -92,6 +100,84 @@ DATABASES = {
     }
 }
 
+# Read replicas of the default database (comma separated hosts), safe
+# requests read from them unless the client wrote in the last
+# REPLICA_STICKY_SECONDS, see core.db_router
+DATABASE_REPLICAS = []
+for _index, _host in enumerate(
+    filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))
+):
+    DATABASES[f'replica_{_index}'] = {
+        **DATABASES['default'],
+        'HOST': _host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{_index}')
+
+REPLICA_STICKY_SECONDS = 5
+# must be shared by all workers for stickiness to follow a client around,
+# the core.E001 check refuses replicas with a per-process (locmem) cache
+REPLICA_STICKY_CACHE_ALIAS = os.environ.get(
+    'REPLICA_STICKY_CACHE_ALIAS', 'default'
+)
+
+# Databases holding the workflows (comma separated aliases of DATABASES,
+# e.g. default,shard_1), leave unset to keep everything on default. Extra
+# aliases are configured from DB_<ALIAS>_HOST and DB_<ALIAS>_NAME (e.g.
+# DB_SHARD_1_HOST), see core.sharding
+DATABASE_SHARDS = list(
+    filter(None, os.environ.get('DB_SHARDS', '').split(','))
+)
+for _alias in DATABASE_SHARDS:
+    if _alias not in DATABASES:
+        _prefix = f'DB_{_alias.upper()}_'
+        DATABASES[_alias] = {
+            **DATABASES['default'],
+            'HOST': os.environ.get(f'{_prefix}HOST'),
+            'NAME': os.environ.get(f'{_prefix}NAME'),
+        }
+# a second shard for the tests of core.sharding, only routed to when a test
+# lists it in DATABASE_SHARDS
+if sys.argv[1:2] == ['test'] and 'shard_1' not in DATABASES:
+    DATABASES['shard_1'] = {
+        **DATABASES['default'],
+        'NAME': f"{DATABASES['default']['NAME']}_shard_1",
+    }
+SHARD_MAP_CACHE_SIZE = 100000
+SHARD_MAP_CACHE_TTL = 30
+DATABASE_ROUTERS = [
+    'core.sharding.ShardRouter',
+    'core.db_router.ReplicaRouter',
+]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# the 'graph' cache holds rendered node/edge lists and workflow details,
+# point it at a FileBasedCache directory to share it between workers
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'graph': {
+        'BACKEND': os.environ.get(
+            'GRAPH_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('GRAPH_CACHE_LOCATION', 'graph'),
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 1000,
+        },
+    },
+}
+
+GRAPH_CACHE_ALIAS = 'graph'
+GRAPH_CACHE_MAX_ENTRY_SIZE = 1024 * 1024
+GRAPH_CACHE_LOCK_TIMEOUT = 10
+GRAPH_CACHE_LOCK_WAIT = 2
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -137,7 +223,78 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.IdCursorPagination",
 }
 
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+# rows fetched per round trip by ?stream=true list responses
+STREAMING_CHUNK_SIZE = 500
+
 
 AUTH_USER_MODEL = 'core.User'
+
+
+# Directory shared by all workers to aggregate metrics exposed at /metrics,
+# leave unset to only report the metrics of the worker serving the scrape
+METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')
+
+# Opt-in slow query log, queries slower than the threshold (milliseconds)
+# are written with the project frames that issued them, see the
+# `slow_queries` management command for a summary
+SLOW_QUERY_THRESHOLD_MS = os.environ.get('SLOW_QUERY_THRESHOLD_MS')
+SLOW_QUERY_LOG_FILE = os.environ.get(
+    'SLOW_QUERY_LOG_FILE',
+    BASE_DIR / 'slow_queries.log',
+)
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUP_COUNT = 3
+SLOW_QUERY_STACK_DEPTH = 5
+
+# Cached token authentication, see user.authentication. Deleted tokens and
+# deactivated users keep working on other workers for up to the TTL.
+TOKEN_CACHE_MAX_SIZE = 10000
+TOKEN_CACHE_TTL = 5
+
+# Tokens issued by the login endpoint, 'db' for authtoken tokens or
+# 'signed' for stateless signed access/refresh tokens
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'db')
+SIGNED_ACCESS_TOKEN_TTL = 15 * 60
+SIGNED_REFRESH_TOKEN_TTL = 7 * 24 * 60 * 60
+SIGNED_TOKEN_REVOCATION_SYNC_INTERVAL = 30
+
+# Processes hashing passwords for the bulk user import endpoint
+USER_IMPORT_WORKERS = int(os.environ.get('USER_IMPORT_WORKERS', 2))
+
+# Server-Sent Events of message holders, 'auto' uses LISTEN/NOTIFY on
+# PostgreSQL and an in-process broker otherwise
+EVENT_BROKER = os.environ.get('EVENT_BROKER', 'auto')
+EVENT_STREAM_HEARTBEAT = 15
+EVENT_STREAM_QUEUE_SIZE = 1000
+
+# Webhook delivery of outbox events, see workflow.outbox and the
+# `dispatch_webhooks` management command
+WEBHOOK_TIMEOUT = 10
+WEBHOOK_BATCH_SIZE = 100
+WEBHOOK_DISPATCH_LIMIT = 1000
+WEBHOOK_MAX_ATTEMPTS = 10
+WEBHOOK_RETRY_BASE_DELAY = 30
+WEBHOOK_RETRY_MAX_DELAY = 6 * 60 * 60
+# seconds a claimed event is hidden from other dispatchers
+WEBHOOK_DELIVERY_LEASE = 5 * 60
+# allow webhooks to loopback, private and link-local hosts, development only
+WEBHOOK_ALLOW_PRIVATE_HOSTS = False
+
+# Entries per call of the change feed at /api/history/changes/
+CHANGE_FEED_PAGE_SIZE = 500
+
+# `compact_history` archives the history entries older than this
+HISTORY_COLD_AFTER_DAYS = 90
+HISTORY_ARCHIVE_CODEC = 'zlib'
+
+# OpenAPI schema artifact written by `build_schema`, generated on the
+# first request when missing. The image keeps it outside /app, which the
+# development compose file mounts over
+OPENAPI_SCHEMA_FILE = Path(
+    os.environ.get('OPENAPI_SCHEMA_FILE', BASE_DIR / 'openapi.json')
+)
@@ -14,28 +14,26 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
-from django.urls import path, include
-from drf_spectacular.views import (
-    SpectacularSwaggerView,
-    SpectacularAPIView
-)
+from django.urls import URLResolver, include, path
+from django.urls.resolvers import RoutePattern
+
+from core.views import metrics_view, schema_view, swagger_view
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/schema/',
-         SpectacularAPIView.as_view(),
-         name='schema'
-         ),
-    path(
-        'api/docs/',
-        SpectacularSwaggerView.as_view(url_name='schema'),
-        name='swagger-ui'
-    ),
+    path('metrics', metrics_view, name='metrics'),
+    path('api/schema/', schema_view, name='schema'),
+    path('api/docs/', swagger_view, name='swagger-ui'),
     path(
         'api/users/',
         include('user.urls')
     ),
     path('api/workflow/', include('workflow.urls')),
-    path('api/history/', include('history.urls'))
+    path('api/history/', include('history.urls')),
+    # the admin URLconf is imported on first use, see admin_urls
+    URLResolver(
+        RoutePattern('admin/'),
+        'flex_flow_api.admin_urls',
+        app_name='admin',
+        namespace='admin',
+    ),
 ]
@@ -1,6 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class HistoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'history'
+
+    def ready(self):
+        from history import audit
+        from history.changes import (
+            TRACKED_MODELS,
+            model_deleted,
+            model_saved,
+        )
+        for model in TRACKED_MODELS:
+            post_save.connect(model_saved, sender=model)
+            post_delete.connect(model_deleted, sender=model)
+        for model in audit.AUDITED_MODELS:
+            post_save.connect(audit.model_saved, sender=model)
+            post_delete.connect(audit.model_deleted, sender=model)
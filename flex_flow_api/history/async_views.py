@@ -0,0 +1,26 @@
+"""
+Async version of the history list, routed under ASGI by
+flex_flow_api.asgi_urls.
+"""
+from asgiref.sync import sync_to_async
+
+from core.async_views import async_read_view, json_response, render_page
+from history.views import (
+    HistoryViewSet,
+    history_queryset,
+    history_serializer_class,
+)
+
+
+def _render_history_page(request):
+    return render_page(
+        request,
+        history_queryset(request.GET),
+        history_serializer_class(request.GET),
+    )
+
+
+@async_read_view(HistoryViewSet.as_view({'get': 'list'}))
+async def history_list(request, user):
+    content = await sync_to_async(_render_history_page)(request)
+    return json_response(content)
@@ -0,0 +1,104 @@
+"""
+Audit trail of the workflow definitions.
+
+Saves and deletes of a Workflow, Node or Edge become ``AuditEntry`` rows
+naming the user who made them. The entries are not written with the
+change: ``AuditMiddleware`` collects those of a request in an
+``AuditBuffer``, an entry joins it when its transaction commits (so rolled
+back changes are not audited) and the buffer is written with one
+``bulk_create`` once the response is ready. Outside requests each entry
+is written when its transaction commits, without a user.
+"""
+import contextvars
+import logging
+from contextlib import contextmanager
+from functools import partial
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from core import sharding
+from core.models import AuditEntry, ChangeLogEntry, Edge, Node, Workflow
+from history.changes import snapshot
+
+logger = logging.getLogger(__name__)
+
+AUDITED_MODELS = (Workflow, Node, Edge)
+
+_buffer = contextvars.ContextVar('audit_buffer', default=None)
+
+
+class AuditBuffer:
+    """Committed audit entries of one request"""
+
+    def __init__(self):
+        self.entries = []
+
+    def flush(self, user=None):
+        """Write the entries, attributed to ``user``, in one insert"""
+        entries, self.entries = self.entries, []
+        if not entries:
+            return
+        user_id = user.pk if user is not None and \
+            user.is_authenticated else None
+        for entry in entries:
+            entry.user_id = user_id
+        try:
+            AuditEntry.objects.bulk_create(entries)
+        except Exception:
+            # the changes are committed, a lost audit must not fail them
+            logger.exception('Failed to write %s audit entries', len(entries))
+
+
+@contextmanager
+def buffered():
+    """Collect the audit entries committed in the block"""
+    buffer = AuditBuffer()
+    token = _buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _buffer.reset(token)
+
+
+def _workflow_id(instance):
+    if isinstance(instance, Workflow):
+        return instance.pk
+    return instance.workflow_id
+
+
+def _record(instance, action, data, using):
+    entry = AuditEntry(
+        content_type=ContentType.objects.get_for_model(type(instance)),
+        object_id=instance.pk,
+        action=action,
+        workflow_id=_workflow_id(instance),
+        data=data,
+        created_at=timezone.now(),
+    )
+    buffer = _buffer.get()
+    if buffer is None:
+        write = partial(AuditEntry.objects.bulk_create, [entry])
+    else:
+        write = partial(buffer.entries.append, entry)
+    # runs right away outside an atomic block
+    transaction.on_commit(write, using=using)
+
+
+def model_saved(sender, instance, created, raw=False, using=None,
+                **kwargs):
+    """post_save receiver for the audited models"""
+    if raw:
+        return
+    action = ChangeLogEntry.ActionChoices.CREATE if created \
+        else ChangeLogEntry.ActionChoices.UPDATE
+    _record(instance, action, snapshot(instance), using)
+
+
+def model_deleted(sender, instance, using=None, **kwargs):
+    """post_delete receiver for the audited models"""
+    if sharding.is_shard_copy(instance, using):
+        # recorded when the workflow itself was deleted on default
+        return
+    _record(instance, ChangeLogEntry.ActionChoices.DELETE, None, using)
@@ -0,0 +1,138 @@
+"""
+Change log of the replicated models for incremental downstream sync.
+
+Every save and delete of a Workflow, Node, Edge, Message or MessageHolder
+appends a ``ChangeLogEntry`` with a snapshot of the row. The feed is
+ordered by ``(transaction_id, id)``: on PostgreSQL ``transaction_id`` is
+the writing transaction and entries are only served once every older
+transaction has finished, so a consumer that resumes from its last cursor
+never skips an entry that committed late. Other databases serialize
+writes and order by ``id`` alone.
+
+Changes made on another shard are logged once their transaction commits
+there.
+
+Bulk ``QuerySet.update``/``bulk_create`` calls bypass the signals and are
+not logged.
+"""
+from django.db import connections, router, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from core import sharding
+from core.models import (
+    ChangeLogEntry,
+    Edge,
+    Message,
+    MessageHolder,
+    Node,
+    Workflow,
+)
+from workflow.events import holder_workflow_id
+
+TRACKED_MODELS = {
+    Workflow: 'workflow',
+    Node: 'node',
+    Edge: 'edge',
+    Message: 'message',
+    MessageHolder: 'messageholder',
+}
+# maintained with F() updates, snapshots would carry stale values
+EXCLUDED_FIELDS = {'graph_version'}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _is_postgres():
+    alias = router.db_for_write(ChangeLogEntry)
+    return connections[alias].vendor == 'postgresql'
+
+
+def _workflow_id(instance):
+    if isinstance(instance, Workflow):
+        return instance.pk
+    if isinstance(instance, MessageHolder):
+        return holder_workflow_id(instance)
+    return getattr(instance, 'workflow_id', None)
+
+
+def snapshot(instance):
+    data = {}
+    for field in instance._meta.concrete_fields:
+        value = field.value_from_object(instance)
+        if field.name in EXCLUDED_FIELDS or \
+                hasattr(value, 'resolve_expression'):
+            continue
+        data[field.attname] = value
+    return data
+
+
+def _record(instance, action, data, using):
+    entry = ChangeLogEntry(
+        model=TRACKED_MODELS[type(instance)],
+        object_id=instance.pk,
+        action=action,
+        workflow_id=_workflow_id(instance),
+        data=data,
+    )
+    if _is_postgres():
+        entry.transaction_id = RawSQL('txid_current()', [])
+    if using == router.db_for_write(ChangeLogEntry):
+        entry.save()
+    else:
+        # the change commits on its shard, not with the change log
+        transaction.on_commit(entry.save, using=using)
+
+
+def model_saved(sender, instance, created, raw=False, using=None,
+                **kwargs):
+    """post_save receiver for the tracked models"""
+    if raw:
+        return
+    action = ChangeLogEntry.ActionChoices.CREATE if created \
+        else ChangeLogEntry.ActionChoices.UPDATE
+    _record(instance, action, snapshot(instance), using)
+
+
+def model_deleted(sender, instance, using=None, **kwargs):
+    """post_delete receiver for the tracked models"""
+    if sharding.is_shard_copy(instance, using):
+        # recorded when the workflow itself was deleted on default
+        return
+    _record(instance, ChangeLogEntry.ActionChoices.DELETE, None, using)
+
+
+def encode_cursor(entry):
+    return f'{entry.transaction_id}.{entry.id}'
+
+
+def decode_cursor(cursor):
+    try:
+        transaction_id, entry_id = (int(part) for part in cursor.split('.'))
+    except (TypeError, ValueError):
+        raise InvalidCursor('Invalid cursor.')
+    return transaction_id, entry_id
+
+
+def changes_after(cursor=None, limit=500, models=None):
+    """
+    Return up to ``limit`` entries after ``cursor`` and whether more are
+    ready to be read.
+    """
+    queryset = ChangeLogEntry.objects.order_by('transaction_id', 'id')
+    if cursor:
+        transaction_id, entry_id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(transaction_id__gt=transaction_id)
+            | Q(transaction_id=transaction_id, id__gt=entry_id)
+        )
+    if models:
+        queryset = queryset.filter(model__in=models)
+    if _is_postgres():
+        queryset = queryset.filter(transaction_id__lt=RawSQL(
+            'txid_snapshot_xmin(txid_current_snapshot())', []
+        ))
+    entries = list(queryset[:limit + 1])
+    return entries[:limit], len(entries) > limit
@@ -0,0 +1,98 @@
+"""
+Compaction of the cold part of the history timelines.
+
+Entries are appended to ``History.histories`` in time order, so the ones
+older than a cutoff are a prefix of the array. ``compact_history`` moves
+that prefix into the compressed ``archive`` column of the same row, the
+JSON array only keeps the recent entries. The lists never load
+``archive``, ``History.timeline()`` decompresses it when a client asks
+for the full timeline with ``?full=true``.
+"""
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.compression import dumps, pack, unpack
+from core.models import History
+
+
+def cold_prefix(entries, before):
+    """Number of leading ``entries`` with a timestamp before ``before``"""
+    count = 0
+    for entry in entries:
+        timestamp = entry.get('timestamp') if isinstance(entry, dict) else None
+        parsed = parse_datetime(timestamp) if timestamp else None
+        if parsed is None:
+            break
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        if parsed >= before:
+            break
+        count += 1
+    return count
+
+
+def compact_history(history_id, before, codec='zlib', dry_run=False):
+    """
+    Archive the entries of a history older than ``before``.
+
+    Returns ``(entries, json_bytes, archive_bytes)``: the number of entries
+    moved, the size of their JSON and how much the archive grew.
+    """
+    using = router.db_for_write(History)
+    with transaction.atomic(using=using):
+        # status changes append under the same lock
+        history = History.objects.using(using).select_for_update().get(
+            pk=history_id
+        )
+        count = cold_prefix(history.histories, before)
+        if not count:
+            return 0, 0, 0
+        cold = history.histories[:count]
+        archived = unpack(history.archive, history.archive_codec) or []
+        archive = pack(archived + cold, codec)
+        growth = len(archive) - len(history.archive or b'')
+        if not dry_run:
+            history.archive = archive
+            history.archive_codec = codec
+            history.archived_count = len(archived) + count
+            history.histories = history.histories[count:]
+            history.save(update_fields=[
+                'archive', 'archive_codec', 'archived_count', 'histories',
+            ])
+        return count, len(dumps(cold)), growth
+
+
+def compact_histories(before, codec='zlib', dry_run=False):
+    """
+    Compact every history with entries older than ``before``, return
+    ``(histories, entries, json_bytes, archive_bytes)`` totals.
+    """
+    totals = [0, 0, 0, 0]
+    # created_at is the time of the oldest entry, archived or not
+    candidates = History.objects.filter(
+        created_at__lt=before,
+    ).values_list('pk', flat=True)
+    for history_id in list(candidates):
+        entries, raw, packed = compact_history(
+            history_id, before, codec, dry_run
+        )
+        if entries:
+            totals[0] += 1
+            totals[1] += entries
+            totals[2] += raw
+            totals[3] += packed
+    return tuple(totals)
+
+
+def table_size(using=None):
+    """Bytes on disk of the history table and its TOAST data, if known"""
+    using = using or router.db_for_write(History)
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT pg_total_relation_size(%s)', [History._meta.db_table]
+        )
+        return cursor.fetchone()[0]
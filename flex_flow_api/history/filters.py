@@ -0,0 +1,403 @@
+"""
+Filters of the history list and slicing of the ``histories`` arrays.
+
+``filter_histories`` narrows the list with the indexed columns:
+``?content_type=message&object_id=1``, ``?workflow=``, ``?actor=`` (a user
+who added an entry), ``?since=`` and ``?until=`` (ISO 8601, histories with
+entries in that range).
+
+``slice_histories`` keeps only the last ``?last=N`` entries and/or the
+``?entry_fields=status,timestamp`` keys of each entry. The array is cut in
+the database, the full array never leaves it, and ``entry_count`` tells
+how many entries there are in total. Slices only cover the entries not yet
+archived by ``history.compaction``, ``?full=true`` returns the whole
+timeline instead.
+
+``activity_histories`` finds the entries a user, a status and/or a node
+appear in (``?user=3&status=approved&node=7``) with a containment query,
+served by the GIN index on ``histories`` on PostgreSQL.
+"""
+import json
+import re
+from datetime import datetime, time
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import NotSupportedError
+from django.db.models import (
+    BooleanField,
+    F,
+    Func,
+    IntegerField,
+    JSONField,
+)
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ParseError
+from rest_framework.fields import DateTimeField
+
+from core import sharding
+
+FILTER_PARAMS = (
+    'content_type',
+    'object_id',
+    'workflow',
+    'actor',
+    'since',
+    'until',
+)
+SLICE_PARAMS = ('last', 'entry_fields')
+TIMELINE_PARAM = 'full'
+ACTIVITY_PARAMS = ('user', 'status', 'node')
+ENTRY_STATUSES = ('approved', 'rejected')
+KEY = re.compile(r'^\w+$')
+# largest BigAutoField id and History.object_id (PositiveBigIntegerField)
+MAX_ID = 2 ** 63 - 1
+MAX_OBJECT_ID = MAX_ID
+
+
+class JSONArrayLength(Func):
+    output_field = IntegerField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, function='jsonb_array_length',
+            **extra_context,
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler, connection, function='json_array_length',
+            **extra_context,
+        )
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f'JSON array length is not supported on {connection.vendor}'
+        )
+
+
+class JSONArraySlice(Func):
+    """
+    The last ``last`` elements of a JSON array of objects, only their
+    ``keys`` when given (missing keys become null).
+    """
+    output_field = JSONField()
+
+    def __init__(self, expression, last=None, keys=None):
+        super().__init__(expression)
+        self.last = last
+        self.keys = list(keys or ())
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        array, params = compiler.compile(self.source_expressions[0])
+        element, element_params = 'e.value', []
+        if self.keys:
+            element = 'jsonb_build_object({})'.format(
+                ', '.join(['%s, e.value -> %s'] * len(self.keys))
+            )
+            element_params = [key for key in self.keys for _ in (0, 1)]
+        where, where_params = '', []
+        if self.last is not None:
+            where = f'WHERE e.ordinality > jsonb_array_length({array}) - %s'
+            where_params = [*params, self.last]
+        return (
+            f'COALESCE((SELECT jsonb_agg({element} ORDER BY e.ordinality) '
+            f'FROM jsonb_array_elements({array}) WITH ORDINALITY '
+            f"AS e(value, ordinality) {where}), '[]'::jsonb)",
+            [*element_params, *params, *where_params],
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        array, params = compiler.compile(self.source_expressions[0])
+        element, element_params = 'json(e.value)', []
+        if self.keys:
+            element = 'json_object({})'.format(
+                ', '.join(['%s, e.value -> %s'] * len(self.keys))
+            )
+            element_params = [key for key in self.keys for _ in (0, 1)]
+        where, where_params = '', []
+        if self.last is not None:
+            where = f'WHERE key >= json_array_length({array}) - %s'
+            where_params = [*params, self.last]
+        return (
+            f'COALESCE((SELECT json_group_array({element}) FROM '
+            f'(SELECT value FROM json_each({array}) {where} ORDER BY key) '
+            f"AS e), '[]')",
+            [*element_params, *params, *where_params],
+        )
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f'JSON array slicing is not supported on {connection.vendor}'
+        )
+
+
+class EntryMatch:
+    """
+    Condition on the entries of a JSON array having every key/value of
+    ``criteria``, and a ``timestamp`` in ``[since, until]`` when given.
+    """
+
+    def __init__(self, criteria, since=None, until=None):
+        self.criteria = criteria
+        self.since = since
+        self.until = until
+
+    def postgresql(self):
+        where = ['e.value @> %s::jsonb']
+        params = [json.dumps(self.criteria)]
+        return self._range(
+            where, params,
+            lambda value: f'({value})::timestamptz',
+            "e.value ->> 'timestamp'",
+        )
+
+    def sqlite(self):
+        where, params = [], []
+        for key, value in self.criteria.items():
+            where.append('json_extract(e.value, %s) = %s')
+            params += [f'$.{key}', value]
+        return self._range(
+            where, params,
+            lambda value: f'julianday({value})',
+            "json_extract(e.value, '$.timestamp')",
+        )
+
+    def _range(self, where, params, as_time, timestamp):
+        # compared as times, not text: ISO strings with and without
+        # fractional seconds (or other offsets) do not sort as text
+        if self.since is not None:
+            where.append(f'{as_time(timestamp)} >= {as_time("%s")}')
+            params.append(self.since)
+        if self.until is not None:
+            where.append(f'{as_time(timestamp)} <= {as_time("%s")}')
+            params.append(self.until)
+        return ' AND '.join(where), params
+
+
+class JSONArrayContains(Func):
+    """Whether a JSON array has an entry matching an ``EntryMatch``"""
+    output_field = BooleanField()
+
+    def __init__(self, expression, match):
+        super().__init__(expression)
+        self.match = match
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        array, params = compiler.compile(self.source_expressions[0])
+        # the containment alone is what the GIN index answers
+        sql = f'{array} @> %s::jsonb'
+        contains = [*params, json.dumps([self.match.criteria])]
+        if self.match.since is None and self.match.until is None:
+            return sql, contains
+        where, where_params = self.match.postgresql()
+        return (
+            f'({sql} AND EXISTS (SELECT 1 FROM jsonb_array_elements('
+            f'{array}) AS e(value) WHERE {where}))',
+            [*contains, *params, *where_params],
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        array, params = compiler.compile(self.source_expressions[0])
+        where, where_params = self.match.sqlite()
+        return (
+            f'EXISTS (SELECT 1 FROM json_each({array}) AS e WHERE {where})',
+            [*params, *where_params],
+        )
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f'JSON containment is not supported on {connection.vendor}'
+        )
+
+
+class JSONArrayFilter(Func):
+    """The entries of a JSON array matching an ``EntryMatch``, in order"""
+    output_field = JSONField()
+
+    def __init__(self, expression, match):
+        super().__init__(expression)
+        self.match = match
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        array, params = compiler.compile(self.source_expressions[0])
+        where, where_params = self.match.postgresql()
+        return (
+            f'COALESCE((SELECT jsonb_agg(e.value ORDER BY e.ordinality) '
+            f'FROM jsonb_array_elements({array}) WITH ORDINALITY '
+            f"AS e(value, ordinality) WHERE {where}), '[]'::jsonb)",
+            [*params, *where_params],
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        array, params = compiler.compile(self.source_expressions[0])
+        where, where_params = self.match.sqlite()
+        return (
+            f'COALESCE((SELECT json_group_array(json(m.value)) FROM '
+            f'(SELECT e.value FROM json_each({array}) AS e WHERE {where} '
+            f"ORDER BY e.key) AS m), '[]')",
+            [*params, *where_params],
+        )
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f'JSON array filtering is not supported on {connection.vendor}'
+        )
+
+
+def _int_param(params, name, minimum=0, maximum=MAX_ID):
+    try:
+        value = int(params[name])
+    except ValueError:
+        raise ParseError(f'{name} must be an integer.')
+    if value < minimum:
+        raise ParseError(f'{name} must be at least {minimum}.')
+    if value > maximum:
+        raise ParseError(f'{name} must be at most {maximum}.')
+    return value
+
+
+def _time_param(params, name):
+    value = params[name]
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError(value)
+            parsed = datetime.combine(day, time.min)
+    except ValueError:
+        raise ParseError(f'{name} must be an ISO 8601 date or time.')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _content_type(value):
+    app_label, _, model = value.lower().rpartition('.')
+    content_types = ContentType.objects.filter(model=model)
+    if app_label:
+        content_types = content_types.filter(app_label=app_label)
+    content_type = content_types.first()
+    if content_type is None:
+        raise ParseError(f'Unknown content type {value}.')
+    return content_type
+
+
+def filter_histories(queryset, params):
+    """Apply the ``FILTER_PARAMS`` found in ``params`` to ``queryset``"""
+    if params.get('content_type'):
+        queryset = queryset.filter(
+            content_type=_content_type(params['content_type'])
+        )
+    if params.get('object_id'):
+        queryset = queryset.filter(object_id=_int_param(
+            params, 'object_id', maximum=MAX_OBJECT_ID
+        ))
+    if params.get('workflow'):
+        workflow_id = _int_param(params, 'workflow')
+        queryset = queryset.filter(workflow_id=workflow_id)
+        if sharding.sharding_enabled():
+            # the histories of a workflow live on its shard
+            queryset = queryset.using(
+                sharding.shard_for_workflow(workflow_id)
+            )
+    if params.get('actor'):
+        queryset = queryset.filter(
+            actors__user_id=_int_param(params, 'actor')
+        )
+    if params.get('since'):
+        queryset = queryset.filter(
+            updated_at__gte=_time_param(params, 'since')
+        )
+    if params.get('until'):
+        queryset = queryset.filter(
+            created_at__lte=_time_param(params, 'until')
+        )
+    return queryset
+
+
+def wants_slice(params):
+    return any(params.get(name) for name in SLICE_PARAMS)
+
+
+def wants_timeline(params):
+    if params.get(TIMELINE_PARAM) not in ('1', 'true'):
+        return False
+    if wants_slice(params):
+        raise ParseError(
+            f"{TIMELINE_PARAM} cannot be combined with "
+            f"{' or '.join(SLICE_PARAMS)}."
+        )
+    return True
+
+
+def load_histories(queryset, params):
+    """
+    Leave the compressed archive of ``queryset`` in the database unless
+    ``params`` ask for the full timeline, slice when asked to.
+    """
+    if wants_timeline(params):
+        return queryset
+    queryset = queryset.defer('archive')
+    if wants_slice(params):
+        queryset = slice_histories(queryset, params)
+    return queryset
+
+
+def slice_histories(queryset, params):
+    """
+    Replace the ``histories`` column of ``queryset`` by the slice asked for
+    in ``params``, as the ``histories_slice`` and ``entry_count``
+    annotations rendered by ``HistorySliceSerializer``.
+    """
+    last = _int_param(params, 'last') if params.get('last') else None
+    keys = None
+    if params.get('entry_fields'):
+        keys = [
+            key.strip() for key in params['entry_fields'].split(',')
+            if key.strip()
+        ]
+        invalid = [key for key in keys if not KEY.match(key)]
+        if invalid:
+            raise ParseError(f"Invalid entry fields: {', '.join(invalid)}")
+    return queryset.defer('histories').annotate(
+        histories_slice=JSONArraySlice('histories', last=last, keys=keys),
+        entry_count=JSONArrayLength('histories') + F('archived_count'),
+    )
+
+
+def activity_histories(queryset, params):
+    """
+    Histories with entries matching the ``ACTIVITY_PARAMS`` and the
+    ``?since=``/``?until=`` range of ``params``, annotated with those
+    entries as ``activity``. The ``FILTER_PARAMS`` apply too.
+    """
+    criteria = {}
+    if params.get('user'):
+        criteria['user'] = _int_param(params, 'user')
+    if params.get('status'):
+        if params['status'] not in ENTRY_STATUSES:
+            raise ParseError(
+                f"status must be one of {', '.join(ENTRY_STATUSES)}."
+            )
+        criteria['status'] = params['status']
+    if params.get('node'):
+        criteria['node_id'] = _int_param(params, 'node')
+    if not criteria:
+        raise ParseError(
+            f"Pass at least one of {', '.join(ACTIVITY_PARAMS)}."
+        )
+    rendered = DateTimeField().to_representation
+    match = EntryMatch(
+        criteria,
+        since=(rendered(_time_param(params, 'since'))
+               if params.get('since') else None),
+        until=(rendered(_time_param(params, 'until'))
+               if params.get('until') else None),
+    )
+    return filter_histories(queryset, params).filter(
+        JSONArrayContains('histories', match)
+    ).defer('histories', 'archive').annotate(
+        activity=JSONArrayFilter('histories', match),
+    )
@@ -0,0 +1,129 @@
+"""
+Django command to benchmark the activity report on generated histories
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import History, Message
+from history.filters import activity_histories
+
+QUERIES = (
+    ('user', ('user',)),
+    ('user+status', ('user', 'status')),
+    ('user+status+node', ('user', 'status', 'node')),
+)
+
+
+def _histories(count, entries, users, nodes, first_id):
+    content_type = ContentType.objects.get_for_model(Message)
+    start = timezone.now() - timedelta(days=365)
+    for index in range(count):
+        created = start + timedelta(minutes=random.randrange(500000))
+        histories = []
+        for step in range(entries):
+            node = random.randrange(1, nodes + 1)
+            histories.append({
+                'user': random.randrange(1, users + 1),
+                'timestamp': (created + timedelta(hours=step)).isoformat()
+                .replace('+00:00', 'Z'),
+                'status': random.choice(('approved', 'approved', 'rejected')),
+                'node': f"{{'id': {node}}}",
+                'node_id': node,
+            })
+        yield History(
+            histories=histories,
+            content_type=content_type,
+            object_id=first_id + index,
+            created_at=created,
+            updated_at=created + timedelta(hours=entries),
+        )
+
+
+class Command(BaseCommand):
+    help = 'Generate histories and time the activity report queries, ' \
+           'rolled back at the end'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--histories', type=int, default=100000)
+        parser.add_argument('--entries', type=int, default=20)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--nodes', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['histories'] < 1 or options['repeat'] < 1:
+            raise CommandError('--histories and --repeat must be >= 1')
+        with transaction.atomic():
+            self._run(options)
+            transaction.set_rollback(True)
+
+    def _run(self, options):
+        start = time.perf_counter()
+        rows = _histories(
+            options['histories'],
+            options['entries'],
+            options['users'],
+            options['nodes'],
+            first_id=10 ** 9,
+        )
+        batch = []
+        for history in rows:
+            batch.append(history)
+            if len(batch) == 1000:
+                History.objects.bulk_create(batch)
+                batch = []
+        History.objects.bulk_create(batch)
+        postgres = connection.vendor == 'postgresql'
+        if postgres:
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {History._meta.db_table}')
+        self.stdout.write(
+            f"Generated {options['histories']} histories, "
+            f"{options['histories'] * options['entries']} entries in "
+            f'{time.perf_counter() - start:.1f}s on {connection.vendor}'
+        )
+        # the GIN index only exists on PostgreSQL
+        plans = [('gin index' if postgres else 'scan', [])]
+        if postgres:
+            plans.append(('sequential scan', [
+                'SET LOCAL enable_bitmapscan = off',
+                'SET LOCAL enable_indexscan = off',
+            ]))
+        for plan, statements in plans:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for statement in statements:
+                        cursor.execute(statement)
+                for name, params in QUERIES:
+                    self._time(plan, name, params, options)
+                transaction.set_rollback(True)
+
+    def _time(self, plan, name, params, options):
+        timings = []
+        for _ in range(options['repeat']):
+            values = {
+                'user': str(random.randrange(1, options['users'] + 1)),
+                'status': 'approved',
+                'node': str(random.randrange(1, options['nodes'] + 1)),
+            }
+            queryset = activity_histories(
+                History.objects.all(),
+                {key: values[key] for key in params},
+            ).order_by('id')[:settings.API_PAGE_SIZE]
+            start = time.perf_counter()
+            found = len(list(queryset))
+            timings.append(time.perf_counter() - start)
+        self.stdout.write(
+            f'{plan:<16} {name:<18} median '
+            f'{statistics.median(timings) * 1000:9.1f} ms, '
+            f'last page had {found} histories'
+        )
@@ -0,0 +1,78 @@
+"""
+Django command to compress the cold history entries
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.compression import CODECS
+from core.sharding import shard_aliases, use_shard
+from history.compaction import compact_histories, table_size
+
+
+def _size(count):
+    if abs(count) < 1024:
+        return f'{count} B'
+    for unit in ('KiB', 'MiB', 'GiB'):
+        count /= 1024
+        if abs(count) < 1024:
+            break
+    return f'{count:.1f} {unit}'
+
+
+class Command(BaseCommand):
+    help = 'Move the history entries older than a threshold to a ' \
+           'compressed column'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            default=None,
+            help='Age in days of the entries to archive, defaults to '
+                 'HISTORY_COLD_AFTER_DAYS',
+        )
+        parser.add_argument(
+            '--codec',
+            choices=sorted(CODECS),
+            default=None,
+            help='Compression of the archive, defaults to '
+                 'HISTORY_ARCHIVE_CODEC',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report the space that would be reclaimed, change nothing',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        days = options['older_than']
+        if days is None:
+            days = settings.HISTORY_COLD_AFTER_DAYS
+        codec = options['codec'] or settings.HISTORY_ARCHIVE_CODEC
+        before = timezone.now() - timedelta(days=days)
+        for alias in shard_aliases():
+            with use_shard(alias):
+                size = table_size()
+                histories, entries, raw, packed = compact_histories(
+                    before, codec, options['dry_run']
+                )
+                after = table_size()
+            saved = raw - packed
+            self.stdout.write(
+                f'{alias}: {histories} histories, {entries} entries older '
+                f'than {days} days, {_size(raw)} of JSON stored as '
+                f'{_size(packed)} of {codec} (saved {_size(saved)}'
+                + (f', {saved / raw:.0%})' if raw else ')')
+            )
+            if size is not None:
+                self.stdout.write(
+                    f'{alias}: history table {_size(size)} -> '
+                    f'{_size(after)}, VACUUM returns the space of the '
+                    'rewritten rows'
+                )
+        if options['dry_run']:
+            self.stdout.write('Dry run, nothing was changed')
@@ -1,12 +1,77 @@
+from django.contrib.contenttypes.models import ContentType
 from rest_framework import serializers
 
-from core.models import History
+from core.fieldsets import SparseFieldsMixin
+from core.models import AuditEntry, ChangeLogEntry, History
 
 
-class HistorySerializer(serializers.ModelSerializer):
+class HistorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = History
-        fields = '__all__'
+        exclude = ['archive', 'archive_codec']
         read_only_fields = [
-            'id'
+            'id',
+            'archived_count',
         ]
+
+
+class HistorySliceSerializer(HistorySerializer):
+    """History with only the entries picked by history.filters"""
+    histories = serializers.JSONField(source='histories_slice', read_only=True)
+    entry_count = serializers.IntegerField(read_only=True)
+
+
+class HistoryTimelineSerializer(HistorySerializer):
+    """History with its archived entries decompressed in front"""
+    histories = serializers.JSONField(source='timeline', read_only=True)
+
+
+class HistoryActivitySerializer(serializers.ModelSerializer):
+    """A history with only the entries matching the activity filters"""
+    entries = serializers.JSONField(source='activity', read_only=True)
+
+    class Meta:
+        model = History
+        fields = [
+            'id',
+            'content_type',
+            'object_id',
+            'workflow',
+            'entries',
+        ]
+        read_only_fields = fields
+
+
+class ChangeLogEntrySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ChangeLogEntry
+        fields = [
+            'id',
+            'model',
+            'object_id',
+            'action',
+            'workflow_id',
+            'data',
+            'created_at',
+        ]
+        read_only_fields = fields
+
+
+class AuditEntrySerializer(serializers.ModelSerializer):
+    model = serializers.SerializerMethodField()
+
+    class Meta:
+        model = AuditEntry
+        fields = [
+            'id',
+            'model',
+            'object_id',
+            'action',
+            'user',
+            'data',
+            'created_at',
+        ]
+        read_only_fields = fields
+
+    def get_model(self, obj) -> str:
+        return ContentType.objects.get_for_id(obj.content_type_id).model
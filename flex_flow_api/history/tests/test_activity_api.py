@@ -0,0 +1,214 @@
+"""
+Test the reviewer activity report
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from importlib import import_module
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import compression
+from core.models import Edge, History, Message
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+    create_message,
+)
+
+ACTIVITY_URL = reverse('history:history-activity')
+
+
+def _entry(user, entry_status, node, days_ago=0):
+    timestamp = timezone.now() - timedelta(days=days_ago)
+    return {
+        'user': user,
+        'timestamp': timestamp.isoformat().replace('+00:00', 'Z'),
+        'status': entry_status,
+        'node': '{}',
+        'node_id': node,
+    }
+
+
+class ActivityApiTests(TestCase):
+    """Test filtering history entries by user, status and node"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.first = History.objects.create(
+            histories=[
+                _entry(1, 'approved', 10, days_ago=20),
+                _entry(2, 'rejected', 11, days_ago=2),
+            ],
+            content_object=Message.objects.create(
+                issuer=self.user, message='first',
+            ),
+            created_at=timezone.now() - timedelta(days=20),
+            updated_at=timezone.now() - timedelta(days=2),
+        )
+        self.second = History.objects.create(
+            histories=[
+                _entry(2, 'approved', 10, days_ago=3),
+                _entry(1, 'approved', 12, days_ago=1),
+            ],
+            content_object=Message.objects.create(
+                issuer=self.user, message='second',
+            ),
+            created_at=timezone.now() - timedelta(days=3),
+            updated_at=timezone.now() - timedelta(days=1),
+        )
+
+    def _get(self, params):
+        res = self.client.get(ACTIVITY_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {
+            row['id']: [
+                (entry['user'], entry['status'], entry['node_id'])
+                for entry in row['entries']
+            ]
+            for row in res.data['results']
+        }
+
+    def test_filter_by_user_and_status(self):
+        """Test only the matching entries of the matching histories"""
+        self.assertEqual(
+            self._get({'user': 2, 'status': 'approved'}),
+            {self.second.id: [(2, 'approved', 10)]},
+        )
+        self.assertEqual(
+            self._get({'user': 1}),
+            {
+                self.first.id: [(1, 'approved', 10)],
+                self.second.id: [(1, 'approved', 12)],
+            },
+        )
+
+    def test_filter_by_node(self):
+        """Test filtering the entries given at a node"""
+        self.assertEqual(
+            self._get({'node': 10}),
+            {
+                self.first.id: [(1, 'approved', 10)],
+                self.second.id: [(2, 'approved', 10)],
+            },
+        )
+
+    def test_filter_by_time(self):
+        """Test only the entries in the time range count"""
+        since = (timezone.now() - timedelta(days=7)).date().isoformat()
+        self.assertEqual(
+            self._get({'user': 1, 'since': since}),
+            {self.second.id: [(1, 'approved', 12)]},
+        )
+        until = (timezone.now() - timedelta(days=2, hours=12)).isoformat()
+        self.assertEqual(
+            self._get({'status': 'approved', 'until': until}),
+            {
+                self.first.id: [(1, 'approved', 10)],
+                self.second.id: [(2, 'approved', 10)],
+            },
+        )
+
+    def test_time_range_boundaries(self):
+        """Test timestamps with fractions compare as times, not text"""
+        History.objects.all().delete()
+        history = History.objects.create(
+            histories=[
+                dict(_entry(3, 'approved', 10),
+                     timestamp='2026-01-01T10:00:00.300000Z'),
+                dict(_entry(3, 'approved', 11),
+                     timestamp='2026-01-01T09:59:59.500000Z'),
+            ],
+            content_object=Message.objects.create(
+                issuer=self.user, message='third',
+            ),
+            created_at=datetime(2026, 1, 1, 9, tzinfo=dt_timezone.utc),
+            updated_at=datetime(2026, 1, 1, 11, tzinfo=dt_timezone.utc),
+        )
+        self.assertEqual(
+            self._get({'user': 3, 'until': '2026-01-01T10:00:00Z'}),
+            {history.id: [(3, 'approved', 11)]},
+        )
+        self.assertEqual(
+            self._get({'user': 3, 'since': '2026-01-01T10:00:00Z'}),
+            {history.id: [(3, 'approved', 10)]},
+        )
+
+    def test_paginated(self):
+        """Test the report is cursor paginated"""
+        res = self.client.get(ACTIVITY_URL, {'node': 10, 'page_size': 1})
+        self.assertEqual(len(res.data['results']), 1)
+        res = self.client.get(res.data['next'])
+        self.assertEqual(res.data['results'][0]['id'], self.second.id)
+        self.assertIsNone(res.data['next'])
+
+    def test_invalid_params(self):
+        """Test a filter is required and must be valid"""
+        for params in ({}, {'status': 'pending'}, {'user': 'me'}):
+            res = self.client.get(ACTIVITY_URL, params)
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
+
+    def test_status_change_is_reported(self):
+        """Test entries written by a status change can be found"""
+        workflow = create_workflow(user=self.user)
+        n1 = create_node(workflow=workflow)
+        n2 = create_node(workflow=workflow)
+        Edge.objects.create(workflow=workflow, n_from=n1, n_to=n2)
+        message = create_message(user=self.user, current_nod=n1)
+        url = reverse(
+            'status-list',
+            kwargs={'workflow_pk': workflow.id, 'message_pk': message.id},
+        )
+        res = self.client.post(
+            url, {'node': n1.id, 'status': 'approved'}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        history = History.objects.get(object_id=message.id)
+
+        self.assertEqual(
+            self._get({'user': self.user.id, 'node': n1.id}),
+            {history.id: [(self.user.id, 'approved', n1.id)]},
+        )
+
+
+class NormalizeEntriesTests(SimpleTestCase):
+    """Test the migration fixing the entries of older histories"""
+
+    def test_normalize(self):
+        """Test tuple statuses are unwrapped and node ids added"""
+        migration = import_module('core.migrations.0021_history_entries_gin')
+        entry = {
+            'user': 1,
+            'status': "('approved',)",
+            'node': "{'id': 5, 'title': 't', 'is_finishing_node': False}",
+        }
+        self.assertEqual(
+            migration._normalize(entry),
+            (dict(entry, status='approved', node_id=5), True),
+        )
+        self.assertEqual(migration._normalize(entry)[1], False)
+
+    def test_archive_codecs(self):
+        """Test the migration reads and writes archives of core.compression"""
+        migration = import_module('core.migrations.0021_history_entries_gin')
+        entries = [{'user': 1, 'status': 'approved', 'node_id': 5}]
+        for codec in compression.CODECS:
+            with self.subTest(codec=codec):
+                self.assertEqual(
+                    migration.unpack(compression.pack(entries, codec), codec),
+                    entries,
+                )
+                self.assertEqual(
+                    compression.unpack(migration.pack(entries, codec), codec),
+                    entries,
+                )
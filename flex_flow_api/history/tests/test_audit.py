@@ -0,0 +1,130 @@
+"""
+Test the audit trail of workflow definition changes
+"""
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import AuditEntry, Node
+from history import audit
+from workflow.tests.utills import create_workflow, create_user, create_node
+
+
+def _audit_url(workflow_id):
+    return reverse('workflow-audit', kwargs={'pk': workflow_id})
+
+
+def _audit_inserts(queries):
+    return [
+        query for query in queries
+        if query['sql'].startswith('INSERT INTO "core_auditentry"')
+    ]
+
+
+class AuditBufferTests(TransactionTestCase):
+    """Test audit entries are written behind the changes"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password',
+        )
+        self.workflow = create_workflow(user=self.user)
+        AuditEntry.objects.all().delete()
+
+    def test_buffered_until_flush(self):
+        """Test the entries of a block are written with one insert"""
+        with audit.buffered() as buffer:
+            with CaptureQueriesContext(connection) as queries:
+                with transaction.atomic():
+                    for _ in range(3):
+                        create_node(workflow=self.workflow)
+            self.assertEqual(_audit_inserts(queries), [])
+            self.assertEqual(len(buffer.entries), 3)
+        with CaptureQueriesContext(connection) as queries:
+            buffer.flush(self.user)
+        self.assertEqual(len(_audit_inserts(queries)), 1)
+        entries = AuditEntry.objects.all()
+        self.assertEqual(len(entries), 3)
+        for entry in entries:
+            self.assertEqual(entry.user, self.user)
+            self.assertEqual(entry.workflow_id, self.workflow.id)
+            self.assertEqual(entry.action, 'create')
+            self.assertIsInstance(entry.content_object, Node)
+
+    def test_rolled_back_changes_not_audited(self):
+        """Test a rolled back change leaves no entry"""
+        with audit.buffered() as buffer:
+            with transaction.atomic():
+                create_node(workflow=self.workflow)
+                transaction.set_rollback(True)
+        self.assertEqual(buffer.entries, [])
+
+    def test_outside_request(self):
+        """Test changes outside requests are audited without a user"""
+        node = create_node(workflow=self.workflow)
+        node.delete()
+        self.assertEqual(
+            list(AuditEntry.objects.values_list('action', 'user')),
+            [('create', None), ('delete', None)],
+        )
+
+
+class AuditApiTests(TransactionTestCase):
+    """Test auditing through the API"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(user=self.user)
+        AuditEntry.objects.all().delete()
+
+    def test_change_attributed_to_user(self):
+        """Test a node created through the API names its author"""
+        url = reverse(
+            'node-list', kwargs={'workflow_pk': self.workflow.id}
+        )
+        res = self.client.post(
+            url, {'title': 'Review', 'description': 'Manager'}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        entry = AuditEntry.objects.get(action='create')
+        self.assertEqual(entry.user, self.user)
+        self.assertEqual(entry.object_id, res.data['id'])
+        self.assertEqual(entry.data['title'], 'Review')
+
+    def test_list_audit(self):
+        """Test the owner lists the changes of a workflow"""
+        node = create_node(workflow=self.workflow)
+        self.client.patch(
+            reverse('workflow-detail', kwargs={'pk': self.workflow.id}),
+            {'title': 'Renamed'},
+            format='json',
+        )
+        res = self.client.get(_audit_url(self.workflow.id))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [
+                (row['model'], row['object_id'], row['action'], row['user'])
+                for row in res.data['results']
+            ],
+            [
+                ('node', node.id, 'create', None),
+                ('workflow', self.workflow.id, 'update', self.user.id),
+            ],
+        )
+
+    def test_audit_owner_only(self):
+        """Test other users cannot read the audit trail"""
+        other = create_user(email='other@example.com', password='password')
+        workflow = create_workflow(user=other)
+        res = self.client.get(_audit_url(workflow.id))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
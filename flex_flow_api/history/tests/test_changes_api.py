@@ -0,0 +1,109 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLogEntry, Edge, Node, Workflow
+
+CHANGES_URL = reverse('history:changes')
+
+
+class ChangeFeedApiTests(TestCase):
+    """Test the change feed"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='random_password',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.workflow = Workflow.objects.create(
+            title='workflow', description='d', create_by=self.admin
+        )
+        self.n1 = Node.objects.create(
+            workflow=self.workflow, title='n1', description='d'
+        )
+        self.n2 = Node.objects.create(
+            workflow=self.workflow, title='n2', description='d'
+        )
+
+    def _changes(self, **params):
+        res = self.client.get(CHANGES_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data
+
+    def test_mutations_are_logged_in_order(self):
+        """Test creates, updates and deletes appear in order"""
+        self.n1.title = 'renamed'
+        self.n1.save()
+        edge = Edge.objects.create(
+            workflow=self.workflow, n_from=self.n1, n_to=self.n2
+        )
+        edge_id = edge.id
+        edge.delete()
+        data = self._changes()
+        self.assertEqual(
+            [(row['model'], row['action']) for row in data['results']],
+            [
+                ('workflow', 'create'),
+                ('node', 'create'),
+                ('node', 'create'),
+                ('node', 'update'),
+                ('edge', 'create'),
+                ('edge', 'delete'),
+            ],
+        )
+        update = data['results'][3]
+        self.assertEqual(update['data']['title'], 'renamed')
+        self.assertEqual(update['workflow_id'], self.workflow.id)
+        delete = data['results'][5]
+        self.assertEqual(delete['object_id'], edge_id)
+        self.assertIsNone(delete['data'])
+        self.assertNotIn('graph_version', data['results'][0]['data'])
+
+    def test_incremental_sync_in_batches(self):
+        """Test consumers resume from the returned cursor"""
+        data = self._changes(limit=2)
+        self.assertEqual(len(data['results']), 2)
+        self.assertTrue(data['has_more'])
+        data = self._changes(limit=2, cursor=data['cursor'])
+        self.assertEqual(len(data['results']), 1)
+        self.assertFalse(data['has_more'])
+        cursor = data['cursor']
+        data = self._changes(cursor=cursor)
+        self.assertEqual(data['results'], [])
+        self.assertEqual(data['cursor'], cursor)
+        Node.objects.create(workflow=self.workflow, title='n3',
+                            description='d')
+        data = self._changes(cursor=cursor)
+        self.assertEqual(
+            [row['data']['title'] for row in data['results']], ['n3']
+        )
+
+    def test_filter_models(self):
+        """Test ?models= restricts the feed"""
+        data = self._changes(models='workflow')
+        self.assertEqual(
+            {row['model'] for row in data['results']}, {'workflow'}
+        )
+        res = self.client.get(CHANGES_URL, {'models': 'user'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor(self):
+        """Test a malformed cursor is rejected"""
+        res = self.client.get(CHANGES_URL, {'cursor': 'abc'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_only(self):
+        """Test regular users cannot read the feed"""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='random_password',
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        res = client.get(CHANGES_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertTrue(ChangeLogEntry.objects.exists())
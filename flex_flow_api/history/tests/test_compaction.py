@@ -0,0 +1,145 @@
+"""
+Test compaction of the cold history entries
+"""
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.compression import pack, unpack
+from core.models import History, Message
+from history.compaction import cold_prefix, compact_history
+from workflow.tests.utills import create_user
+
+HISTORY_URL = reverse('history:history-list')
+
+
+def _entries(days_ago):
+    now = timezone.now()
+    return [
+        {
+            'user': 1,
+            'status': 'approved',
+            'node': 'node',
+            'timestamp': (now - timedelta(days=days)).isoformat(),
+        }
+        for days in days_ago
+    ]
+
+
+class CompressionTests(SimpleTestCase):
+    """Test packing JSON values"""
+
+    def test_round_trip(self):
+        """Test every codec restores the packed value"""
+        entries = _entries([3, 2, 1])
+        for codec in ('zlib', 'lzma'):
+            self.assertEqual(unpack(pack(entries, codec), codec), entries)
+
+    def test_cold_prefix(self):
+        """Test only the leading entries before the cutoff are cold"""
+        entries = _entries([100, 95, 10, 200])
+        before = timezone.now() - timedelta(days=90)
+        self.assertEqual(cold_prefix(entries, before), 2)
+        self.assertEqual(cold_prefix([{'status': 'x'}], before), 0)
+
+
+class CompactionTests(TestCase):
+    """Test archiving history entries"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.entries = _entries([120, 100, 5, 1])
+        self.history = History.objects.create(
+            histories=self.entries,
+            content_object=Message.objects.create(
+                issuer=self.user,
+                message='Hello World!',
+            ),
+            created_at=timezone.now() - timedelta(days=120),
+        )
+        self.before = timezone.now() - timedelta(days=90)
+
+    def test_compact_history(self):
+        """Test old entries move to the archive, recent ones stay"""
+        entries, raw, packed = compact_history(self.history.id, self.before)
+        self.assertEqual(entries, 2)
+        self.assertGreater(raw, 0)
+        self.history.refresh_from_db()
+        self.assertEqual(self.history.histories, self.entries[2:])
+        self.assertEqual(self.history.archived_count, 2)
+        self.assertEqual(self.history.archive_codec, 'zlib')
+        self.assertEqual(self.history.timeline(), self.entries)
+
+    def test_compact_again(self):
+        """Test a later compaction appends to the existing archive"""
+        compact_history(self.history.id, self.before, codec='lzma')
+        later = timezone.now() - timedelta(days=2)
+        self.assertEqual(compact_history(self.history.id, later)[0], 1)
+        self.history.refresh_from_db()
+        self.assertEqual(self.history.archived_count, 3)
+        self.assertEqual(self.history.archive_codec, 'zlib')
+        self.assertEqual(self.history.timeline(), self.entries)
+        self.assertEqual(compact_history(self.history.id, later)[0], 0)
+
+    def test_dry_run(self):
+        """Test a dry run reports without changing the history"""
+        self.assertEqual(
+            compact_history(self.history.id, self.before, dry_run=True)[0],
+            2,
+        )
+        self.history.refresh_from_db()
+        self.assertEqual(self.history.histories, self.entries)
+        self.assertEqual(self.history.archived_count, 0)
+
+    def test_compact_history_command(self):
+        """Test the command compacts and reports the space saved"""
+        out = io.StringIO()
+        call_command(
+            'compact_history', '--older-than', '90', '--codec', 'lzma',
+            stdout=out,
+        )
+        self.assertIn('1 histories, 2 entries', out.getvalue())
+        self.history.refresh_from_db()
+        self.assertEqual(self.history.archived_count, 2)
+        self.assertEqual(self.history.archive_codec, 'lzma')
+
+    def test_list_keeps_archive_compressed(self):
+        """Test the list returns recent entries and the archived count"""
+        compact_history(self.history.id, self.before)
+        res = self.client.get(HISTORY_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        row = res.data['results'][0]
+        self.assertEqual(row['histories'], self.entries[2:])
+        self.assertEqual(row['archived_count'], 2)
+        self.assertNotIn('archive', row)
+
+    def test_list_full_timeline(self):
+        """Test ?full=true decompresses the archived entries"""
+        compact_history(self.history.id, self.before)
+        res = self.client.get(HISTORY_URL, {'full': 'true'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['histories'], self.entries)
+
+    def test_slice_counts_archived_entries(self):
+        """Test entry_count includes the archived entries"""
+        compact_history(self.history.id, self.before)
+        res = self.client.get(HISTORY_URL, {'last': 1})
+        row = res.data['results'][0]
+        self.assertEqual(row['histories'], self.entries[-1:])
+        self.assertEqual(row['entry_count'], 4)
+
+    def test_full_rejects_slice(self):
+        """Test ?full=true cannot be combined with a slice"""
+        res = self.client.get(HISTORY_URL, {'full': 'true', 'last': 1})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -1,3 +1,5 @@
+import json
+
 from django.contrib.auth import get_user_model
 from django.test import TestCase, SimpleTestCase
 from django.urls import reverse
@@ -68,7 +70,30 @@ class PrivateHistoryApiTests(TestCase):
 
         res = self.client.get(HISTORY_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), len(self.histories))
+        self.assertEqual(len(res.data['results']), len(self.histories))
         for history in self.histories:
             serializer = HistorySerializer(history)
-            self.assertIn(serializer.data, res.data)
+            self.assertIn(serializer.data, res.data['results'])
+
+    def test_stream_history(self):
+        """Test streaming every history row as one JSON array"""
+        res = self.client.get(HISTORY_URL, {'stream': 'true'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        data = json.loads(b''.join(res.streaming_content))
+        self.assertEqual(
+            data,
+            [HistorySerializer(history).data for history in self.histories]
+        )
+
+    def test_stream_honors_fields(self):
+        """Test streamed rows only carry the requested fields"""
+        res = self.client.get(
+            HISTORY_URL,
+            {'stream': 'true', 'fields': 'id'}
+        )
+        data = json.loads(b''.join(res.streaming_content))
+        self.assertEqual(
+            data,
+            [{'id': history.id} for history in self.histories]
+        )
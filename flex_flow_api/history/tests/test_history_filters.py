@@ -0,0 +1,209 @@
+"""
+Test filtering and slicing the history list
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Edge, History, HistoryActor, Message, MessageHolder
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+    create_message,
+)
+
+HISTORY_URL = reverse('history:history-list')
+
+
+def _entries(count):
+    return [
+        {'status': 'approved', 'node': index, 'comment': f'entry {index}'}
+        for index in range(count)
+    ]
+
+
+class HistoryFilterApiTests(TestCase):
+    """Test the history list filters and slices"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password',
+        )
+        self.other_user = create_user(
+            email='other@example.com',
+            password='random_password',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(user=self.user)
+        self.other_workflow = create_workflow(user=self.user)
+        node = create_node(workflow=self.workflow)
+        self.message = create_message(user=self.user, current_nod=node)
+        self.other_message = create_message(user=self.user, current_nod=node)
+        now = timezone.now()
+        self.old = History.objects.create(
+            histories=_entries(1),
+            content_object=self.message,
+            workflow=self.workflow,
+            created_at=now - timedelta(days=10),
+            updated_at=now - timedelta(days=9),
+        )
+        self.recent = History.objects.create(
+            histories=_entries(5),
+            content_object=self.other_message,
+            workflow=self.other_workflow,
+            created_at=now - timedelta(days=1),
+            updated_at=now,
+        )
+        HistoryActor.objects.create(history=self.recent, user=self.other_user)
+
+    def _ids(self, params):
+        res = self.client.get(HISTORY_URL, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in res.data['results']]
+
+    def test_filter_by_object(self):
+        """Test filtering by content type and object id"""
+        ids = self._ids({
+            'content_type': 'core.message',
+            'object_id': self.message.id,
+        })
+        self.assertEqual(ids, [self.old.id])
+
+    def test_filter_by_workflow(self):
+        """Test filtering by workflow"""
+        ids = self._ids({'workflow': self.other_workflow.id})
+        self.assertEqual(ids, [self.recent.id])
+
+    def test_filter_by_actor(self):
+        """Test filtering by a user who added an entry"""
+        self.assertEqual(
+            self._ids({'actor': self.other_user.id}),
+            [self.recent.id],
+        )
+        self.assertEqual(self._ids({'actor': self.user.id}), [])
+
+    def test_filter_by_time(self):
+        """Test since and until keep histories with entries in the range"""
+        since = (timezone.now() - timedelta(days=3)).date().isoformat()
+        self.assertEqual(self._ids({'since': since}), [self.recent.id])
+        until = (timezone.now() - timedelta(days=5)).isoformat()
+        self.assertEqual(self._ids({'until': until}), [self.old.id])
+
+    def test_invalid_filters(self):
+        """Test malformed filters are rejected"""
+        for params in (
+            {'workflow': 'abc'},
+            {'since': 'yesterday'},
+            {'since': '2026-02-30T10:00:00'},
+            {'until': '2026-02-30'},
+            {'object_id': '99999999999999999999'},
+            {'object_id': str(2 ** 63)},
+            {'workflow': str(2 ** 63)},
+            {'content_type': 'unknown'},
+            {'last': '-1'},
+            {'entry_fields': 'status;drop'},
+        ):
+            res = self.client.get(HISTORY_URL, params)
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, params
+            )
+
+    def test_last_entries(self):
+        """Test only the last entries are returned, with the total count"""
+        res = self.client.get(
+            HISTORY_URL, {'workflow': self.other_workflow.id, 'last': 2}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        row = res.data['results'][0]
+        self.assertEqual(row['histories'], _entries(5)[-2:])
+        self.assertEqual(row['entry_count'], 5)
+
+    def test_entry_fields(self):
+        """Test entries are projected to the requested keys"""
+        res = self.client.get(HISTORY_URL, {
+            'workflow': self.other_workflow.id,
+            'last': 1,
+            'entry_fields': 'status,missing',
+        })
+        row = res.data['results'][0]
+        self.assertEqual(
+            row['histories'], [{'status': 'approved', 'missing': None}]
+        )
+
+    def test_message_history_last(self):
+        """Test the message history endpoint slices entries too"""
+        url = reverse(
+            'message-detail',
+            kwargs={
+                'workflow_pk': self.workflow.id,
+                'pk': self.other_message.id,
+            }
+        ) + 'history/'
+        res = self.client.get(url, {'last': 1})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]['histories'], _entries(5)[-1:])
+        self.assertEqual(res.data[0]['entry_count'], 5)
+
+
+class HistoryRecordingTests(TestCase):
+    """Test status changes record the filter columns"""
+
+    def test_message_id_above_int4(self):
+        """Test messages with ids of later shards get a history"""
+        user = create_user(email='user@example.com', password='password')
+        client = APIClient()
+        client.force_authenticate(user)
+        workflow = create_workflow(user=user)
+        n1 = create_node(workflow=workflow)
+        n2 = create_node(workflow=workflow)
+        Edge.objects.create(workflow=workflow, n_from=n1, n_to=n2)
+        message = Message.objects.create(
+            id=10 ** 12 + 1, issuer=user, message='on shard 1',
+        )
+        MessageHolder.objects.create(message=message, current_node=n1)
+        url = reverse(
+            'status-list',
+            kwargs={'workflow_pk': workflow.id, 'message_pk': message.id},
+        )
+        res = client.post(
+            url, {'node': n1.id, 'status': 'approved'}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        history = History.objects.get(object_id=message.id)
+        res = client.get(HISTORY_URL, {'object_id': message.id})
+        self.assertEqual(
+            [row['id'] for row in res.data['results']], [history.id]
+        )
+
+    def test_status_change_records_actor(self):
+        """Test a status change sets workflow, times and actor"""
+        user = create_user(email='user@example.com', password='password')
+        client = APIClient()
+        client.force_authenticate(user)
+        workflow = create_workflow(user=user)
+        n1 = create_node(workflow=workflow)
+        n2 = create_node(workflow=workflow)
+        Edge.objects.create(workflow=workflow, n_from=n1, n_to=n2)
+        message = create_message(user=user, current_nod=n1)
+        url = reverse(
+            'status-list',
+            kwargs={'workflow_pk': workflow.id, 'message_pk': message.id},
+        )
+        res = client.post(
+            url, {'node': n1.id, 'status': 'approved'}, format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+        history = History.objects.get(object_id=message.id)
+        self.assertEqual(history.workflow, workflow)
+        self.assertGreaterEqual(history.updated_at, history.created_at)
+        self.assertEqual(
+            list(history.actors.values_list('user', flat=True)), [user.id]
+        )
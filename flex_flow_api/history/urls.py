@@ -1,5 +1,5 @@
 from rest_framework import routers
-from history.views import HistoryViewSet
+from history.views import ChangeFeedView, HistoryViewSet
 from django.urls import path, include
 
 router = routers.DefaultRouter()
@@ -7,5 +7,6 @@ router = routers.DefaultRouter()
 router.register('', HistoryViewSet, basename='history')
 app_name = 'history'
 urlpatterns = [
+    path('changes/', ChangeFeedView.as_view(), name='changes'),
     path('', include(router.urls))
 ]
@@ -1,22 +1,267 @@
+from django.conf import settings
+from drf_spectacular.utils import (
+    extend_schema,
+    extend_schema_view,
+    OpenApiParameter,
+    OpenApiTypes,
+)
 from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from core.fieldsets import SparseFieldsViewMixin
 from core.models import History
-from history.serializers import HistorySerializer
+from core.streaming import StreamingListMixin
+from history.changes import (
+    InvalidCursor,
+    TRACKED_MODELS,
+    changes_after,
+    encode_cursor,
+)
+from history.filters import (
+    ENTRY_STATUSES,
+    activity_histories,
+    filter_histories,
+    load_histories,
+    wants_slice,
+    wants_timeline,
+)
+from history.serializers import (
+    ChangeLogEntrySerializer,
+    HistoryActivitySerializer,
+    HistorySerializer,
+    HistorySliceSerializer,
+    HistoryTimelineSerializer,
+)
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
 
 
+HISTORY_PARAMETERS = [
+    OpenApiParameter(
+        name='content_type',
+        type=OpenApiTypes.STR,
+        description='model the histories belong to, e.g. message',
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name='object_id',
+        type=OpenApiTypes.INT,
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name='workflow',
+        type=OpenApiTypes.INT,
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name='actor',
+        type=OpenApiTypes.INT,
+        description='id of a user who added an entry',
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name='since',
+        type=OpenApiTypes.DATETIME,
+        description='only histories with entries at or after this time',
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name='until',
+        type=OpenApiTypes.DATETIME,
+        description='only histories with entries at or before this time',
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+]
+ENTRY_PARAMETERS = [
+    OpenApiParameter(
+        name='last',
+        type=OpenApiTypes.INT,
+        description='return only the last N entries of each history',
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name='entry_fields',
+        type=OpenApiTypes.STR,
+        description='comma separated keys to keep in each entry',
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name='full',
+        type=OpenApiTypes.BOOL,
+        description='include the archived entries, cannot be combined '
+                    'with last or entry_fields',
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+]
+
+ACTIVITY_PARAMETERS = [
+    OpenApiParameter(
+        name='user',
+        type=OpenApiTypes.INT,
+        description='id of the user who changed the status',
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name='status',
+        type=OpenApiTypes.STR,
+        enum=ENTRY_STATUSES,
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+    OpenApiParameter(
+        name='node',
+        type=OpenApiTypes.INT,
+        description='id of the node the status was given at',
+        required=False,
+        location=OpenApiParameter.QUERY,
+    ),
+]
+
+
+def history_queryset(params):
+    """Histories filtered and sliced as asked by the query ``params``"""
+    return load_histories(
+        filter_histories(History.objects.all(), params), params
+    )
+
+
+def history_serializer_class(params):
+    if wants_timeline(params):
+        return HistoryTimelineSerializer
+    if wants_slice(params):
+        return HistorySliceSerializer
+    return HistorySerializer
+
+
+@extend_schema_view(
+    list=extend_schema(parameters=HISTORY_PARAMETERS + ENTRY_PARAMETERS),
+)
 class HistoryViewSet(
+    StreamingListMixin,
+    SparseFieldsViewMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet,
 ):
     queryset = History.objects.all()
     serializer_class = HistorySerializer
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def get_queryset(self):
+        return history_queryset(self.request.query_params)
+
     def get_serializer_class(self):
         if self.action == "list":
-            return HistorySerializer
+            return history_serializer_class(self.request.query_params)
+
+    @extend_schema(
+        parameters=ACTIVITY_PARAMETERS + HISTORY_PARAMETERS,
+        responses=HistoryActivitySerializer(many=True),
+    )
+    @action(detail=False, methods=['GET'])
+    def activity(self, request):
+        """
+        The entries a user, status and/or node appear in, e.g. everything
+        ``?user=3&status=approved&since=2026-10-12``. Archived entries are
+        not searched.
+        """
+        queryset = activity_histories(
+            History.objects.all(), request.query_params
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = HistoryActivitySerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+class ChangeFeedView(APIView):
+    """
+    Changes of workflows, nodes, edges, messages and holders in commit
+    order. Pass the returned ``cursor`` back to continue, it stays valid
+    when there is nothing new yet.
+    """
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
+    permission_classes = (IsAdminUser,)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='cursor',
+                type=OpenApiTypes.STR,
+                description='cursor returned by the previous call, omit '
+                            'to start from the beginning',
+                required=False,
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name='models',
+                type=OpenApiTypes.STR,
+                description='comma separated models to include, any of '
+                            + ', '.join(sorted(TRACKED_MODELS.values())),
+                required=False,
+                location=OpenApiParameter.QUERY,
+            ),
+            OpenApiParameter(
+                name='limit',
+                type=OpenApiTypes.INT,
+                required=False,
+                location=OpenApiParameter.QUERY,
+            ),
+        ],
+        responses=ChangeLogEntrySerializer(many=True),
+    )
+    def get(self, request):
+        cursor = request.query_params.get('cursor')
+        models = request.query_params.get('models')
+        if models:
+            models = set(models.split(','))
+            unknown = models - set(TRACKED_MODELS.values())
+            if unknown:
+                raise ParseError(
+                    f"Unknown models: {', '.join(sorted(unknown))}"
+                )
+        try:
+            limit = min(
+                int(request.query_params.get(
+                    'limit', settings.CHANGE_FEED_PAGE_SIZE
+                )),
+                settings.API_MAX_PAGE_SIZE,
+            )
+        except ValueError:
+            raise ParseError('limit must be an integer.')
+        if limit < 1:
+            raise ParseError('limit must be positive.')
+        try:
+            entries, has_more = changes_after(cursor, limit, models)
+        except InvalidCursor as exc:
+            raise ParseError(str(exc))
+        if entries:
+            cursor = encode_cursor(entries[-1])
+        return Response({
+            'results': ChangeLogEntrySerializer(entries, many=True).data,
+            'cursor': cursor,
+            'has_more': has_more,
+        })
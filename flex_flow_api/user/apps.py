@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from django.contrib.auth import get_user_model
+        from rest_framework.authtoken.models import Token
+        from user.authentication import invalidate_token, invalidate_user
+        post_delete.connect(invalidate_token, sender=Token)
+        post_save.connect(invalidate_user, sender=get_user_model())
+        post_delete.connect(invalidate_user, sender=get_user_model())
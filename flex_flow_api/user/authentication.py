@@ -0,0 +1,150 @@
+"""
+Token authentication with an in-process cache of token to user lookups.
+"""
+import copy
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+from rest_framework.exceptions import AuthenticationFailed
+
+from core import metrics
+from core.db_router import use_primary
+from core.lru import LRUCache
+from user import signed_tokens
+
+_token_cache = None
+
+
+def get_token_cache():
+    """Return the process wide token cache, created on first use"""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = LRUCache(
+            maxsize=settings.TOKEN_CACHE_MAX_SIZE,
+            ttl=settings.TOKEN_CACHE_TTL,
+        )
+    return _token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Drop-in replacement for TokenAuthentication caching resolved tokens.
+
+    Entries are dropped when their token is deleted or their user is saved
+    (deactivation, password change) in this process, other workers pick
+    the change up once TOKEN_CACHE_TTL (a few seconds) expires. Every
+    request gets its own copy of the cached user and token.
+    """
+
+    def authenticate_credentials(self, key):
+        cached = get_token_cache().get(key)
+        if cached is not None:
+            metrics.token_cache_lookups_total.inc(result='hit')
+            return _copies(cached)
+        return self.load_credentials(key)
+
+    def load_credentials(self, key):
+        """Resolve ``key`` from the database and cache the result"""
+        metrics.token_cache_lookups_total.inc(result='miss')
+        # a token issued a moment ago may not have reached the replicas
+        with use_primary():
+            user, token = super().authenticate_credentials(key)
+        get_token_cache().set(key, (user, token))
+        return _copies((user, token))
+
+
+def _copies(cached):
+    """Copies of a cached user and token, never shared between requests"""
+    user, token = cached
+    user = copy.copy(user)
+    token = copy.copy(token)
+    token.user = user
+    return user, token
+
+
+def invalidate_token(sender, instance, **kwargs):
+    """Drop a deleted token from the cache"""
+    get_token_cache().delete(instance.key)
+
+
+def invalidate_user(sender, instance, **kwargs):
+    """Drop every cached token of a changed or deleted user"""
+    get_token_cache().discard_if(
+        lambda key, value: value[0].pk == instance.pk
+    )
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticate ``Authorization: Bearer <token>`` signed access tokens.
+
+    Verification never touches the database, see user.signed_tokens.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise AuthenticationFailed('Invalid token header.')
+        try:
+            token = auth[1].decode()
+        except UnicodeError:
+            raise AuthenticationFailed('Invalid token header.')
+        try:
+            payload = signed_tokens.decode_token(token)
+        except signed_tokens.InvalidToken as exc:
+            raise AuthenticationFailed(str(exc))
+        user = signed_tokens.user_from_payload(payload)
+        if not user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return user, payload
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+async def aauthenticate(request):
+    """
+    Async counterpart of the API authentication classes for async views.
+
+    Signed tokens and cached DB tokens are resolved on the event loop, only
+    a token cache miss or a due revocation sync goes to a worker thread.
+    Returns the user or None when the request is not authenticated.
+    """
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2:
+        return None
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        return None
+    keyword = auth[0].lower()
+    if keyword == SignedTokenAuthentication.keyword.lower().encode():
+        revocations = signed_tokens.get_revocation_list()
+        if revocations.needs_sync():
+            await sync_to_async(revocations.sync)()
+        try:
+            payload = signed_tokens.decode_token(key)
+        except signed_tokens.InvalidToken:
+            return None
+        return signed_tokens.user_from_payload(payload)
+    if keyword == CachedTokenAuthentication.keyword.lower().encode():
+        cached = get_token_cache().get(key)
+        if cached is not None:
+            metrics.token_cache_lookups_total.inc(result='hit')
+            return _copies(cached)[0]
+        try:
+            user, _ = await sync_to_async(
+                CachedTokenAuthentication().load_credentials
+            )(key)
+        except AuthenticationFailed:
+            return None
+        return user
+    return None
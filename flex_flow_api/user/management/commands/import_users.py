@@ -0,0 +1,63 @@
+"""
+Django command to create users in bulk from a CSV or NDJSON file
+"""
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.provisioning import (
+    CSV,
+    FORMATS,
+    NDJSON,
+    ImportFormatError,
+    import_users,
+    parse_users,
+)
+
+
+class Command(BaseCommand):
+    help = 'Import users from a CSV or NDJSON file with email,password,name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            default=None,
+            help='Input format, guessed from the file extension by default',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processes used to hash passwords, defaults to CPU count',
+        )
+        parser.add_argument('--chunk-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        path = options['path']
+        fmt = options['format']
+        if fmt is None:
+            extension = os.path.splitext(path)[1].lower()
+            fmt = NDJSON if extension in ('.ndjson', '.jsonl') else CSV
+        try:
+            stream = open(path, newline='', encoding='utf-8-sig')
+        except OSError as exc:
+            raise CommandError(str(exc))
+        with stream:
+            try:
+                report = import_users(
+                    parse_users(stream, fmt),
+                    workers=options['workers'],
+                    chunk_size=options['chunk_size'],
+                )
+            except ImportFormatError as exc:
+                raise CommandError(str(exc))
+        for failure in report['failed']:
+            self.stderr.write(json.dumps(failure))
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} users, "
+            f"{len(report['failed'])} rows failed"
+        ))
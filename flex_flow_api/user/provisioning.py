@@ -0,0 +1,203 @@
+"""
+Bulk import of users from CSV or NDJSON.
+
+Rows are validated up front, passwords are hashed in a process pool and
+users are inserted with ``bulk_create`` in chunks. A bad row is reported
+with its line number and never aborts the rest of the batch.
+"""
+import csv
+import io
+import json
+import os
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATS = (CSV, NDJSON)
+MIN_PASSWORD_LENGTH = 5
+TEXT_FIELDS = ('email', 'password', 'name')
+
+
+class ImportFormatError(ValueError):
+    """The file is not UTF-8 text in the expected format"""
+
+
+def parse_users(stream, fmt=CSV):
+    """Yield ``(line, row)`` pairs from a text stream"""
+    if fmt not in FORMATS:
+        raise ValueError(f'Unknown format {fmt}')
+    try:
+        yield from _parse(stream, fmt)
+    except UnicodeDecodeError:
+        raise ImportFormatError('File must be UTF-8 encoded')
+    except csv.Error as exc:
+        raise ImportFormatError(f'Malformed CSV: {exc}')
+
+
+def _parse(stream, fmt):
+    if fmt == CSV:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    else:
+        for line, text in enumerate(stream, start=1):
+            if not text.strip():
+                continue
+            try:
+                row = json.loads(text)
+            except ValueError:
+                row = None
+            yield line, row if isinstance(row, dict) else None
+
+
+def parse_users_bytes(content, fmt=CSV):
+    try:
+        text = content.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ImportFormatError('File must be UTF-8 encoded')
+    return parse_users(io.StringIO(text), fmt)
+
+
+def _init_worker(settings_module):
+    if settings_module:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """Hash ``passwords`` preserving order, in a pool when workers > 1"""
+    if workers == 1 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    # multiprocessing is only needed here, keep it out of worker startup
+    from concurrent.futures import ProcessPoolExecutor
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'),),
+    ) as executor:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(executor.map(make_password, passwords,
+                                 chunksize=chunksize))
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.failed = []
+
+    def fail(self, line, email, error):
+        self.failed.append({'line': line, 'email': email, 'error': error})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'failed': sorted(self.failed, key=lambda row: row['line']),
+        }
+
+
+def _validate(rows, report):
+    model = get_user_model()
+    valid = []
+    seen = set()
+    for line, row in rows:
+        if row is None:
+            report.fail(line, None, 'Row could not be parsed')
+            continue
+        # NDJSON values may be numbers, lists or objects
+        not_text = [
+            field for field in TEXT_FIELDS
+            if not isinstance(row.get(field) or '', str)
+        ]
+        if not_text:
+            email = row.get('email')
+            report.fail(
+                line, email if isinstance(email, str) else None,
+                f"{', '.join(not_text)} must be text"
+            )
+            continue
+        email = model.objects.normalize_email((row.get('email') or '')
+                                              .strip())
+        password = row.get('password') or ''
+        name = row.get('name') or ''
+        too_long = [
+            field for field, value in (('email', email), ('name', name))
+            if len(value) > model._meta.get_field(field).max_length
+        ]
+        if too_long:
+            report.fail(
+                line, email, f"{', '.join(too_long)} is too long"
+            )
+            continue
+        try:
+            validate_email(email)
+        except ValidationError:
+            report.fail(line, email, 'Enter a valid email address')
+            continue
+        if len(password) < MIN_PASSWORD_LENGTH:
+            report.fail(
+                line, email,
+                f'Password must be at least {MIN_PASSWORD_LENGTH} characters'
+            )
+            continue
+        if email in seen:
+            report.fail(line, email, 'Duplicate email in import')
+            continue
+        seen.add(email)
+        valid.append((line, email, password, name))
+    existing = set(
+        model.objects.filter(
+            email__in=[email for _, email, _, _ in valid]
+        ).values_list('email', flat=True)
+    )
+    result = []
+    for line, email, password, name in valid:
+        if email in existing:
+            report.fail(line, email, 'User with this email already exists')
+        else:
+            result.append((line, email, password, name))
+    return result
+
+
+def _insert(chunk, report):
+    model = get_user_model()
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create([user for _, user in chunk])
+        report.created += len(chunk)
+        return
+    except IntegrityError:
+        pass
+    # somebody created one of these users meanwhile, find out which
+    for line, user in chunk:
+        try:
+            with transaction.atomic():
+                user.save(force_insert=True)
+            report.created += 1
+        except IntegrityError:
+            report.fail(line, user.email,
+                        'User with this email already exists')
+
+
+def import_users(rows, workers=None, chunk_size=500):
+    """Create users from ``(line, row)`` pairs and return a report dict"""
+    model = get_user_model()
+    report = ImportReport()
+    valid = _validate(rows, report)
+    hashes = hash_passwords(
+        [password for _, _, password, _ in valid],
+        workers=workers,
+    )
+    users = [
+        (line, model(email=email, name=name, password=password_hash))
+        for (line, email, _, name), password_hash in zip(valid, hashes)
+    ]
+    for start in range(0, len(users), chunk_size):
+        _insert(users[start:start + chunk_size], report)
+    return report.as_dict()
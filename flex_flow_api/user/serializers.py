@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model, authenticate
 
+from user import provisioning, signed_tokens
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for User model object"""
@@ -50,3 +52,28 @@ class LoginSerializer(serializers.Serializer):
             raise serializers.ValidationError(msg, code='authentication')
         attrs['user'] = user
         return attrs
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=True)
+
+    def validate(self, attrs):
+        """Verify the refresh token and return its claims"""
+        try:
+            attrs['payload'] = signed_tokens.decode_token(
+                attrs['refresh'],
+                signed_tokens.REFRESH,
+            )
+        except signed_tokens.InvalidToken as exc:
+            raise serializers.ValidationError(
+                str(exc), code='authentication'
+            )
+        return attrs
+
+
+class UserImportSerializer(serializers.Serializer):
+    file = serializers.FileField(required=True)
+    format = serializers.ChoiceField(
+        choices=provisioning.FORMATS,
+        default=provisioning.CSV,
+    )
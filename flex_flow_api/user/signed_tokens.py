@@ -0,0 +1,181 @@
+"""
+Stateless HMAC signed access and refresh tokens.
+
+A token carries the user id, a unique id (``jti``) and its expiry, signed
+with ``django.core.signing``. Verifying it is a signature check plus a
+lookup in an in-memory set of revoked ids, no database access is needed
+and the cost does not depend on how many users or tokens exist. The set
+is refreshed from the ``RevokedToken`` table every
+``SIGNED_TOKEN_REVOCATION_SYNC_INTERVAL`` seconds.
+
+Refreshing is the one step that loads the user: inactive users are
+refused and a refresh token only holds until its user's password changes.
+"""
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import router
+from django.utils.crypto import constant_time_compare
+
+from core.models import RevokedToken
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+_SALT = 'user.signed_tokens.'
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def _ttl(token_type):
+    if token_type == ACCESS:
+        return settings.SIGNED_ACCESS_TOKEN_TTL
+    return settings.SIGNED_REFRESH_TOKEN_TTL
+
+
+def issue_token(user, token_type=ACCESS):
+    """Return a signed token of ``token_type`` for ``user``"""
+    payload = {
+        'uid': user.pk,
+        'jti': secrets.token_urlsafe(12),
+        'exp': int(time.time()) + _ttl(token_type),
+        'email': user.email,
+        'act': user.is_active,
+        'stf': user.is_staff,
+        'su': user.is_superuser,
+    }
+    if token_type == REFRESH:
+        # a new password hash revokes it, as it logs out Django sessions
+        payload['pwd'] = user.get_session_auth_hash()
+    return signing.dumps(payload, salt=_SALT + token_type)
+
+
+def issue_token_pair(user):
+    return {
+        'token': issue_token(user, ACCESS),
+        'refresh': issue_token(user, REFRESH),
+        'expires_in': settings.SIGNED_ACCESS_TOKEN_TTL,
+    }
+
+
+def decode_token(token, token_type=ACCESS):
+    """Verify ``token`` and return its payload, raise InvalidToken if not"""
+    try:
+        payload = signing.loads(token, salt=_SALT + token_type)
+    except signing.BadSignature:
+        raise InvalidToken('Invalid token.')
+    if payload['exp'] <= time.time():
+        raise InvalidToken('Token has expired.')
+    if get_revocation_list().is_revoked(payload['jti']):
+        raise InvalidToken('Token has been revoked.')
+    return payload
+
+
+def user_for_refresh(payload):
+    """
+    Load the active user of a refresh token ``payload``, raise InvalidToken
+    if it was deactivated, deleted or changed its password since.
+    """
+    user = get_user_model().objects.filter(
+        pk=payload['uid'],
+        is_active=True,
+    ).first()
+    if user is None:
+        raise InvalidToken('User inactive or deleted.')
+    if not constant_time_compare(
+            payload.get('pwd', ''), user.get_session_auth_hash()):
+        raise InvalidToken('Token has been revoked.')
+    return user
+
+
+def user_from_payload(payload):
+    """
+    Build the user from the token claims without querying the database.
+
+    Fields that are not in the token are deferred, they are loaded on
+    first access and left untouched when the instance is saved.
+    """
+    model = get_user_model()
+    claims = {
+        'id': payload['uid'],
+        'email': payload['email'],
+        'is_active': payload['act'],
+        'is_staff': payload['stf'],
+        'is_superuser': payload['su'],
+    }
+    # from_db expects the loaded values in model field order
+    names = [
+        field.attname for field in model._meta.concrete_fields
+        if field.attname in claims
+    ]
+    return model.from_db(
+        router.db_for_read(model),
+        names,
+        [claims[name] for name in names],
+    )
+
+
+class RevocationList:
+    """In-memory set of revoked token ids kept in sync with the database"""
+
+    def __init__(self, sync_interval=None, timer=time.monotonic):
+        self.sync_interval = sync_interval
+        self._timer = timer
+        self._revoked = {}
+        self._last_sync = None
+        self._lock = threading.Lock()
+
+    def _interval(self):
+        if self.sync_interval is not None:
+            return self.sync_interval
+        return settings.SIGNED_TOKEN_REVOCATION_SYNC_INTERVAL
+
+    def needs_sync(self):
+        return self._last_sync is None or \
+            self._timer() - self._last_sync >= self._interval()
+
+    def is_revoked(self, jti):
+        if self.needs_sync():
+            self.sync()
+        return jti in self._revoked
+
+    def sync(self):
+        """Reload the ids of revoked tokens that have not expired yet"""
+        rows = RevokedToken.objects.filter(
+            expires_at__gt=datetime.now(tz=timezone.utc),
+        ).values_list('jti', 'expires_at')
+        revoked = {jti: expires_at.timestamp() for jti, expires_at in rows}
+        with self._lock:
+            self._revoked = revoked
+            self._last_sync = self._timer()
+
+    def revoke(self, payload):
+        """Revoke the token described by ``payload`` everywhere"""
+        expires_at = datetime.fromtimestamp(payload['exp'], tz=timezone.utc)
+        RevokedToken.objects.get_or_create(
+            jti=payload['jti'],
+            defaults={'expires_at': expires_at},
+        )
+        RevokedToken.objects.filter(
+            expires_at__lte=datetime.now(tz=timezone.utc)
+        ).delete()
+        with self._lock:
+            self._revoked[payload['jti']] = payload['exp']
+
+    def clear(self):
+        with self._lock:
+            self._revoked = {}
+            self._last_sync = None
+
+
+_revocation_list = RevocationList()
+
+
+def get_revocation_list():
+    return _revocation_list
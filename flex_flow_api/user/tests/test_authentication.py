@@ -0,0 +1,77 @@
+"""
+Test the cached token authentication
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import CachedTokenAuthentication, get_token_cache
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """Test token lookups are cached and invalidated"""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='random_password',
+            name='Test name',
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_second_request_hits_cache(self):
+        """Test the token is only looked up in the database once"""
+        self.client.get(ME_URL)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(get_token_cache().stats()['hits'], 1)
+
+    def test_cached_user_not_shared(self):
+        """Test each request gets its own user and token instances"""
+        authentication = CachedTokenAuthentication()
+        first, first_token = authentication.authenticate_credentials(
+            self.token.key
+        )
+        second, second_token = authentication.authenticate_credentials(
+            self.token.key
+        )
+        self.assertEqual(get_token_cache().stats()['hits'], 1)
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+        self.assertIs(second_token.user, second)
+        first.name = 'changed'
+        self.assertEqual(second.name, 'Test name')
+
+    def test_deleted_token_invalidated(self):
+        """Test deleting a token removes it from the cache"""
+        self.client.get(ME_URL)
+        self.token.delete()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_invalidated(self):
+        """Test deactivating a user removes their tokens from the cache"""
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_invalidates(self):
+        """Test updating the password through /me/ drops cached entries"""
+        self.client.get(ME_URL)
+        res = self.client.patch(ME_URL, {'password': 'new_password'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(get_token_cache()), 0)
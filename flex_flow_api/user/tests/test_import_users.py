@@ -0,0 +1,166 @@
+"""
+Test bulk user provisioning
+"""
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user.provisioning import hash_passwords, import_users
+
+IMPORT_URL = reverse('user:import')
+
+CSV_CONTENT = (
+    'email,password,name\n'
+    'one@example.com,password1,One\n'
+    'two@example.com,password2,Two\n'
+    'one@example.com,password3,Duplicate\n'
+    'not-an-email,password4,Bad\n'
+    'existing@example.com,password5,Existing\n'
+    'short@example.com,pw,Short\n'
+)
+
+
+class ImportUsersTests(TestCase):
+    """Test importing users from files"""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            email='existing@example.com',
+            password='admin_password',
+        )
+
+    def _assert_report(self, created, failed):
+        self.assertEqual(created, 2)
+        self.assertEqual(
+            [(row['line'], row['email']) for row in failed],
+            [
+                (4, 'one@example.com'),
+                (5, 'not-an-email'),
+                (6, 'existing@example.com'),
+                (7, 'short@example.com'),
+            ]
+        )
+        user = get_user_model().objects.get(email='two@example.com')
+        self.assertTrue(user.check_password('password2'))
+        self.assertEqual(user.name, 'Two')
+
+    def test_import_command_csv(self):
+        """Test the command creates valid rows and reports bad ones"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'users.csv')
+            with open(path, 'w') as fp:
+                fp.write(CSV_CONTENT)
+            out, err = StringIO(), StringIO()
+            call_command('import_users', path, '--workers', '1',
+                         stdout=out, stderr=err)
+        self.assertIn('Created 2 users, 4 rows failed', out.getvalue())
+        self.assertEqual(len(err.getvalue().splitlines()), 4)
+
+    def test_import_command_ndjson(self):
+        """Test importing newline delimited JSON"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'users.ndjson')
+            with open(path, 'w') as fp:
+                fp.write('{"email": "a@example.com", "password": "secret"}\n')
+                fp.write('not json\n')
+            out = StringIO()
+            call_command('import_users', path, '--workers', '1',
+                         stdout=out, stderr=StringIO())
+        self.assertIn('Created 1 users, 1 rows failed', out.getvalue())
+        self.assertTrue(
+            get_user_model().objects.filter(email='a@example.com').exists()
+        )
+
+    def test_import_rejects_non_text_and_long_values(self):
+        """Test wrongly typed or over-long fields fail only their row"""
+        long_email = 'a' * 250 + '@example.com'
+        report = import_users([
+            (1, {'email': 5, 'password': 'secret'}),
+            (2, {'email': 'b@example.com', 'password': 123456}),
+            (3, {'email': 'c@example.com', 'password': 'secret',
+                 'name': ['C']}),
+            (4, {'email': long_email, 'password': 'secret'}),
+            (5, {'email': 'd@example.com', 'password': 'secret',
+                 'name': 'D' * 256}),
+            (6, {'email': 'e@example.com', 'password': 'secret'}),
+        ], workers=1)
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(
+            [(row['line'], row['email'], row['error'])
+             for row in report['failed']],
+            [
+                (1, None, 'email must be text'),
+                (2, 'b@example.com', 'password must be text'),
+                (3, 'c@example.com', 'name must be text'),
+                (4, long_email, 'email is too long'),
+                (5, 'd@example.com', 'name is too long'),
+            ]
+        )
+        self.assertTrue(
+            get_user_model().objects.filter(email='e@example.com').exists()
+        )
+
+    @override_settings(USER_IMPORT_WORKERS=1)
+    def test_import_endpoint(self):
+        """Test admins can import a csv through the API"""
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        res = client.post(IMPORT_URL, {
+            'file': SimpleUploadedFile('users.csv', CSV_CONTENT.encode()),
+            'format': 'csv',
+        }, format='multipart')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self._assert_report(res.data['created'], res.data['failed'])
+
+    def test_import_endpoint_rejects_malformed_files(self):
+        """Test files that are not UTF-8 CSV are rejected with 400"""
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        for content in (
+            CSV_CONTENT.replace('Two', 'Zoë').encode('latin-1'),
+            # a field over the csv module's size limit
+            b'email,password\na@example.com,' + b'x' * 200000 + b'\n',
+        ):
+            res = client.post(IMPORT_URL, {
+                'file': SimpleUploadedFile('users.csv', content),
+                'format': 'csv',
+            }, format='multipart')
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(get_user_model().objects.count(), 1)
+
+    def test_import_command_not_utf8(self):
+        """Test the command reports files that are not UTF-8"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'users.ndjson')
+            with open(path, 'wb') as fp:
+                fp.write('{"name": "Zoë"}\n'.encode('latin-1'))
+            with self.assertRaises(CommandError):
+                call_command('import_users', path, '--workers', '1',
+                             stdout=StringIO(), stderr=StringIO())
+
+    def test_import_endpoint_admin_only(self):
+        """Test regular users can't import users"""
+        user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='user_password',
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        res = client.post(IMPORT_URL, {
+            'file': SimpleUploadedFile('users.csv', CSV_CONTENT.encode()),
+        }, format='multipart')
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_hash_passwords_in_pool(self):
+        """Test hashing in worker processes keeps the input order"""
+        hashes = hash_passwords(['first', 'second', 'third'], workers=2)
+        user = get_user_model()(password=hashes[1])
+        self.assertTrue(user.check_password('second'))
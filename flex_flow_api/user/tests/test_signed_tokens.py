@@ -0,0 +1,153 @@
+"""
+Test the signed token authentication mode
+"""
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient, APIRequestFactory
+
+from user import signed_tokens
+from user.authentication import SignedTokenAuthentication
+
+LOGIN_USER_URL = reverse('user:login')
+REFRESH_URL = reverse('user:refresh')
+LOGOUT_URL = reverse('user:logout')
+ME_URL = reverse('user:me')
+
+
+@override_settings(AUTH_TOKEN_MODE='signed')
+class SignedTokenApiTests(TestCase):
+    """Test issuing, verifying and revoking signed tokens"""
+
+    def setUp(self):
+        signed_tokens.get_revocation_list().clear()
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='random_password',
+            name='Test name',
+        )
+        self.client = APIClient()
+        res = self.client.post(LOGIN_USER_URL, {
+            'email': 'user@example.com',
+            'password': 'random_password',
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.tokens = res.data
+
+    def _authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_login_issues_token_pair(self):
+        """Test login returns an access and a refresh token"""
+        self.assertIn('token', self.tokens)
+        self.assertIn('refresh', self.tokens)
+
+    def test_access_token_verified_without_queries(self):
+        """Test authenticating does not query the database"""
+        signed_tokens.get_revocation_list().sync()
+        request = APIRequestFactory().get(
+            ME_URL,
+            HTTP_AUTHORIZATION=f"Bearer {self.tokens['token']}",
+        )
+        with CaptureQueriesContext(connection) as queries:
+            user, payload = SignedTokenAuthentication().authenticate(request)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(user, self.user)
+
+    def test_access_token_authenticates(self):
+        """Test the access token can be used on the API"""
+        self._authenticate(self.tokens['token'])
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['name'], 'Test name')
+
+    def test_tampered_token_rejected(self):
+        """Test a modified token is refused"""
+        self._authenticate(self.tokens['token'][:-2] + 'xx')
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_token_not_usable_as_access(self):
+        """Test refresh tokens are signed for their own purpose"""
+        self._authenticate(self.tokens['refresh'])
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(SIGNED_ACCESS_TOKEN_TTL=-1)
+    def test_expired_token_rejected(self):
+        """Test expired access tokens are refused"""
+        self._authenticate(signed_tokens.issue_token(self.user))
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh(self):
+        """Test a refresh token returns a new access token"""
+        res = self.client.post(REFRESH_URL, {
+            'refresh': self.tokens['refresh']
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self._authenticate(res.data['token'])
+        self.assertEqual(
+            self.client.get(ME_URL).status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_logout_revokes_tokens(self):
+        """Test logging out revokes the access and refresh token"""
+        self._authenticate(self.tokens['token'])
+        res = self.client.post(LOGOUT_URL, {
+            'refresh': self.tokens['refresh']
+        })
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = self.client.post(REFRESH_URL, {
+            'refresh': self.tokens['refresh']
+        })
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_revocation_synced_from_database(self):
+        """Test revocations made by other workers are picked up on sync"""
+        payload = signed_tokens.decode_token(self.tokens['token'])
+        other_worker = signed_tokens.RevocationList()
+        other_worker.revoke(payload)
+        revocations = signed_tokens.get_revocation_list()
+        self.assertFalse(revocations.is_revoked(payload['jti']))
+        revocations.sync()
+        self.assertTrue(revocations.is_revoked(payload['jti']))
+
+    def test_update_keeps_fields_missing_from_token(self):
+        """Test saving the token user does not blank deferred fields"""
+        self._authenticate(self.tokens['token'])
+        res = self.client.patch(ME_URL, {'password': 'new_password'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.name, 'Test name')
+        self.assertTrue(self.user.check_password('new_password'))
+
+    def test_password_change_revokes_refresh_tokens(self):
+        """Test refresh tokens issued before a password change are refused"""
+        self.user.set_password('new_password')
+        self.user.save()
+        res = self.client.post(REFRESH_URL, {
+            'refresh': self.tokens['refresh']
+        })
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        refresh = signed_tokens.issue_token(self.user, signed_tokens.REFRESH)
+        res = self.client.post(REFRESH_URL, {'refresh': refresh})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_inactive_user_refused(self):
+        """Test inactive users can neither refresh nor use their tokens"""
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.post(REFRESH_URL, {
+            'refresh': self.tokens['refresh']
+        })
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self._authenticate(signed_tokens.issue_token(self.user))
+        res = self.client.get(ME_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -9,11 +9,26 @@ urlpatterns = [
         views.LoginView.as_view(),
         name="login"
     ),
+    path(
+        "login/refresh/",
+        views.RefreshTokenView.as_view(),
+        name="refresh"
+    ),
+    path(
+        "logout/",
+        views.LogoutView.as_view(),
+        name="logout"
+    ),
     path(
         "register/",
         views.UserCreateView.as_view(),
         name="register"
     ),
+    path(
+        "import/",
+        views.UserImportView.as_view(),
+        name="import"
+    ),
     path(
         "me/",
         views.ManageUserView.as_view(),
@@ -1,25 +1,126 @@
-from rest_framework import authentication, permissions
+from django.conf import settings
+from rest_framework import permissions, status
+from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.exceptions import ParseError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import generics
 from rest_framework.settings import api_settings
 
-from user.serializers import LoginSerializer, UserSerializer
+from user import provisioning, signed_tokens
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+)
+from user.serializers import (
+    LoginSerializer,
+    RefreshTokenSerializer,
+    UserImportSerializer,
+    UserSerializer,
+)
 
 
 class LoginView(ObtainAuthToken):
     serializer_class = LoginSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        if settings.AUTH_TOKEN_MODE != 'signed':
+            return super().post(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+        return Response(signed_tokens.issue_token_pair(user))
+
+
+class RefreshTokenView(APIView):
+    """Exchange a signed refresh token for a new access token"""
+    serializer_class = RefreshTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            user = signed_tokens.user_for_refresh(
+                serializer.validated_data['payload']
+            )
+        except signed_tokens.InvalidToken as exc:
+            return Response(
+                {'detail': str(exc)},
+                status=status.HTTP_401_UNAUTHORIZED,
+            )
+        return Response({
+            'token': signed_tokens.issue_token(user),
+            'expires_in': settings.SIGNED_ACCESS_TOKEN_TTL,
+        })
+
+
+class LogoutView(APIView):
+    """Revoke the token used for this request"""
+    serializer_class = RefreshTokenSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        revocations = signed_tokens.get_revocation_list()
+        if isinstance(request.auth, Token):
+            request.auth.delete()
+        elif isinstance(request.auth, dict):
+            revocations.revoke(request.auth)
+        if 'refresh' in request.data:
+            serializer = self.serializer_class(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            revocations.revoke(serializer.validated_data['payload'])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class UserCreateView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
 
 
+class UserImportView(APIView):
+    """Create users in bulk from an uploaded CSV or NDJSON file"""
+    serializer_class = UserImportSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            rows = provisioning.parse_users_bytes(
+                serializer.validated_data['file'].read(),
+                serializer.validated_data['format'],
+            )
+            report = provisioning.import_users(
+                rows,
+                workers=settings.USER_IMPORT_WORKERS,
+            )
+        except provisioning.ImportFormatError as exc:
+            raise ParseError(str(exc))
+        return Response(report)
+
+
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated User """
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class WorkflowConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'workflow'
+
+    def ready(self):
+        from core.models import Edge, MessageHolder, Node, Workflow
+        from workflow.conditional import graph_changed, workflow_changed
+        from workflow.events import holder_saved
+        for model in (Node, Edge):
+            post_save.connect(graph_changed, sender=model)
+            post_delete.connect(graph_changed, sender=model)
+        post_save.connect(workflow_changed, sender=Workflow)
+        post_save.connect(holder_saved, sender=MessageHolder)
@@ -0,0 +1,105 @@
+"""
+Async versions of the hot workflow read endpoints, routed under ASGI by
+flex_flow_api.asgi_urls. Responses match the DRF viewsets byte for byte
+and share their ETags and graph response cache entries.
+"""
+from asgiref.sync import sync_to_async
+from rest_framework import status
+
+from core.async_views import async_read_view, json_response, render_page
+from core.models import Edge, Message, MessageHolder, Node
+from workflow.conditional import etag_matches, get_graph_version, graph_etag
+from workflow.response_cache import (
+    cache_key,
+    get_graph_cache,
+    get_or_build,
+    is_cacheable,
+)
+from workflow.serializer import (
+    EdgeValuesSerializer,
+    MessageDetailSerializer,
+    MessageValuesSerializer,
+    NodeValuesSerializer,
+)
+from workflow.views import EdgeViewSet, MessageViewSet, NodeViewSet
+
+
+async def _graph_list(request, workflow_pk, view_name, queryset,
+                      serializer_class):
+    """Node/edge list with conditional GET and the graph cache"""
+    version = await sync_to_async(get_graph_version)(workflow_pk)
+    query_string = request.META.get('QUERY_STRING', '')
+    if version is None:
+        content = await sync_to_async(render_page)(
+            request, queryset, serializer_class
+        )
+        return json_response(content)
+    etag = graph_etag(workflow_pk, version, query_string)
+    if etag_matches(request, etag):
+        return json_response(
+            b'', status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag}
+        )
+    cache = get_graph_cache()
+    key = cache_key(view_name, workflow_pk, version, query_string)
+    content = await cache.aget(key)
+    if content is None:
+        def build():
+            content = render_page(request, queryset, serializer_class)
+            return content, is_cacheable(content)
+        content = await sync_to_async(get_or_build)(cache, key, build)
+    return json_response(content, headers={'ETag': etag})
+
+
+@async_read_view(NodeViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def node_list(request, user, workflow_pk):
+    return await _graph_list(
+        request,
+        workflow_pk,
+        'node-list',
+        Node.objects.filter(workflow_id=workflow_pk),
+        NodeValuesSerializer,
+    )
+
+
+@async_read_view(EdgeViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def edge_list(request, user, workflow_pk):
+    return await _graph_list(
+        request,
+        workflow_pk,
+        'edge-list',
+        Edge.objects.filter(workflow_id=workflow_pk),
+        EdgeValuesSerializer,
+    )
+
+
+def _pending_messages(workflow_pk):
+    return Message.objects.filter(
+        id__in=MessageHolder.objects.filter(
+            current_node__workflow_id=workflow_pk,
+            status=MessageHolder.StatusChoices.PENDING,
+        ).values_list('message_id', flat=True)
+    )
+
+
+@async_read_view(MessageViewSet.as_view({'get': 'list', 'post': 'create'}))
+async def message_list(request, user, workflow_pk):
+    content = await sync_to_async(render_page)(
+        request, _pending_messages(workflow_pk), MessageValuesSerializer
+    )
+    return json_response(content)
+
+
+@async_read_view(MessageViewSet.as_view({'get': 'retrieve'}))
+async def message_detail(request, user, workflow_pk, pk):
+    def build():
+        message = _pending_messages(workflow_pk).filter(pk=pk).first()
+        if message is None:
+            return None
+        return MessageDetailSerializer(message).data
+
+    data = await sync_to_async(build)()
+    if data is None:
+        return json_response(
+            {'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND
+        )
+    return json_response(data)
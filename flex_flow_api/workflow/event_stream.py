@@ -0,0 +1,206 @@
+"""
+Server-Sent Events endpoints streaming message holder events of a
+workflow or of one of its nodes, see workflow.events.
+
+Under WSGI ``EventStreamView`` holds a worker thread per client. Under
+ASGI ``EventStreamASGIMiddleware`` answers the same URLs on the event loop
+so an idle client only costs its socket, HEAD is answered there too and
+other methods get 405. Neither keeps a database connection open while
+streaming.
+"""
+import asyncio
+import io
+import json
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import connection
+from django.http import StreamingHttpResponse
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.views import APIView
+
+from core.models import Node, Workflow
+from core.sharding import shard_for_workflow, use_shard
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
+    aauthenticate,
+)
+from workflow.events import get_broker
+
+CONTENT_TYPE = 'text/event-stream'
+OPEN = b'retry: 3000\n\n'
+HEARTBEAT = b': keep-alive\n\n'
+EVENT_METHODS = ('GET', 'HEAD')
+EVENT_HEADERS = [
+    (b'content-type', CONTENT_TYPE.encode()),
+    (b'cache-control', b'no-cache'),
+    (b'x-accel-buffering', b'no'),
+]
+EVENT_PATH = re.compile(
+    r'^/api/workflow/(?P<workflow_pk>\d+)/'
+    r'(?:nodes/(?P<node_pk>\d+)/)?events/$'
+)
+
+
+def format_event(event):
+    return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+def event_target_exists(workflow_pk, node_pk=None):
+    if node_pk is None:
+        return Workflow.objects.filter(pk=workflow_pk).exists()
+    with use_shard(shard_for_workflow(workflow_pk)):
+        return Node.objects.filter(
+            pk=node_pk, workflow_id=workflow_pk
+        ).exists()
+
+
+def stream_events(workflow_pk, node_pk=None):
+    """Yield SSE chunks until the subscriber falls too far behind"""
+    subscription = get_broker().subscribe(workflow_pk, node_pk)
+    try:
+        if not connection.in_atomic_block:
+            # nothing below queries, free the connection for other requests
+            connection.close()
+        yield OPEN
+        while not subscription.overflowed:
+            event = subscription.get(timeout=settings.EVENT_STREAM_HEARTBEAT)
+            yield HEARTBEAT if event is None else format_event(event)
+    finally:
+        subscription.close()
+
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = CONTENT_TYPE
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # only used for error responses, the stream bypasses renderers
+        return json.dumps(data).encode()
+
+
+class EventStreamView(APIView):
+    """Stream created, approved and rejected message holders"""
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
+    permission_classes = (IsAuthenticated,)
+    renderer_classes = (EventStreamRenderer, JSONRenderer)
+
+    @extend_schema(responses={(200, CONTENT_TYPE): OpenApiTypes.STR})
+    def get(self, request, workflow_pk, node_pk=None):
+        if not event_target_exists(workflow_pk, node_pk):
+            raise NotFound()
+        response = StreamingHttpResponse(
+            stream_events(workflow_pk, node_pk),
+            content_type=CONTENT_TYPE,
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _send_error(send, status_code, detail, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status_code,
+        'headers': [(b'content-type', b'application/json'), *headers],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps({'detail': detail}).encode(),
+    })
+
+
+async def serve_events(scope, receive, send, workflow_pk, node_pk=None):
+    """ASGI handler of the event stream URLs"""
+    user = await aauthenticate(ASGIRequest(scope, io.BytesIO()))
+    if user is None or not user.is_active:
+        return await _send_error(
+            send,
+            status.HTTP_401_UNAUTHORIZED,
+            'Authentication credentials were not provided.',
+            [(b'www-authenticate', b'Token')],
+        )
+    if not await sync_to_async(event_target_exists)(workflow_pk, node_pk):
+        return await _send_error(send, status.HTTP_404_NOT_FOUND,
+                                 'Not found.')
+    if scope['method'] == 'HEAD':
+        await send({
+            'type': 'http.response.start',
+            'status': status.HTTP_200_OK,
+            'headers': EVENT_HEADERS,
+        })
+        return await send({'type': 'http.response.body', 'body': b''})
+    subscription = get_broker().subscribe(
+        workflow_pk, node_pk, loop=asyncio.get_running_loop()
+    )
+    disconnected = asyncio.ensure_future(_wait_for_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': status.HTTP_200_OK,
+            'headers': EVENT_HEADERS,
+        })
+        chunk = OPEN
+        while True:
+            await send({
+                'type': 'http.response.body',
+                'body': chunk,
+                'more_body': True,
+            })
+            if subscription.overflowed:
+                break
+            next_event = asyncio.ensure_future(
+                subscription.aget(settings.EVENT_STREAM_HEARTBEAT)
+            )
+            await asyncio.wait(
+                {next_event, disconnected},
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected.done():
+                next_event.cancel()
+                return
+            event = next_event.result()
+            chunk = HEARTBEAT if event is None else format_event(event)
+        await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+class EventStreamASGIMiddleware:
+    """
+    Serve the event stream URLs natively, pass the rest to ``app``. The
+    sync view is never reached from here, it would close the database
+    connection on the event loop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        match = scope['type'] == 'http' and EVENT_PATH.match(scope['path'])
+        if not match:
+            return await self.app(scope, receive, send)
+        if scope['method'] not in EVENT_METHODS:
+            return await _send_error(
+                send,
+                status.HTTP_405_METHOD_NOT_ALLOWED,
+                f"Method \"{scope['method']}\" not allowed.",
+                [(b'allow', ', '.join(EVENT_METHODS).encode())],
+            )
+        await serve_events(scope, receive, send, **match.groupdict())
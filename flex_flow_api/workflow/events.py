@@ -0,0 +1,219 @@
+"""
+Message holder events for the Server-Sent Events endpoints.
+
+Creating, approving or rejecting a ``MessageHolder`` publishes an event
+once the surrounding transaction commits. On PostgreSQL events travel
+over ``LISTEN/NOTIFY`` so every worker process sees them, one listener
+thread per process fans them out to the local subscribers. Other
+databases (SQLite in tests) use an in-process broker.
+"""
+import asyncio
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core import metrics
+from core.models import MessageHolder, Node
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'flexflow_events'
+
+
+class Subscription:
+    """
+    Queue of events for one workflow, optionally one node of it.
+
+    Pass ``loop`` to consume the events from that asyncio loop with
+    ``aget``, otherwise use the blocking ``get``. A subscriber that falls
+    more than ``EVENT_STREAM_QUEUE_SIZE`` events behind is marked
+    ``overflowed`` and should reconnect and refetch.
+    """
+
+    def __init__(self, broker, workflow_id, node_id=None, loop=None):
+        self.broker = broker
+        self.workflow_id = str(workflow_id)
+        self.node_id = None if node_id is None else str(node_id)
+        self.loop = loop
+        self.overflowed = False
+        maxsize = settings.EVENT_STREAM_QUEUE_SIZE
+        if loop is None:
+            self._queue = queue.Queue(maxsize)
+        else:
+            self._queue = asyncio.Queue(maxsize)
+
+    def matches(self, event):
+        if str(event['workflow']) != self.workflow_id:
+            return False
+        return self.node_id is None or str(event['node']) == self.node_id
+
+    def put(self, event):
+        if self.loop is None:
+            self._put(event)
+        else:
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self._queue.put_nowait(event)
+        except (queue.Full, asyncio.QueueFull):
+            self.overflowed = True
+
+    def get(self, timeout=None):
+        """Next event, None when nothing arrived within ``timeout``"""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    async def aget(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Deliver events to subscribers of this process only"""
+
+    def __init__(self):
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, workflow_id, node_id=None, loop=None):
+        subscription = Subscription(self, workflow_id, node_id, loop)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event, using=None):
+        """Publish ``event`` when the transaction on ``using`` commits"""
+        transaction.on_commit(lambda: self.dispatch(event), using=using)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            if subscription.matches(event):
+                subscription.put(event)
+
+
+class PostgresBroker(LocalBroker):
+    """Deliver events to every process through LISTEN/NOTIFY"""
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, poll_interval=5):
+        super().__init__()
+        self.using = using
+        self.poll_interval = poll_interval
+        self._listener = None
+
+    def subscribe(self, workflow_id, node_id=None, loop=None):
+        self._start_listener()
+        return super().subscribe(workflow_id, node_id, loop)
+
+    def publish(self, event, using=None):
+        if using not in (None, self.using):
+            # written on a shard, notify once that transaction commits
+            transaction.on_commit(lambda: self._notify(event), using=using)
+        else:
+            self._notify(event)
+
+    def _notify(self, event):
+        # notifications are only delivered once the transaction commits
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)',
+                [CHANNEL, json.dumps(event)],
+            )
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(
+                target=self._listen,
+                name='flexflow-events',
+                daemon=True,
+            )
+            self._listener.start()
+
+    def _listen(self):
+        import psycopg2
+        params = connections[self.using].get_connection_params()
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(**params)
+                conn.set_session(autocommit=True)
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                while True:
+                    ready, _, _ = select.select(
+                        [conn], [], [], self.poll_interval
+                    )
+                    if not ready:
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.dispatch(json.loads(notify.payload))
+            except Exception:
+                logger.exception('Event listener failed, reconnecting')
+                if conn is not None:
+                    conn.close()
+                time.sleep(self.poll_interval)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        backend = settings.EVENT_BROKER
+        if backend == 'auto':
+            vendor = connections[DEFAULT_DB_ALIAS].vendor
+            backend = 'postgres' if vendor == 'postgresql' else 'local'
+        _broker = PostgresBroker() if backend == 'postgres' \
+            else LocalBroker()
+    return _broker
+
+
+def holder_workflow_id(holder):
+    if MessageHolder.current_node.field.is_cached(holder):
+        return holder.current_node.workflow_id
+    return Node.objects.filter(
+        pk=holder.current_node_id
+    ).values_list('workflow_id', flat=True).first()
+
+
+def holder_saved(sender, instance, created, using=None, **kwargs):
+    """post_save receiver for MessageHolder"""
+    if created:
+        name = 'holder.created'
+    elif instance.status != MessageHolder.StatusChoices.PENDING:
+        name = f'holder.{instance.status}'
+    else:
+        return
+    get_broker().publish({
+        'event': name,
+        'workflow': holder_workflow_id(instance),
+        'node': instance.current_node_id,
+        'message': instance.message_id,
+        'holder': instance.pk,
+        'status': instance.status,
+    }, using=using)
+    metrics.events_published_total.inc(event=name)
@@ -0,0 +1,137 @@
+"""
+Compressed sparse row (CSR) form of a workflow graph.
+
+``nodes`` holds the node ids in ascending order. The edges leaving
+``nodes[i]`` are ``edges[offsets[i]:offsets[i + 1]]`` (edge ids) and lead
+to ``nodes[targets[j]]``, so targets are indices into ``nodes``. The edge
+list (``?graph=csr``) and the workflow detail (``?graph=csr``, under
+``graph``) return it as JSON arrays. The ``CSRRenderer`` (``Accept:
+application/vnd.flexflow.csr`` or ``?format=csr``) sends it packed, all
+little endian:
+
+    b'FFG1', uint32 node count N, uint32 edge count E,
+    int64 nodes[N], uint32 offsets[N + 1], uint32 targets[E],
+    int64 edges[E]
+"""
+import struct
+import sys
+from array import array
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+
+from core.models import Edge, Node
+
+GRAPH_PARAM = 'graph'
+CSR = 'csr'
+MEDIA_TYPE = 'application/vnd.flexflow.csr'
+MAGIC = b'FFG1'
+_HEADER = struct.Struct('<4sII')
+
+
+class CSRGraph(dict):
+    """The ``nodes``, ``offsets``, ``targets`` and ``edges`` arrays"""
+
+
+def build_csr(workflow_id):
+    """CSR graph of a workflow, two queries"""
+    nodes = list(
+        Node.objects.filter(workflow_id=workflow_id)
+        .order_by('id').values_list('id', flat=True)
+    )
+    index = {node: position for position, node in enumerate(nodes)}
+    offsets = [0] * (len(nodes) + 1)
+    targets = []
+    edges = []
+    rows = Edge.objects.filter(workflow_id=workflow_id).order_by(
+        'n_from_id', 'id'
+    ).values_list('id', 'n_from_id', 'n_to_id')
+    for edge, source, target in rows:
+        offsets[index[source] + 1] += 1
+        targets.append(index[target])
+        edges.append(edge)
+    for position in range(len(nodes)):
+        offsets[position + 1] += offsets[position]
+    return CSRGraph(nodes=nodes, offsets=offsets, targets=targets, edges=edges)
+
+
+def _pack_array(typecode, values):
+    packed = array(typecode, values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def pack(graph):
+    return b''.join([
+        _HEADER.pack(MAGIC, len(graph['nodes']), len(graph['edges'])),
+        _pack_array('q', graph['nodes']),
+        _pack_array('I', graph['offsets']),
+        _pack_array('I', graph['targets']),
+        _pack_array('q', graph['edges']),
+    ])
+
+
+def unpack(data):
+    """Read a graph written by ``pack``"""
+    magic, node_count, edge_count = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError('Not a packed CSR graph')
+    graph = CSRGraph()
+    position = _HEADER.size
+    for name, typecode, count in (
+        ('nodes', 'q', node_count),
+        ('offsets', 'I', node_count + 1),
+        ('targets', 'I', edge_count),
+        ('edges', 'q', edge_count),
+    ):
+        values = array(typecode)
+        size = values.itemsize * count
+        values.frombytes(data[position:position + size])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        graph[name] = values.tolist()
+        position += size
+    return graph
+
+
+class CSRRenderer(BaseRenderer):
+    """Packed CSR graphs, anything else (errors) as JSON"""
+    media_type = MEDIA_TYPE
+    format = CSR
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, CSRGraph):
+            return pack(data)
+        response = (renderer_context or {}).get('response')
+        if response is not None:
+            response['Content-Type'] = JSONRenderer.media_type
+        return JSONRenderer().render(data)
+
+
+class CSRGraphMixin:
+    """Answer ``csr_actions`` with the CSR graph of the workflow when asked"""
+    csr_actions = ('list',)
+
+    def wants_csr(self):
+        if self.action not in self.csr_actions:
+            return False
+        return self.request.query_params.get(GRAPH_PARAM) == CSR or \
+            self.request.accepted_renderer.format == CSR
+
+    def list(self, request, *args, **kwargs):
+        if not self.wants_csr():
+            return super().list(request, *args, **kwargs)
+        return Response(build_csr(self.get_graph_workflow_id()))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.wants_csr():
+            return super().retrieve(request, *args, **kwargs)
+        workflow = self.get_object()
+        graph = build_csr(workflow.pk)
+        if request.accepted_renderer.format == CSR:
+            return Response(graph)
+        serializer = self.get_serializer(workflow)
+        serializer.fields.pop('nodes', None)
+        return Response({**serializer.data, GRAPH_PARAM: graph})
@@ -0,0 +1,49 @@
+"""
+Counter based AND-joins.
+
+A join node (``Node.is_join_node``) holds a message once every incoming
+branch approved it, instead of once per branch. Each arrival increments
+the ``JoinArrival`` counter of the message at the node with a single
+UPDATE, whose row lock orders concurrent arrivals until their transitions
+commit. The arrival bringing the counter to the in-degree of the node,
+counted when the first branch arrives, releases the message. No sibling
+holders are looked at.
+"""
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+
+from core import metrics
+from core.models import Edge, JoinArrival
+
+
+def in_degree(node):
+    return Edge.objects.filter(n_to=node).count()
+
+
+def arrive(message_id, node):
+    """Count a branch reaching a join node, True when it is the last one"""
+    released = _arrive(message_id, node)
+    metrics.join_arrivals_total.inc(
+        outcome='released' if released else 'waiting'
+    )
+    return released
+
+
+def _arrive(message_id, node):
+    counter = JoinArrival.objects.filter(message_id=message_id, node=node)
+    if not counter.update(arrivals=F('arrivals') + 1):
+        expected = in_degree(node)
+        try:
+            with transaction.atomic(using=router.db_for_write(JoinArrival)):
+                JoinArrival.objects.create(
+                    message_id=message_id,
+                    node=node,
+                    arrivals=1,
+                    expected=expected,
+                )
+            return expected <= 1
+        except IntegrityError:
+            # a concurrent first arrival created the counter
+            counter.update(arrivals=F('arrivals') + 1)
+    arrivals, expected = counter.values_list('arrivals', 'expected').get()
+    return arrivals == expected
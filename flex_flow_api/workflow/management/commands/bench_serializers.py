@@ -0,0 +1,91 @@
+"""
+Django command to compare the model and values() serializers of the lists
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import Edge, Message, Node, Workflow
+from workflow.serializer import (
+    EdgeDetailSerializer,
+    EdgeValuesSerializer,
+    MessageSerializer,
+    MessageValuesSerializer,
+    NodeSerializer,
+    NodeValuesSerializer,
+)
+
+LISTS = (
+    ('nodes', Node, NodeSerializer, NodeValuesSerializer),
+    ('edges', Edge, EdgeDetailSerializer, EdgeValuesSerializer),
+    ('messages', Message, MessageSerializer, MessageValuesSerializer),
+)
+
+
+def _rows_per_second(render, rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        render()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return rows / best
+
+
+class Command(BaseCommand):
+    help = 'Generate rows and measure the rows per second rendered by the ' \
+           'model and the values() serializers, rolled back at the end'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError('--rows and --repeat must be >= 1')
+        with transaction.atomic():
+            self._run(options['rows'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def _run(self, count, repeat):
+        user = get_user_model().objects.create_user(
+            email='bench_serializers@example.com',
+        )
+        workflow = Workflow.objects.create(title='bench', create_by=user)
+        Node.objects.bulk_create(
+            Node(
+                workflow=workflow,
+                title=f'Node {index}',
+                description='Approval step',
+            )
+            for index in range(count)
+        )
+        nodes = list(Node.objects.filter(workflow=workflow).order_by('id'))
+        Edge.objects.bulk_create(
+            Edge(workflow=workflow, n_from=first, n_to=second)
+            for first, second in zip(nodes, nodes[1:] + nodes[:1])
+        )
+        Message.objects.bulk_create(
+            Message(issuer=user, message=f'Message {index}')
+            for index in range(count)
+        )
+        for name, model, serializer_class, values_class in LISTS:
+            queryset = model.objects.order_by('id')[:count]
+            before = _rows_per_second(
+                lambda: serializer_class(queryset.all(), many=True).data,
+                count,
+                repeat,
+            )
+            values = values_class().values(queryset)
+            after = _rows_per_second(
+                lambda: values_class(values.all(), many=True).data,
+                count,
+                repeat,
+            )
+            self.stdout.write(
+                f'{name:<9} {before:12,.0f} rows/s -> {after:12,.0f} '
+                f'rows/s ({after / before:.1f}x)'
+            )
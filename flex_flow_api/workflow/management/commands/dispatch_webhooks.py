@@ -0,0 +1,51 @@
+"""
+Django command to deliver outbox events to webhook subscribers
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.sharding import shard_aliases, use_shard
+from workflow.outbox import dispatch_due_events
+
+
+class Command(BaseCommand):
+    help = 'Deliver pending workflow events to their webhooks in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Deliver the events due now and exit',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Seconds to sleep when no event was due',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Events claimed per round, defaults to '
+                 'WEBHOOK_DISPATCH_LIMIT',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command"""
+        while True:
+            delivered = failed = 0
+            for alias in shard_aliases():
+                with use_shard(alias):
+                    counts = dispatch_due_events(options['limit'])
+                delivered += counts[0]
+                failed += counts[1]
+            if delivered or failed:
+                self.stdout.write(
+                    f'Delivered {delivered} events, {failed} failed'
+                )
+            if options['once']:
+                return
+            if not delivered and not failed:
+                time.sleep(options['interval'])
@@ -0,0 +1,259 @@
+"""
+Transactional outbox of workflow events and their webhook delivery.
+
+``record_event`` writes one ``OutboxEvent`` per active subscription of the
+workflow inside the caller's transaction, so an event exists exactly when
+the change it describes was committed and the request never waits for a
+subscriber. The ``dispatch_webhooks`` command claims due events, posts
+them to each subscriber in batches and reschedules failed deliveries with
+exponential backoff until ``WEBHOOK_MAX_ATTEMPTS`` is reached.
+
+Batches are posted as ``{"events": [...]}`` JSON. When the subscription
+has a secret the body is signed with HMAC-SHA256 in the
+``X-FlexFlow-Signature`` header.
+
+Only http(s) URLs are accepted. Unless ``WEBHOOK_ALLOW_PRIVATE_HOSTS`` is
+set, hosts resolving to loopback, private, link-local or other non-global
+addresses are refused, the connection goes to the checked address and
+redirects are not followed.
+"""
+import hashlib
+import hmac
+import http.client
+import ipaddress
+import json
+import socket
+import ssl
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.models import OutboxEvent, WebhookSubscription
+
+MESSAGE_FINISHED = 'message.finished'
+SIGNATURE_HEADER = 'X-FlexFlow-Signature'
+SCHEMES = {'http': 80, 'https': 443}
+
+
+class UnsafeURLError(ValueError):
+    """A webhook URL that must not be posted to"""
+
+
+def record_event(workflow_id, event, payload):
+    """Queue ``event`` for every active webhook of the workflow"""
+    subscriptions = WebhookSubscription.objects.filter(
+        workflow_id=workflow_id,
+        is_active=True,
+    ).values_list('id', flat=True)
+    OutboxEvent.objects.bulk_create([
+        OutboxEvent(subscription_id=pk, event=event, payload=payload)
+        for pk in subscriptions
+    ])
+
+
+def sign(body, secret):
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def is_internal(address):
+    address = ipaddress.ip_address(address)
+    if getattr(address, 'ipv4_mapped', None):
+        address = address.ipv4_mapped
+    return not address.is_global or address.is_multicast
+
+
+def check_url(url):
+    """Scheme, host and port of a webhook URL, raise if it is unsafe"""
+    parts = urlsplit(url)
+    if parts.scheme not in SCHEMES or not parts.hostname:
+        raise UnsafeURLError('Only http and https URLs are allowed')
+    host = parts.hostname
+    if not settings.WEBHOOK_ALLOW_PRIVATE_HOSTS:
+        if host == 'localhost' or host.endswith('.localhost'):
+            raise UnsafeURLError(f'{host} is an internal host')
+        try:
+            internal = is_internal(host)
+        except ValueError:
+            internal = False
+        if internal:
+            raise UnsafeURLError(f'{host} is an internal address')
+    return parts.scheme, host, parts.port or SCHEMES[parts.scheme]
+
+
+def resolve(host, port):
+    """Address to connect to for ``host``, raise if any is internal"""
+    addresses = [
+        info[4][0] for info in socket.getaddrinfo(
+            host, port, type=socket.SOCK_STREAM
+        )
+    ]
+    if not settings.WEBHOOK_ALLOW_PRIVATE_HOSTS:
+        for address in addresses:
+            if is_internal(address):
+                raise UnsafeURLError(
+                    f'{host} resolves to the internal address {address}'
+                )
+    return addresses[0]
+
+
+class _PinnedConnection:
+    """Connect to an already checked address, not a new lookup"""
+
+    def __init__(self, host, address, **kwargs):
+        super().__init__(host, **kwargs)
+        self.address = address
+
+    def _open(self):
+        return socket.create_connection(
+            (self.address, self.port), self.timeout
+        )
+
+
+class PinnedHTTPConnection(_PinnedConnection, http.client.HTTPConnection):
+    def connect(self):
+        self.sock = self._open()
+
+
+class PinnedHTTPSConnection(_PinnedConnection, http.client.HTTPSConnection):
+    def connect(self):
+        self.sock = self._context.wrap_socket(
+            self._open(), server_hostname=self.host
+        )
+
+
+def post_batch(subscription, events):
+    """POST ``events`` to the subscription, raise on any failure"""
+    body = json.dumps(
+        {'events': [
+            {
+                'id': event.id,
+                'event': event.event,
+                'created_at': event.created_at,
+                'payload': event.payload,
+            }
+            for event in events
+        ]},
+        cls=DjangoJSONEncoder,
+    ).encode()
+    scheme, host, port = check_url(subscription.url)
+    address = resolve(host, port)
+    headers = {'Content-Type': 'application/json'}
+    if subscription.secret:
+        headers[SIGNATURE_HEADER] = sign(body, subscription.secret)
+    if scheme == 'https':
+        connection = PinnedHTTPSConnection(
+            host, address, port=port, timeout=settings.WEBHOOK_TIMEOUT,
+            context=ssl.create_default_context(),
+        )
+    else:
+        connection = PinnedHTTPConnection(
+            host, address, port=port, timeout=settings.WEBHOOK_TIMEOUT,
+        )
+    parts = urlsplit(subscription.url)
+    path = parts.path or '/'
+    if parts.query:
+        path = f'{path}?{parts.query}'
+    try:
+        connection.request('POST', path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+    finally:
+        connection.close()
+    # redirects are failures too, they are not followed
+    if not 200 <= response.status < 300:
+        raise http.client.HTTPException(
+            f'HTTP {response.status} {response.reason}'
+        )
+
+
+def backoff(attempts):
+    """Delay before retrying a delivery that failed ``attempts`` times"""
+    return timedelta(seconds=min(
+        settings.WEBHOOK_RETRY_BASE_DELAY * 2 ** (attempts - 1),
+        settings.WEBHOOK_RETRY_MAX_DELAY,
+    ))
+
+
+def claim_due_events(limit):
+    """
+    Lock up to ``limit`` due events and push their next attempt past the
+    delivery lease, so concurrent dispatchers skip them.
+    """
+    now = timezone.now()
+    with transaction.atomic(using=router.db_for_write(OutboxEvent)):
+        ids = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxEvent.StatusChoices.PENDING,
+                next_attempt_at__lte=now,
+            ).order_by('next_attempt_at', 'id').values_list(
+                'id', flat=True
+            )[:limit]
+        )
+        OutboxEvent.objects.filter(id__in=ids).update(
+            next_attempt_at=now + timedelta(
+                seconds=settings.WEBHOOK_DELIVERY_LEASE
+            )
+        )
+    return list(
+        OutboxEvent.objects.filter(id__in=ids).select_related(
+            'subscription'
+        ).order_by('id')
+    )
+
+
+def _failed(events, error):
+    now = timezone.now()
+    for event in events:
+        event.attempts += 1
+        event.last_error = error[:1000]
+        if event.attempts >= settings.WEBHOOK_MAX_ATTEMPTS:
+            event.status = OutboxEvent.StatusChoices.FAILED
+        else:
+            event.next_attempt_at = now + backoff(event.attempts)
+    OutboxEvent.objects.bulk_update(
+        events, ['attempts', 'last_error', 'status', 'next_attempt_at']
+    )
+
+
+def dispatch_due_events(limit=None, send=post_batch):
+    """
+    Deliver one round of due events, batched per subscription.
+
+    Returns ``(delivered, failed)`` event counts.
+    """
+    limit = limit or settings.WEBHOOK_DISPATCH_LIMIT
+    batches = defaultdict(list)
+    for event in claim_due_events(limit):
+        batches[event.subscription].append(event)
+    delivered = failed = 0
+    for subscription, events in batches.items():
+        size = settings.WEBHOOK_BATCH_SIZE
+        for start in range(0, len(events), size):
+            batch = events[start:start + size]
+            ids = [event.id for event in batch]
+            if not subscription.is_active:
+                OutboxEvent.objects.filter(id__in=ids).update(
+                    status=OutboxEvent.StatusChoices.FAILED,
+                    last_error='Subscription is inactive',
+                )
+                failed += len(batch)
+                continue
+            try:
+                send(subscription, batch)
+            except Exception as exc:
+                # whatever a subscriber does, the other batches go on
+                _failed(batch, f'{type(exc).__name__}: {exc}')
+                failed += len(batch)
+                continue
+            OutboxEvent.objects.filter(id__in=ids).update(
+                status=OutboxEvent.StatusChoices.DELIVERED,
+                attempts=F('attempts') + 1,
+            )
+            delivered += len(batch)
+    return delivered, failed
@@ -0,0 +1,136 @@
+"""
+Cache of rendered JSON for the workflow graph endpoints.
+
+Entries live in the ``GRAPH_CACHE_ALIAS`` Django cache (local memory by
+default, a FileBasedCache location can be shared by several workers) and
+are keyed by view, workflow id, graph version and query string, so a
+graph change never has to delete anything: later requests just miss and
+stale versions age out of the cache. Only one worker rebuilds a missing
+entry, the others wait for it for up to ``GRAPH_CACHE_LOCK_WAIT`` seconds.
+"""
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from core import metrics
+from workflow.conditional import GraphVersionMixin
+
+JSON_CONTENT_TYPE = 'application/json'
+
+
+def get_graph_cache():
+    return caches[settings.GRAPH_CACHE_ALIAS]
+
+
+def cache_key(view_name, workflow_id, version, query_string=''):
+    digest = hashlib.sha1(query_string.encode()).hexdigest()
+    return f'graph:{view_name}:{workflow_id}:{version}:{digest}'
+
+
+def get_or_build(cache, key, build, lock_timeout=None, wait=None,
+                 poll=0.01):
+    """
+    Return the cached value for ``key`` or store the result of ``build``.
+
+    ``build`` returns ``(value, cacheable)``. Concurrent callers missing the
+    same key wait for the one holding the rebuild lock instead of all
+    running ``build``.
+    """
+    if lock_timeout is None:
+        lock_timeout = settings.GRAPH_CACHE_LOCK_TIMEOUT
+    if wait is None:
+        wait = settings.GRAPH_CACHE_LOCK_WAIT
+    value = cache.get(key)
+    if value is not None:
+        metrics.graph_cache_lookups_total.inc(result='hit')
+        return value
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, lock_timeout):
+        deadline = time.monotonic() + wait
+        while time.monotonic() < deadline:
+            time.sleep(poll)
+            value = cache.get(key)
+            if value is not None:
+                metrics.graph_cache_lookups_total.inc(result='wait')
+                return value
+        metrics.graph_cache_lookups_total.inc(result='timeout')
+        return build()[0]
+    metrics.graph_cache_lookups_total.inc(result='miss')
+    try:
+        value, cacheable = build()
+        if cacheable:
+            cache.set(key, value)
+        return value
+    finally:
+        cache.delete(lock_key)
+
+
+def is_cacheable(content):
+    # never share what an uncommitted transaction has seen
+    return len(content) <= settings.GRAPH_CACHE_MAX_ENTRY_SIZE and \
+        not transaction.get_connection().in_atomic_block
+
+
+class PrerenderedResponse(Response):
+    """Response sending JSON that was rendered (and cached) earlier"""
+
+    def __init__(self, content, **kwargs):
+        super().__init__(**kwargs)
+        self.prerendered_content = content
+
+    @property
+    def data(self):
+        return json.loads(self.prerendered_content)
+
+    @data.setter
+    def data(self, value):
+        pass
+
+    @property
+    def rendered_content(self):
+        self['Content-Type'] = JSON_CONTENT_TYPE
+        return self.prerendered_content
+
+
+class GraphResponseCacheMixin(GraphVersionMixin):
+    """Serve ``graph_cache_actions`` from the versioned response cache"""
+    graph_cache_actions = ('list',)
+
+    def _cached(self, handler, request, *args, **kwargs):
+        if self.action not in self.graph_cache_actions or \
+                request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        version = self.get_graph_version()
+        if version is None:
+            return handler(request, *args, **kwargs)
+        key = cache_key(
+            f'{self.basename}-{self.action}',
+            self.get_graph_workflow_id(),
+            version,
+            request.META.get('QUERY_STRING', ''),
+        )
+
+        def build():
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response, False
+            content = JSONRenderer().render(response.data)
+            return content, is_cacheable(content)
+
+        content = get_or_build(get_graph_cache(), key, build)
+        if not isinstance(content, bytes):
+            return content
+        return PrerenderedResponse(content)
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
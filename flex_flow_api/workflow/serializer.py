@@ -1,15 +1,21 @@
 from django.contrib.contenttypes.models import ContentType
 from django.core.exceptions import BadRequest
-from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import serializers
+from core import metrics
+from core.fastpath import ValuesSerializer
+from core.fieldsets import SparseFieldsMixin
 from core.models import (
     Workflow,
     Node,
     Edge,
-    Message, MessageHolder, History,
+    Message, MessageHolder, History, HistoryActor,
+    WebhookSubscription,
 )
 from rest_framework.exceptions import PermissionDenied
+from workflow import joins, outbox
 
 
 class EdgeSerializer(serializers.ModelSerializer):
@@ -65,25 +71,15 @@ class EdgeSerializer(serializers.ModelSerializer):
         return edge
 
 
-class EdgeDetailSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = Edge
-        fields = [
-            'id',
-            'n_to',
-            'n_from',
-        ]
-        read_only_fields = ['id', 'n_to', 'n_from']
-
-
-class NodeSerializer(serializers.ModelSerializer):
+class NodeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Node
         fields = [
             'id',
             'title',
             'description',
-            'is_finishing_node'
+            'is_finishing_node',
+            'is_join_node',
         ]
         read_only_fields = ['id', ]
 
@@ -95,11 +91,44 @@ class NodeSerializer(serializers.ModelSerializer):
         return node
 
 
-class WorkflowSerializer(serializers.ModelSerializer):
+class NodeValuesSerializer(ValuesSerializer):
+    """Fast path of NodeSerializer for the node list"""
+    fields = NodeSerializer.Meta.fields
+
+
+class EdgeDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    expandable_fields = {
+        'n_to': (NodeSerializer, {}),
+        'n_from': (NodeSerializer, {}),
+    }
+
+    class Meta:
+        model = Edge
+        fields = [
+            'id',
+            'n_to',
+            'n_from',
+        ]
+        read_only_fields = ['id', 'n_to', 'n_from']
+
+
+class EdgeValuesSerializer(ValuesSerializer):
+    """Fast path of EdgeDetailSerializer for the edge list"""
+    fields = EdgeDetailSerializer.Meta.fields
+    sources = {
+        'n_to': 'n_to_id',
+        'n_from': 'n_from_id',
+    }
+
+
+class WorkflowSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     nodes = serializers.PrimaryKeyRelatedField(
         many=True,
         read_only=True
     )
+    expandable_fields = {
+        'nodes': (NodeSerializer, {'many': True}),
+    }
 
     class Meta:
         model = Workflow
@@ -121,7 +150,29 @@ class WorkflowSerializer(serializers.ModelSerializer):
         return workflow
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class WorkflowSummarySerializer(
+    SparseFieldsMixin,
+    serializers.ModelSerializer
+):
+    """Workflow with graph and workload counts instead of node ids"""
+    node_count = serializers.IntegerField(read_only=True)
+    edge_count = serializers.IntegerField(read_only=True)
+    pending_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Workflow
+        fields = [
+            'id',
+            'title',
+            'description',
+            'node_count',
+            'edge_count',
+            'pending_count',
+        ]
+        read_only_fields = fields
+
+
+class MessageSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = [
@@ -154,9 +205,16 @@ class MessageSerializer(serializers.ModelSerializer):
                 message=message,
                 current_node=node
             )
+        metrics.messages_created_total.inc()
+        metrics.holders_created_total.inc(len(start_node))
         return message
 
 
+class MessageValuesSerializer(ValuesSerializer):
+    """Fast path of MessageSerializer for the message list"""
+    fields = MessageSerializer.Meta.fields
+
+
 class MessageDetailSerializer(serializers.Serializer):
     id = serializers.IntegerField(read_only=True)
     message = serializers.CharField()
@@ -177,27 +235,23 @@ class MessageDetailSerializer(serializers.Serializer):
         super().__init__(*args, **kwargs)
 
 
-class MessageHolderHistoryItem:
-    def __init__(self, user, status, node):
-        self.user = user
-        self.status = status,
-        self.nodeSerializer = node
-
-    def serialize(self):
-        return MessageHolderHistorySerializer(self)
-
+_timestamp = serializers.DateTimeField()
 
-class MessageHolderHistorySerializer(serializers.Serializer):
-    user = serializers.PrimaryKeyRelatedField(
-        queryset=get_user_model().objects.all()
-    )
-    timestamp = serializers.DateTimeField(default=timezone.now)
-    status = serializers.CharField(max_length=255)
-    node = serializers.CharField()
 
-    def __init__(self, *args, **kwargs):
-        args[0].node = args[0].nodeSerializer.data
-        super().__init__(*args, **kwargs)
+def history_entry(user, status, node):
+    """
+    History entry of a status change. Built as a plain dict, the node is
+    kept as the text of its NodeSerializer data like older entries.
+    """
+    return {
+        'user': user.pk,
+        'timestamp': _timestamp.to_representation(timezone.now()),
+        'status': status,
+        'node': str({
+            name: getattr(node, name) for name in NodeSerializer.Meta.fields
+        }),
+        'node_id': node.pk,
+    }
 
 
 class StatusSerializer(serializers.Serializer):
@@ -208,10 +262,18 @@ class StatusSerializer(serializers.Serializer):
 
     def create(self, validated_data):
         """Create a new message, put it in starting nodes"""
+        # the holders live on the shard of the workflow
+        with transaction.atomic(using=router.db_for_write(MessageHolder)):
+            return self._transition(validated_data)
+
+    def _transition(self, validated_data):
         message_id = self.context['view'].kwargs.get('message_pk')
         workflow_id = self.context['view'].kwargs.get('workflow_pk')
         workflow = Workflow.objects.filter(pk=workflow_id).first()
-        messageHolder = MessageHolder.objects.get(
+        # locked, a concurrent approval of the same holder would count a
+        # second arrival at the join; the loser finds it no longer pending
+        messageHolder = get_object_or_404(
+            MessageHolder.objects.select_for_update(),
             message_id=message_id,
             current_node=validated_data['node'],
             status=MessageHolder.StatusChoices.PENDING
@@ -220,35 +282,56 @@ class StatusSerializer(serializers.Serializer):
             workflow,
             messageHolder.current_node
         )
-        history, created = History.objects.get_or_create(
+        # locked against compact_history, the archive is not rewritten
+        history, created = History.objects.select_for_update().defer(
+            'archive'
+        ).get_or_create(
             content_type=ContentType.objects.get_for_model(Message),
             object_id=message_id,
             defaults={
-                'histories': []
+                'histories': [],
+                'workflow': workflow,
             }
         )
         if validated_data['status'] == 'approved':
+            released = 0
             for node in next_nodes:
+                if node.is_join_node and \
+                        not joins.arrive(message_id, node):
+                    # other branches have yet to reach the join
+                    continue
                 MessageHolder.objects.create(
                     message=messageHolder.message,
                     current_node=node
                 )
+                released += 1
+            metrics.holders_created_total.inc(released)
             messageHolder.status = messageHolder.StatusChoices.APPROVED
         else:
             messageHolder.status = messageHolder.StatusChoices.REJECTED
 
         messageHolder.save()
-        item = MessageHolderHistoryItem(
+        metrics.transitions_total.inc(outcome=messageHolder.status)
+        history.histories.append(history_entry(
             user=self.context['request'].user,
             status=validated_data['status'],
-            node=NodeSerializer(messageHolder.current_node)
-        )
-        historyserializer = item.serialize().data
-        history.histories.append(historyserializer)
+            node=messageHolder.current_node,
+        ))
+        history.updated_at = timezone.now()
         history.save()
+        HistoryActor.objects.bulk_create(
+            [HistoryActor(history=history, user=self.context['request'].user)],
+            ignore_conflicts=True,
+        )
         if len(next_nodes) == 0 or validated_data['node'].is_finishing_node:
-            #  we were in the last node , TODO
-            # inform user about
+            #  we were in the last node, tell the workflow webhooks
+            outbox.record_event(workflow.pk, outbox.MESSAGE_FINISHED, {
+                'workflow': workflow.pk,
+                'message': int(message_id),
+                'node': messageHolder.current_node_id,
+                'status': messageHolder.status,
+                'user': self.context['request'].user.pk,
+            })
             # if we are at ending node , find all of pending holder
             holders = MessageHolder.objects.filter(
                 message_id=message_id,
@@ -268,3 +351,23 @@ class StatusSerializer(serializers.Serializer):
                 'Status must be approved or rejected'
             )
         return attrs
+
+
+class WebhookSubscriptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookSubscription
+        fields = [
+            'id',
+            'url',
+            'secret',
+            'is_active',
+        ]
+        read_only_fields = ['id']
+        extra_kwargs = {'secret': {'write_only': True}}
+
+    def validate_url(self, value):
+        try:
+            outbox.check_url(value)
+        except outbox.UnsafeURLError as exc:
+            raise serializers.ValidationError(str(exc))
+        return value
@@ -0,0 +1,134 @@
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import History
+from user.authentication import get_token_cache
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+    create_message,
+)
+
+
+@override_settings(ROOT_URLCONF='flex_flow_api.asgi_urls')
+class AsyncReadViewTests(TestCase):
+    """Test the async read endpoints against the DRF views"""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.workflow = create_workflow(self.user)
+        self.n1 = create_node(self.workflow)
+        self.n2 = create_node(self.workflow)
+        self.message = create_message(self.user, self.n1)
+        # Django 4.0's AsyncClient takes raw header names as extra kwargs
+        self.headers = {'Authorization': f'Token {self.token.key}'}
+        self.async_client = AsyncClient()
+        self.drf_client = APIClient()
+        self.drf_client.force_authenticate(self.user)
+        self.prefix = f'/api/workflow/{self.workflow.id}'
+
+    async def assert_same_as_drf(self, url):
+        res = await self.async_client.get(url, **self.headers)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with override_settings(ROOT_URLCONF='flex_flow_api.urls'):
+            expected = await sync_to_async(self.drf_client.get)(url)
+        self.assertEqual(res.json(), expected.json())
+
+    async def test_lists_match_drf_views(self):
+        """Test async list endpoints return what the DRF views return"""
+        for url in (
+            f'{self.prefix}/nodes/',
+            f'{self.prefix}/edges/',
+            f'{self.prefix}/messages/',
+            f'{self.prefix}/messages/{self.message.id}/',
+            '/api/history/',
+        ):
+            with self.subTest(url=url):
+                await self.assert_same_as_drf(url)
+
+    async def test_unauthenticated_request_rejected(self):
+        """Test a request without a valid token gets 401"""
+        res = await self.async_client.get(f'{self.prefix}/nodes/')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        res = await self.async_client.get(
+            f'{self.prefix}/nodes/',
+            Authorization='Token wrong',
+        )
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    async def test_node_list_conditional_get(self):
+        """Test the async node list honors If-None-Match"""
+        res = await self.async_client.get(
+            f'{self.prefix}/nodes/', **self.headers
+        )
+        res = await self.async_client.get(
+            f'{self.prefix}/nodes/',
+            **{'If-None-Match': res['ETag']},
+            **self.headers,
+        )
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_missing_message_returns_404(self):
+        """Test retrieving a message outside the workflow gets 404"""
+        res = await self.async_client.get(
+            f'{self.prefix}/messages/0/', **self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_write_falls_back_to_drf_view(self):
+        """Test POST on an async route is handled by the DRF view"""
+        res = await self.async_client.post(
+            f'{self.prefix}/nodes/',
+            {'title': 'new node', 'description': 'new node'},
+            content_type='application/json',
+            **self.headers,
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    async def test_sparse_fields_fall_back_to_drf_view(self):
+        """Test ?fields= is still served by the DRF view"""
+        res = await self.async_client.get(
+            f'{self.prefix}/nodes/', {'fields': 'id'}, **self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(res.json()['results'][0]), {'id'})
+
+    async def test_csr_graph_falls_back_to_drf_view(self):
+        """Test the CSR edge list is still served by the DRF view"""
+        res = await self.async_client.get(
+            f'{self.prefix}/edges/', {'graph': 'csr'}, **self.headers
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['nodes'], [self.n1.id, self.n2.id])
+        res = await self.async_client.get(
+            f'{self.prefix}/edges/',
+            Accept='application/vnd.flexflow.csr',
+            **self.headers,
+        )
+        self.assertEqual(res['Content-Type'], 'application/vnd.flexflow.csr')
+
+    async def test_stream_read_before_leaving_thread(self):
+        """Test ?stream=true is answered whole, not streamed on the loop"""
+        histories = await sync_to_async(list)(
+            History.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        for url, ids in (
+            (f'{self.prefix}/messages/', [self.message.id]),
+            ('/api/history/', histories),
+        ):
+            with self.subTest(url=url):
+                res = await self.async_client.get(
+                    url, {'stream': 'true'}, **self.headers
+                )
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertFalse(res.streaming)
+                self.assertEqual([row['id'] for row in res.json()], ids)
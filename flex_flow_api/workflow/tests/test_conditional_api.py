@@ -0,0 +1,76 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Edge
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+)
+
+
+class GraphETagApiTests(TestCase):
+    """Test conditional GET on node and edge lists"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(self.user)
+        self.n1 = create_node(self.workflow)
+        self.n2 = create_node(self.workflow)
+        self.node_url = reverse(
+            'node-list', kwargs={'workflow_pk': self.workflow.id}
+        )
+        self.edge_url = reverse(
+            'edge-list', kwargs={'workflow_pk': self.workflow.id}
+        )
+
+    def test_unchanged_graph_returns_304_without_loading(self):
+        """Test a matching If-None-Match skips the node query"""
+        res = self.client.get(self.node_url)
+        etag = res['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(self.node_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('core_node', queries[0]['sql'])
+
+    def test_node_change_bumps_version(self):
+        """Test changing a node invalidates the ETag"""
+        etag = self.client.get(self.node_url)['ETag']
+        self.n1.title = 'changed'
+        self.n1.save()
+        res = self.client.get(self.node_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_edge_change_bumps_version(self):
+        """Test adding and deleting edges invalidates the ETag"""
+        etag = self.client.get(self.edge_url)['ETag']
+        edge = Edge.objects.create(
+            workflow=self.workflow, n_from=self.n1, n_to=self.n2
+        )
+        res = self.client.get(self.edge_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        etag = res['ETag']
+        edge.delete()
+        res = self.client.get(self.edge_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_etag_depends_on_query(self):
+        """Test different representations get different ETags"""
+        etag = self.client.get(self.node_url)['ETag']
+        res = self.client.get(
+            self.node_url,
+            {'fields': 'id'},
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
@@ -99,8 +99,8 @@ class PrivateWorkflowApiTests(TestCase):
         url = get_edge_url(self.workflow.id)
         res = self.client.get(url)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
-        self.assertEqual(res.data[0]['id'], edge.id)
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertEqual(res.data['results'][0]['id'], edge.id)
 
     def test_retrieve_only_workflow_edge(self):
         """Test retrieving only edge of on specified workflow"""
@@ -116,7 +116,7 @@ class PrivateWorkflowApiTests(TestCase):
         res = self.client.get(url)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         serializer = EdgeDetailSerializer(edge)
-        self.assertNotIn(serializer.data, res.data)
+        self.assertNotIn(serializer.data, res.data['results'])
 
     def test_create_edge(self):
         """Test creating edge"""
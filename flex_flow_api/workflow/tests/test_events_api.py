@@ -0,0 +1,228 @@
+import asyncio
+import json
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Edge
+from user.authentication import get_token_cache
+from workflow.event_stream import (
+    EventStreamASGIMiddleware,
+    HEARTBEAT,
+    OPEN,
+)
+from workflow.events import get_broker
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+    create_message,
+)
+
+
+def _parse(chunk):
+    fields = dict(
+        line.split(': ', 1) for line in chunk.decode().strip().split('\n')
+    )
+    return fields['event'], json.loads(fields['data'])
+
+
+class EventStreamTests(TestCase):
+    """Test message holder events and their SSE endpoints"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(self.user)
+        self.n1 = create_node(self.workflow)
+        self.n2 = create_node(self.workflow)
+        Edge.objects.create(
+            workflow=self.workflow, n_from=self.n1, n_to=self.n2
+        )
+        self.url = reverse(
+            'workflow-events', kwargs={'workflow_pk': self.workflow.id}
+        )
+
+    def _open(self, url):
+        res = self.client.get(url)
+        self.addCleanup(res.close)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'text/event-stream')
+        chunks = iter(res.streaming_content)
+        self.assertEqual(next(chunks), OPEN)
+        return chunks
+
+    def test_holder_created_after_commit(self):
+        """Test creating a holder is published once committed"""
+        subscription = get_broker().subscribe(self.workflow.id)
+        self.addCleanup(subscription.close)
+        with self.captureOnCommitCallbacks() as callbacks:
+            message = create_message(self.user, self.n1)
+        self.assertIsNone(subscription.get(timeout=0))
+        for callback in callbacks:
+            callback()
+        event = subscription.get(timeout=0)
+        self.assertEqual(event['event'], 'holder.created')
+        self.assertEqual(event['message'], message.id)
+        self.assertEqual(event['node'], self.n1.id)
+
+    def test_stream_workflow_events(self):
+        """Test the workflow stream sends approvals and new holders"""
+        message = create_message(self.user, self.n1)
+        chunks = self._open(self.url)
+        status_url = reverse('status-list', kwargs={
+            'workflow_pk': self.workflow.id,
+            'message_pk': message.id,
+        })
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                status_url, {'status': 'approved', 'node': self.n1.id}
+            )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        events = [_parse(next(chunks)) for _ in range(2)]
+        self.assertEqual(
+            sorted((name, data['node']) for name, data in events),
+            [('holder.approved', self.n1.id), ('holder.created', self.n2.id)],
+        )
+
+    def test_node_stream_filters_other_nodes(self):
+        """Test a node stream only sends events of that node"""
+        chunks = self._open(reverse('node-events', kwargs={
+            'workflow_pk': self.workflow.id,
+            'node_pk': self.n2.id,
+        }))
+        with self.captureOnCommitCallbacks(execute=True):
+            create_message(self.user, self.n1)
+            create_message(self.user, self.n2)
+        name, data = _parse(next(chunks))
+        self.assertEqual(data['node'], self.n2.id)
+
+    @override_settings(EVENT_STREAM_HEARTBEAT=0.01)
+    def test_idle_stream_sends_heartbeat(self):
+        """Test an idle stream sends comments to keep the connection"""
+        chunks = self._open(self.url)
+        self.assertEqual(next(chunks), HEARTBEAT)
+
+    def test_stream_requires_authentication(self):
+        """Test anonymous clients cannot open a stream"""
+        res = APIClient().get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unknown_node_returns_404(self):
+        """Test streams of nodes outside the workflow are rejected"""
+        other = create_node(create_workflow(self.user))
+        res = self.client.get(reverse('node-events', kwargs={
+            'workflow_pk': self.workflow.id,
+            'node_pk': other.id,
+        }))
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class EventStreamASGITests(TestCase):
+    """Test the event stream served on the ASGI event loop"""
+
+    def setUp(self):
+        get_token_cache().clear()
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.workflow = create_workflow(self.user)
+        self.node = create_node(self.workflow)
+
+    def _scope(self, path, token=None, method='GET'):
+        headers = []
+        if token:
+            headers.append((b'authorization', f'Token {token}'.encode()))
+        return {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': headers,
+        }
+
+    async def _call(self, scope, until):
+        """Run the middleware until ``until(sent)`` then disconnect"""
+        sent = []
+        disconnect = asyncio.Event()
+
+        async def receive():
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            sent.append(message)
+            if until(sent):
+                disconnect.set()
+
+        async def fallback(scope, receive, send):
+            raise AssertionError('passed to the Django application')
+
+        await asyncio.wait_for(
+            EventStreamASGIMiddleware(fallback)(scope, receive, send), 5
+        )
+        return sent
+
+    async def test_streams_events(self):
+        """Test events are sent to ASGI clients"""
+        event = {
+            'event': 'holder.created',
+            'workflow': self.workflow.id,
+            'node': self.node.id,
+        }
+
+        def until(sent):
+            if len(sent) == 2:
+                get_broker().dispatch(event)
+            return len(sent) == 3
+
+        sent = await self._call(
+            self._scope(f'/api/workflow/{self.workflow.id}/events/',
+                        self.token.key),
+            until,
+        )
+        self.assertEqual(sent[0]['status'], status.HTTP_200_OK)
+        self.assertEqual(sent[1]['body'], OPEN)
+        self.assertEqual(_parse(sent[2]['body']), ('holder.created', event))
+
+    async def test_rejects_anonymous_clients(self):
+        """Test ASGI streams require authentication"""
+        sent = await self._call(
+            self._scope(f'/api/workflow/{self.workflow.id}/events/'),
+            lambda sent: False,
+        )
+        self.assertEqual(sent[0]['status'], status.HTTP_401_UNAUTHORIZED)
+
+    async def test_head_answered_without_stream(self):
+        """Test HEAD gets the stream headers and an empty body"""
+        sent = await self._call(
+            self._scope(f'/api/workflow/{self.workflow.id}/events/',
+                        self.token.key, method='HEAD'),
+            lambda sent: False,
+        )
+        self.assertEqual(sent[0]['status'], status.HTTP_200_OK)
+        self.assertIn((b'content-type', b'text/event-stream'),
+                      sent[0]['headers'])
+        self.assertEqual(sent[1]['body'], b'')
+        self.assertEqual(len(sent), 2)
+
+    async def test_other_methods_not_allowed(self):
+        """Test other methods get 405 instead of the sync view"""
+        sent = await self._call(
+            self._scope(f'/api/workflow/{self.workflow.id}/events/',
+                        self.token.key, method='POST'),
+            lambda sent: False,
+        )
+        self.assertEqual(
+            sent[0]['status'], status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+        self.assertIn((b'allow', b'GET, HEAD'), sent[0]['headers'])
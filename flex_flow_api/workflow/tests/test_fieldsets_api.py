@@ -0,0 +1,106 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Edge, History, Message
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+)
+
+
+class SparseFieldsApiTests(TestCase):
+    """Test ?fields= and ?expand= on the list endpoints"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(self.user)
+        self.n1 = create_node(self.workflow, title='Node 1')
+        self.n2 = create_node(self.workflow, title='Node 2')
+        self.n3 = create_node(self.workflow, title='Node 3')
+        Edge.objects.create(
+            workflow=self.workflow, n_from=self.n1, n_to=self.n2
+        )
+        Edge.objects.create(
+            workflow=self.workflow, n_from=self.n2, n_to=self.n3
+        )
+
+    def test_node_fields_limit_output_and_columns(self):
+        """Test unrequested node fields are neither fetched nor returned"""
+        url = reverse('node-list', kwargs={'workflow_pk': self.workflow.id})
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, {'fields': 'id,title'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data['results'][0],
+            {'id': self.n1.id, 'title': 'Node 1'}
+        )
+        self.assertNotIn('description', queries[-1]['sql'])
+
+    def test_edge_expand_uses_join(self):
+        """Test expanded edge endpoints are fetched in the same query"""
+        url = reverse('edge-list', kwargs={'workflow_pk': self.workflow.id})
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url, {'expand': 'n_to,n_from'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        # graph version lookup, then edges joined with their nodes
+        self.assertEqual(len(queries), 2)
+        edge = res.data['results'][0]
+        self.assertEqual(edge['n_from']['title'], 'Node 1')
+        self.assertEqual(edge['n_to']['title'], 'Node 2')
+
+    def test_workflow_expand_nodes(self):
+        """Test workflow nodes can be embedded with one prefetch"""
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                reverse('workflow-list'),
+                {'fields': 'id,nodes', 'expand': 'nodes'}
+            )
+        self.assertEqual(len(queries), 2)
+        workflow = res.data['results'][0]
+        self.assertEqual(set(workflow), {'id', 'nodes'})
+        self.assertEqual(
+            [node['title'] for node in workflow['nodes']],
+            ['Node 1', 'Node 2', 'Node 3']
+        )
+
+    def test_history_fields_skip_json(self):
+        """Test history rows can be listed without their JSON blob"""
+        History.objects.create(
+            histories=[{'status': 'approved'}],
+            content_object=Message.objects.create(
+                issuer=self.user, message='m'
+            ),
+        )
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(
+                reverse('history:history-list'),
+                {'fields': 'id,object_id'}
+            )
+        self.assertEqual(set(res.data['results'][0]), {'id', 'object_id'})
+        self.assertNotIn('histories', queries[-1]['sql'])
+
+    def test_unknown_field_rejected(self):
+        """Test asking for a field that does not exist fails"""
+        url = reverse('node-list', kwargs={'workflow_pk': self.workflow.id})
+        res = self.client.get(url, {'fields': 'id,secret'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_fields_ignored_on_write(self):
+        """Test ?fields= does not drop writable fields on create"""
+        url = reverse('node-list', kwargs={'workflow_pk': self.workflow.id})
+        res = self.client.post(
+            url + '?fields=id',
+            {'title': 'New', 'description': 'd'}
+        )
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['title'], 'New')
@@ -0,0 +1,118 @@
+"""
+Test the CSR form of the workflow graph
+"""
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Edge
+from workflow.graph import MEDIA_TYPE, CSRGraph, build_csr, pack, unpack
+from workflow.tests.utills import create_workflow, create_user, create_node
+
+
+class PackTests(SimpleTestCase):
+    """Test the packed binary form"""
+
+    def test_round_trip(self):
+        """Test a packed graph unpacks to the same arrays"""
+        graph = CSRGraph(
+            nodes=[3, 7, 2 ** 40],
+            offsets=[0, 2, 2, 3],
+            targets=[1, 2, 0],
+            edges=[11, 12, 13],
+        )
+        data = pack(graph)
+        self.assertTrue(data.startswith(b'FFG1'))
+        self.assertEqual(len(data), 12 + 3 * 8 + 4 * 4 + 3 * 4 + 3 * 8)
+        self.assertEqual(unpack(data), graph)
+
+    def test_not_packed(self):
+        """Test other payloads are rejected"""
+        with self.assertRaises(ValueError):
+            unpack(b'{"nodes": [], "edges": []}')
+
+
+class CSRGraphTests(TestCase):
+    """Test the edge list and workflow detail in CSR form"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(user=self.user)
+        self.n1 = create_node(workflow=self.workflow)
+        self.n2 = create_node(workflow=self.workflow)
+        self.n3 = create_node(workflow=self.workflow)
+        self.e1 = Edge.objects.create(
+            workflow=self.workflow, n_from=self.n1, n_to=self.n3
+        )
+        self.e2 = Edge.objects.create(
+            workflow=self.workflow, n_from=self.n1, n_to=self.n2
+        )
+        self.e3 = Edge.objects.create(
+            workflow=self.workflow, n_from=self.n3, n_to=self.n2
+        )
+        self.expected = {
+            'nodes': [self.n1.id, self.n2.id, self.n3.id],
+            'offsets': [0, 2, 2, 3],
+            'targets': [2, 1, 1],
+            'edges': [self.e1.id, self.e2.id, self.e3.id],
+        }
+        self.edges_url = reverse(
+            'edge-list', kwargs={'workflow_pk': self.workflow.id}
+        )
+        self.detail_url = reverse(
+            'workflow-detail', kwargs={'pk': self.workflow.id}
+        )
+
+    def test_build_csr(self):
+        """Test the arrays of a workflow graph"""
+        with self.assertNumQueries(2):
+            self.assertEqual(build_csr(self.workflow.id), self.expected)
+
+    def test_edge_list_json(self):
+        """Test ?graph=csr returns the arrays as JSON"""
+        res = self.client.get(self.edges_url, {'graph': 'csr'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), self.expected)
+        self.assertIn('ETag', res)
+
+    def test_edge_list_packed(self):
+        """Test the packed form is negotiated with the Accept header"""
+        res = self.client.get(self.edges_url, HTTP_ACCEPT=MEDIA_TYPE)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], MEDIA_TYPE)
+        self.assertEqual(unpack(res.content), self.expected)
+
+        json_etag = self.client.get(self.edges_url)['ETag']
+        self.assertNotEqual(res['ETag'], json_etag)
+        res = self.client.get(
+            self.edges_url, HTTP_ACCEPT=MEDIA_TYPE,
+            HTTP_IF_NONE_MATCH=json_etag,
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_workflow_detail(self):
+        """Test the detail returns the graph in place of the node ids"""
+        res = self.client.get(self.detail_url, {'graph': 'csr'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['graph'], self.expected)
+        self.assertEqual(res.json()['title'], self.workflow.title)
+        self.assertNotIn('nodes', res.json())
+
+        res = self.client.get(self.detail_url, {'format': 'csr'})
+        self.assertEqual(unpack(res.content), self.expected)
+
+    def test_packed_errors_are_json(self):
+        """Test errors are still rendered as JSON"""
+        res = self.client.get(
+            reverse('workflow-detail', kwargs={'pk': self.workflow.id + 1}),
+            HTTP_ACCEPT=MEDIA_TYPE,
+        )
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(res['Content-Type'], 'application/json')
+        self.assertIn('detail', res.json())
@@ -0,0 +1,144 @@
+"""
+Test join nodes waiting for all their incoming branches
+"""
+import unittest
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Edge, JoinArrival, MessageHolder
+from workflow import joins
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+    create_message,
+)
+
+
+class JoinNodeTests(TestCase):
+    """Test a join node is reached once every branch approved"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(self.user)
+        self.start = create_node(self.workflow, title='Start')
+        self.left = create_node(self.workflow, title='Left')
+        self.right = create_node(self.workflow, title='Right')
+        self.join = create_node(
+            self.workflow, title='Join', is_join_node=True
+        )
+        self.end = create_node(
+            self.workflow, is_finishing_nod=True, title='End'
+        )
+        for n_from, n_to in (
+            (self.start, self.left),
+            (self.start, self.right),
+            (self.left, self.join),
+            (self.right, self.join),
+            (self.join, self.end),
+        ):
+            Edge.objects.create(
+                workflow=self.workflow, n_from=n_from, n_to=n_to
+            )
+        self.message = create_message(user=self.user, current_nod=self.start)
+
+    def _approve(self, node, expected=status.HTTP_201_CREATED):
+        url = reverse(
+            'status-list',
+            kwargs={
+                'workflow_pk': self.workflow.id,
+                'message_pk': self.message.id,
+            },
+        )
+        res = self.client.post(
+            url, {'node': node.id, 'status': 'approved'}, format='json'
+        )
+        self.assertEqual(res.status_code, expected)
+
+    def _pending(self):
+        return list(
+            MessageHolder.objects.filter(
+                message=self.message,
+                status=MessageHolder.StatusChoices.PENDING,
+            ).order_by('current_node_id').values_list(
+                'current_node_id', flat=True
+            )
+        )
+
+    def test_join_waits_for_every_branch(self):
+        """Test the join holds the message once, after the last branch"""
+        self._approve(self.start)
+        self.assertEqual(self._pending(), [self.left.id, self.right.id])
+
+        self._approve(self.left)
+        self.assertEqual(self._pending(), [self.right.id])
+
+        self._approve(self.right)
+        self.assertEqual(self._pending(), [self.join.id])
+        arrival = JoinArrival.objects.get(message=self.message)
+        self.assertEqual((arrival.arrivals, arrival.expected), (2, 2))
+
+        self._approve(self.join)
+        self.assertEqual(self._pending(), [self.end.id])
+
+    def test_branch_approved_twice_arrives_once(self):
+        """Test approving a branch again does not release the join"""
+        self._approve(self.start)
+        self._approve(self.left)
+        self._approve(self.left, expected=status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self._pending(), [self.right.id])
+        arrival = JoinArrival.objects.get(message=self.message)
+        self.assertEqual((arrival.arrivals, arrival.expected), (1, 2))
+
+    @unittest.skipUnless(
+        connection.features.has_select_for_update,
+        'needs row locks',
+    )
+    def test_pending_holder_locked(self):
+        """Test the approved holder is locked before arriving at the join"""
+        self._approve(self.start)
+        with CaptureQueriesContext(connection) as queries:
+            self._approve(self.left)
+        self.assertTrue(any(
+            'FOR UPDATE' in query['sql'] and
+            'core_messageholder' in query['sql']
+            for query in queries
+        ))
+
+    def test_plain_node_reached_per_branch(self):
+        """Test a node that is not a join is reached by each branch"""
+        self.join.is_join_node = False
+        self.join.save()
+        self._approve(self.start)
+        self._approve(self.left)
+        self._approve(self.right)
+        self.assertEqual(self._pending(), [self.join.id, self.join.id])
+        self.assertFalse(JoinArrival.objects.exists())
+
+    def test_arrival_cost(self):
+        """Test later arrivals only update and read the counter"""
+        self.assertFalse(joins.arrive(self.message.id, self.join))
+        with self.assertNumQueries(2):
+            self.assertTrue(joins.arrive(self.message.id, self.join))
+        self.assertFalse(joins.arrive(self.message.id, self.join))
+
+    def test_create_join_node(self):
+        """Test join nodes are created through the API"""
+        url = reverse('node-list', kwargs={'workflow_pk': self.workflow.id})
+        res = self.client.post(url, {
+            'title': 'Merge',
+            'description': 'all reviews done',
+            'is_join_node': True,
+        }, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(res.data['is_join_node'])
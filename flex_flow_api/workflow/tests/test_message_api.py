@@ -1,3 +1,5 @@
+import json
+
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
@@ -103,7 +105,7 @@ class PrivateMessageApiTests(TestCase):
         create_message(user=self.user, current_nod=self.edges[0].n_from)
         res = self.client.get(_get_url(self.workflow.id))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
 
     def test_retrieve_messages_limited_to_workflow(self):
         """Test retrieving all messages limited to workflow"""
@@ -121,9 +123,9 @@ class PrivateMessageApiTests(TestCase):
         other_message = create_message(user=other_user, current_nod=n1)
         res = self.client.get(_get_url(self.workflow.id))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data['results']), 2)
         serializer = MessageSerializer(other_message)
-        self.assertNotIn(serializer.data, res.data)
+        self.assertNotIn(serializer.data, res.data['results'])
 
     def test_retrieve_active_messages(self):
         """Test retrieving only active messages"""
@@ -137,9 +139,23 @@ class PrivateMessageApiTests(TestCase):
         create_message(user=self.user, current_nod=self.edges[1].n_from)
         res = self.client.get(_get_url(self.workflow.id))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 3)
+        self.assertEqual(len(res.data['results']), 3)
         serializer = MessageSerializer(deactive_message)
-        self.assertNotIn(serializer.data, res.data)
+        self.assertNotIn(serializer.data, res.data['results'])
+
+    def test_stream_messages(self):
+        """Test streaming pending messages of a workflow"""
+        messages = [
+            create_message(user=self.user, current_nod=self.edges[0].n_from)
+            for _ in range(3)
+        ]
+        res = self.client.get(_get_url(self.workflow.id), {'stream': '1'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        data = json.loads(b''.join(res.streaming_content))
+        self.assertEqual(
+            data,
+            MessageSerializer(messages, many=True).data
+        )
 
     def test_retrieve_specific_message(self):
         """Test retrieving specific message"""
@@ -67,7 +67,7 @@ class PrivateNodeApiTests(TestCase):
         create_node(workflow=self.workflow)
         res = self.client.get(get_node_url(self.workflow.id))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 1)
+        self.assertEqual(len(res.data['results']), 1)
 
     def test_retrieve_only_workflow_node(self):
         """Test retrieving only node of specific workflow"""
@@ -84,9 +84,9 @@ class PrivateNodeApiTests(TestCase):
 
         res = self.client.get(get_node_url(self.workflow.id))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
+        self.assertEqual(len(res.data['results']), 2)
         serializer = NodeSerializer(test_case, many=True)
-        self.assertEqual(serializer.data, res.data)
+        self.assertEqual(serializer.data, res.data['results'])
 
     def test_create_node(self):
         """Test creating node"""
@@ -0,0 +1,106 @@
+import threading
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from workflow.response_cache import get_graph_cache, get_or_build
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+)
+
+
+class GraphResponseCacheApiTests(TransactionTestCase):
+    """Test node lists and workflow details are served from the cache"""
+
+    def setUp(self):
+        get_graph_cache().clear()
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(self.user)
+        self.node = create_node(self.workflow, title='Node 1')
+        self.node_url = reverse(
+            'node-list', kwargs={'workflow_pk': self.workflow.id}
+        )
+        self.detail_url = reverse('workflow-detail', args=[self.workflow.id])
+
+    def test_node_list_served_from_cache(self):
+        """Test a second list only looks the graph version up"""
+        first = self.client.get(self.node_url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.node_url)
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(len(queries), 1)
+
+    def test_graph_change_serves_new_version(self):
+        """Test a node change is visible on the next request"""
+        self.client.get(self.node_url)
+        create_node(self.workflow, title='Node 2')
+        res = self.client.get(self.node_url)
+        self.assertEqual(
+            [node['title'] for node in res.json()['results']],
+            ['Node 1', 'Node 2']
+        )
+
+    def test_requested_fields_cached_separately(self):
+        """Test each representation has its own entry"""
+        self.client.get(self.node_url)
+        res = self.client.get(self.node_url, {'fields': 'id'})
+        self.assertEqual(
+            res.json()['results'],
+            [{'id': self.node.id}]
+        )
+
+    def test_workflow_detail_invalidated_on_update(self):
+        """Test updating a workflow bumps its cached detail"""
+        self.client.get(self.detail_url)
+        self.client.patch(self.detail_url, {'title': 'Renamed'})
+        res = self.client.get(self.detail_url)
+        self.assertEqual(res.json()['title'], 'Renamed')
+        self.assertEqual(res.json()['nodes'], [self.node.id])
+
+
+class GetOrBuildTests(SimpleTestCase):
+    """Test stampede protection of the cache"""
+
+    def setUp(self):
+        self.cache = LocMemCache(self.id(), {})
+        self.cache.clear()
+
+    def test_build_once_and_cache(self):
+        """Test the value is built on the first miss only"""
+        calls = []
+
+        def build():
+            calls.append(1)
+            return b'value', True
+        self.assertEqual(get_or_build(self.cache, 'k', build), b'value')
+        self.assertEqual(get_or_build(self.cache, 'k', build), b'value')
+        self.assertEqual(len(calls), 1)
+        self.assertIsNone(self.cache.get('k:lock'))
+
+    def test_waits_for_rebuild_in_progress(self):
+        """Test a caller waits for the holder of the lock"""
+        self.cache.add('k:lock', 1)
+        threading.Timer(0.05, self.cache.set, ('k', b'built')).start()
+
+        def build():
+            raise AssertionError('should not rebuild')
+        value = get_or_build(self.cache, 'k', build, wait=2)
+        self.assertEqual(value, b'built')
+
+    def test_uncacheable_value_not_stored(self):
+        """Test values flagged as not cacheable are returned only"""
+        get_or_build(self.cache, 'k', lambda: (b'big', False))
+        self.assertIsNone(self.cache.get('k'))
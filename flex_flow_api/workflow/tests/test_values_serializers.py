@@ -0,0 +1,133 @@
+"""
+Test the values() fast path of the node, edge and message lists
+"""
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.test import APIClient
+
+from core.models import Edge, Node
+from workflow.serializer import (
+    EdgeDetailSerializer,
+    EdgeValuesSerializer,
+    MessageSerializer,
+    NodeSerializer,
+    NodeValuesSerializer,
+    history_entry,
+)
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+    create_message,
+)
+
+
+class ValuesSerializerTests(TestCase):
+    """Test values() rows render like the model serializers"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.workflow = create_workflow(self.user)
+        self.n1 = create_node(self.workflow, title='Node 1')
+        self.n2 = create_node(
+            self.workflow, is_finishing_nod=True, title='Node 2'
+        )
+        Edge.objects.create(
+            workflow=self.workflow, n_from=self.n1, n_to=self.n2
+        )
+
+    def test_node_rows(self):
+        """Test node rows match NodeSerializer"""
+        serializer = NodeValuesSerializer()
+        rows = serializer.values(Node.objects.order_by('id'))
+        self.assertEqual(
+            NodeValuesSerializer(rows, many=True).data,
+            NodeSerializer(Node.objects.order_by('id'), many=True).data,
+        )
+
+    def test_edge_rows_renamed(self):
+        """Test edge node ids are read from their columns"""
+        rows = EdgeValuesSerializer().values(Edge.objects.all())
+        self.assertEqual(
+            EdgeValuesSerializer(rows, many=True).data,
+            EdgeDetailSerializer(Edge.objects.all(), many=True).data,
+        )
+
+    def test_fields(self):
+        """Test a subset of fields is read and rendered in order"""
+        serializer = NodeValuesSerializer(fields={'title', 'id'})
+        self.assertEqual(serializer.lookups, ['id', 'title'])
+        serializer = NodeValuesSerializer(fields={'title'})
+        rows = serializer.values(Node.objects.filter(pk=self.n1.pk))
+        self.assertEqual(
+            NodeValuesSerializer(rows, many=True, fields={'title'}).data,
+            [{'title': 'Node 1'}],
+        )
+        with self.assertRaises(ParseError):
+            NodeValuesSerializer(fields={'workflow'})
+
+    def test_history_entry(self):
+        """Test the history entry of a status change"""
+        entry = history_entry(self.user, 'approved', self.n1)
+        self.assertEqual(
+            set(entry), {'user', 'timestamp', 'status', 'node', 'node_id'}
+        )
+        self.assertEqual(entry['user'], self.user.pk)
+        self.assertEqual(entry['status'], 'approved')
+        self.assertEqual(
+            entry['node'], str(dict(NodeSerializer(self.n1).data))
+        )
+        self.assertEqual(entry['node_id'], self.n1.pk)
+        self.assertTrue(entry['timestamp'].endswith('Z'))
+        self.assertIsNotNone(parse_datetime(entry['timestamp']))
+
+
+class ValuesListApiTests(TestCase):
+    """Test the list endpoints served by the fast path"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(self.user)
+        self.n1 = create_node(self.workflow, title='Node 1')
+        self.n2 = create_node(self.workflow, title='Node 2')
+        self.edge = Edge.objects.create(
+            workflow=self.workflow, n_from=self.n1, n_to=self.n2
+        )
+        self.message = create_message(user=self.user, current_nod=self.n1)
+
+    def test_lists_match_serializers(self):
+        """Test every list renders what its model serializer does"""
+        kwargs = {'workflow_pk': self.workflow.id}
+        for name, expected in (
+            ('node-list', NodeSerializer([self.n1, self.n2], many=True)),
+            ('edge-list', EdgeDetailSerializer([self.edge], many=True)),
+            ('message-list', MessageSerializer([self.message], many=True)),
+        ):
+            res = self.client.get(reverse(name, kwargs=kwargs))
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(res.json()['results'], expected.data, name)
+
+    def test_pagination(self):
+        """Test the values rows are cursor paginated"""
+        url = reverse('node-list', kwargs={'workflow_pk': self.workflow.id})
+        res = self.client.get(url, {'page_size': 1, 'fields': 'title'})
+        self.assertEqual(res.data['results'], [{'title': 'Node 1'}])
+        res = self.client.get(res.data['next'])
+        self.assertEqual(res.data['results'], [{'title': 'Node 2'}])
+
+    def test_unknown_field(self):
+        """Test unknown fields are rejected"""
+        url = reverse('edge-list', kwargs={'workflow_pk': self.workflow.id})
+        res = self.client.get(url, {'fields': 'id,workflow'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
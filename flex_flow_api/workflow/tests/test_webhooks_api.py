@@ -0,0 +1,250 @@
+import http.client
+import io
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Edge, OutboxEvent, WebhookSubscription
+from workflow import outbox
+from workflow.tests.utills import (
+    create_workflow,
+    create_user,
+    create_node,
+    create_message,
+)
+
+
+class StandInReceiver:
+    """Local HTTP server recording webhook batches"""
+
+    def __init__(self, fail=0):
+        self.fail = fail
+        self.redirect = None
+        self.batches = []
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers['Content-Length']))
+                if receiver.redirect:
+                    self.send_response(302)
+                    self.send_header('Location', receiver.redirect)
+                elif receiver.fail:
+                    receiver.fail -= 1
+                    self.send_response(503)
+                else:
+                    receiver.batches.append((self.headers, json.loads(body),
+                                             body))
+                    self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/hook'
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(WEBHOOK_ALLOW_PRIVATE_HOSTS=True)
+class WebhookTests(TestCase):
+    """Test the workflow event outbox and its webhook dispatcher"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(self.user)
+        self.n1 = create_node(self.workflow)
+        self.n2 = create_node(self.workflow, is_finishing_nod=True)
+        Edge.objects.create(
+            workflow=self.workflow, n_from=self.n1, n_to=self.n2
+        )
+        self.receiver = StandInReceiver()
+        self.addCleanup(self.receiver.close)
+        self.subscription = WebhookSubscription.objects.create(
+            workflow=self.workflow,
+            url=self.receiver.url,
+            secret='s3cret',
+        )
+
+    def _finish(self, message):
+        url = reverse('status-list', kwargs={
+            'workflow_pk': self.workflow.id,
+            'message_pk': message.id,
+        })
+        res = self.client.post(url, {'status': 'approved',
+                                     'node': self.n2.id})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_finishing_node_records_event(self):
+        """Test reaching a finishing node writes an outbox event"""
+        message = create_message(self.user, self.n2)
+        self._finish(message)
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.event, outbox.MESSAGE_FINISHED)
+        self.assertEqual(event.payload['message'], message.id)
+        self.assertEqual(event.payload['status'], 'approved')
+        self.assertEqual(self.receiver.batches, [])
+
+    def test_dispatch_batches_events_per_subscriber(self):
+        """Test due events of a subscriber are posted in one signed batch"""
+        messages = [create_message(self.user, self.n2) for _ in range(3)]
+        for message in messages:
+            self._finish(message)
+        call_command('dispatch_webhooks', '--once', stdout=io.StringIO())
+        self.assertEqual(len(self.receiver.batches), 1)
+        headers, data, body = self.receiver.batches[0]
+        self.assertEqual(
+            [event['payload']['message'] for event in data['events']],
+            [message.id for message in messages],
+        )
+        self.assertEqual(
+            headers[outbox.SIGNATURE_HEADER],
+            outbox.sign(body, 's3cret'),
+        )
+        self.assertFalse(OutboxEvent.objects.exclude(
+            status=OutboxEvent.StatusChoices.DELIVERED
+        ).exists())
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        """Test a failing subscriber gets the batch again later"""
+        self.receiver.fail = 1
+        self._finish(create_message(self.user, self.n2))
+        self.assertEqual(outbox.dispatch_due_events(), (0, 1))
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+        self.assertEqual(outbox.dispatch_due_events(), (0, 0))
+        OutboxEvent.objects.update(
+            next_attempt_at=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(outbox.dispatch_due_events(), (1, 0))
+        self.assertEqual(len(self.receiver.batches), 1)
+
+    @override_settings(WEBHOOK_MAX_ATTEMPTS=1)
+    def test_gives_up_after_max_attempts(self):
+        """Test events are marked failed once attempts run out"""
+        self.receiver.fail = 1
+        self._finish(create_message(self.user, self.n2))
+        outbox.dispatch_due_events()
+        self.assertEqual(
+            OutboxEvent.objects.get().status,
+            OutboxEvent.StatusChoices.FAILED,
+        )
+
+    def test_backoff_is_capped(self):
+        """Test the retry delay doubles up to the maximum"""
+        with self.settings(WEBHOOK_RETRY_BASE_DELAY=10,
+                           WEBHOOK_RETRY_MAX_DELAY=60):
+            self.assertEqual(
+                [outbox.backoff(n).total_seconds() for n in range(1, 6)],
+                [10, 20, 40, 60, 60],
+            )
+
+    def test_manage_webhooks(self):
+        """Test owners create webhooks and secrets are not returned"""
+        url = reverse('webhook-list',
+                      kwargs={'workflow_pk': self.workflow.id})
+        res = self.client.post(url, {'url': 'http://example.com/hook',
+                                     'secret': 'abc'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('secret', res.data)
+        other = APIClient()
+        other.force_authenticate(create_user(
+            email='other@example.com',
+            password='random_password',
+        ))
+        res = other.get(url)
+        self.assertEqual(res.data['results'], [])
+        res = other.post(url, {'url': 'http://example.com/hook'})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_redirect_not_followed(self):
+        """Test a redirecting subscriber counts as a failed delivery"""
+        self.receiver.redirect = self.receiver.url + '?again'
+        self._finish(create_message(self.user, self.n2))
+        self.assertEqual(outbox.dispatch_due_events(), (0, 1))
+        self.assertIn('302', OutboxEvent.objects.get().last_error)
+
+    def test_misbehaving_subscriber_does_not_stop_dispatch(self):
+        """Test any delivery error fails only that subscriber's batch"""
+        WebhookSubscription.objects.create(
+            workflow=self.workflow,
+            url='http://example.com/hook',
+        )
+        self._finish(create_message(self.user, self.n2))
+
+        def send(subscription, batch):
+            if subscription.pk == self.subscription.pk:
+                raise http.client.BadStatusLine('')
+
+        self.assertEqual(outbox.dispatch_due_events(send=send), (1, 1))
+        event = OutboxEvent.objects.get(subscription=self.subscription)
+        self.assertTrue(event.last_error.startswith('BadStatusLine'))
+        self.assertEqual(event.status, OutboxEvent.StatusChoices.PENDING)
+
+
+class WebhookURLTests(TestCase):
+    """Test webhooks cannot reach internal hosts"""
+
+    def setUp(self):
+        self.user = create_user(
+            email='user@example.com',
+            password='random_password'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.workflow = create_workflow(self.user)
+
+    def test_internal_urls_rejected(self):
+        """Test only http(s) URLs of outside hosts can be registered"""
+        url = reverse('webhook-list',
+                      kwargs={'workflow_pk': self.workflow.id})
+        for hook in (
+            'ftp://example.com/hook',
+            'http://localhost:8000/hook',
+            'http://127.0.0.1/hook',
+            'http://169.254.169.254/latest/meta-data/',
+            'http://10.0.0.5/hook',
+            'http://[::1]/hook',
+        ):
+            res = self.client.post(url, {'url': hook})
+            self.assertEqual(
+                res.status_code, status.HTTP_400_BAD_REQUEST, hook
+            )
+        self.assertFalse(WebhookSubscription.objects.exists())
+
+    def test_internal_host_not_posted_to(self):
+        """Test delivery refuses hosts resolving to internal addresses"""
+        receiver = StandInReceiver()
+        self.addCleanup(receiver.close)
+        subscription = WebhookSubscription.objects.create(
+            workflow=self.workflow,
+            url=receiver.url.replace('127.0.0.1', 'localhost'),
+        )
+        OutboxEvent.objects.create(
+            subscription=subscription,
+            event=outbox.MESSAGE_FINISHED,
+            payload={},
+        )
+        self.assertEqual(outbox.dispatch_due_events(), (0, 1))
+        self.assertEqual(receiver.batches, [])
+        with self.assertRaises(outbox.UnsafeURLError):
+            outbox.resolve('localhost', 80)
@@ -1,10 +1,12 @@
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase, SimpleTestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Workflow
+from core.models import Workflow, Node, Edge, Message, MessageHolder
 from workflow.serializer import WorkflowSerializer
 
 WORKFLOW_URL = reverse('workflow-list')
@@ -68,7 +70,7 @@ class PrivateWorkflowApiTests(TestCase):
         workflow = Workflow.objects.all().order_by('-id')
         self.assertEqual(len(workflow), 1)
         serializer = WorkflowSerializer(workflow, many=True)
-        self.assertEqual(res.data, serializer.data)
+        self.assertEqual(res.data['results'], serializer.data)
 
     def test_get_workflows_detail(self):
         """Test retrieving a specific workflow"""
@@ -158,9 +160,9 @@ class PrivateWorkflowApiTests(TestCase):
         serializer2 = WorkflowSerializer(workflow2)
         res = self.client.get(WORKFLOW_URL)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(res.data), 2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertIn(serializer2.data, res.data)
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertIn(serializer1.data, res.data['results'])
+        self.assertIn(serializer2.data, res.data['results'])
 
     def test_updating_workflow_of_other_user(self):
         """Test updating workflow of other user give error message"""
@@ -175,3 +177,56 @@ class PrivateWorkflowApiTests(TestCase):
             format='json',
         )
         self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_list_is_cursor_paginated(self):
+        """Test the list is split in pages linked by cursors"""
+        workflows = [create_workflow(user=self.user) for _ in range(3)]
+        res = self.client.get(WORKFLOW_URL, {'page_size': 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [workflows[0].id, workflows[1].id]
+        )
+        self.assertIsNone(res.data['previous'])
+        res = self.client.get(res.data['next'])
+        self.assertEqual(
+            [item['id'] for item in res.data['results']],
+            [workflows[2].id]
+        )
+        self.assertIsNone(res.data['next'])
+
+    def test_list_node_ids_prefetched(self):
+        """Test listing workflows does not query nodes per workflow"""
+        for _ in range(5):
+            workflow = create_workflow(user=self.user)
+            Node.objects.create(workflow=workflow, title='n', description='')
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(WORKFLOW_URL)
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertEqual(len(queries), 2)
+
+    def test_list_summary_counts(self):
+        """Test summary mode returns counts instead of node ids"""
+        workflow = create_workflow(user=self.user)
+        n1 = Node.objects.create(workflow=workflow, title='1', description='')
+        n2 = Node.objects.create(workflow=workflow, title='2', description='')
+        Edge.objects.create(workflow=workflow, n_from=n1, n_to=n2)
+        message = Message.objects.create(issuer=self.user, message='m')
+        MessageHolder.objects.create(message=message, current_node=n1)
+        MessageHolder.objects.create(
+            message=message,
+            current_node=n2,
+            status=MessageHolder.StatusChoices.APPROVED,
+        )
+        create_workflow(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(WORKFLOW_URL, {'summary': 'true'})
+        self.assertEqual(len(queries), 1)
+        first, second = res.data['results']
+        self.assertNotIn('nodes', first)
+        self.assertEqual(
+            (first['node_count'], first['edge_count'],
+             first['pending_count']),
+            (2, 1, 1)
+        )
+        self.assertEqual(second['node_count'], 0)
@@ -1,12 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
+from workflow.event_stream import EventStreamView
 from workflow.views import (
     WorkflowViewSet,
     NodeViewSet,
     EdgeViewSet,
     MessageViewSet,
     StatusView,
+    WebhookSubscriptionViewSet,
 )
 
 router = DefaultRouter()
@@ -23,7 +25,22 @@ router.register(
     StatusView,
     basename="status"
 )
+router.register(
+    "(?P<workflow_pk>[^/.]+)/webhooks",
+    WebhookSubscriptionViewSet,
+    basename="webhook"
+)
 
 urlpatterns = [
+    path(
+        '<int:workflow_pk>/events/',
+        EventStreamView.as_view(),
+        name='workflow-events',
+    ),
+    path(
+        '<int:workflow_pk>/nodes/<int:node_pk>/events/',
+        EventStreamView.as_view(),
+        name='node-events',
+    ),
     path('', include(router.urls)),
 ]
@@ -8,40 +8,91 @@ from drf_spectacular.utils import (
     OpenApiTypes,
 )
 from django.contrib.contenttypes.models import ContentType
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import (
+    Count,
+    IntegerField,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    prefetch_related_objects,
+)
+from django.db.models.functions import Coalesce
 from rest_framework import (
     viewsets, mixins)
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.settings import api_settings
 
+from core import sharding
+from core.fastpath import ValuesListMixin
+from core.fieldsets import SparseFieldsViewMixin
+from core.streaming import StreamingListMixin
 from core.models import (
+    AuditEntry,
     Workflow,
     Node,
     Edge, Message, MessageHolder,
     History,
+    WebhookSubscription,
+)
+from history.filters import load_histories
+from history.serializers import AuditEntrySerializer
+from history.views import ENTRY_PARAMETERS, history_serializer_class
+from user.authentication import (
+    CachedTokenAuthentication,
+    SignedTokenAuthentication,
 )
-from history.serializers import HistorySerializer
+from workflow.conditional import GraphVersionETagMixin
+from workflow.graph import CSR, GRAPH_PARAM, CSRGraphMixin, CSRRenderer
+from workflow.response_cache import GraphResponseCacheMixin
 from workflow.permisions import IsOwnerOfObject
 from workflow.serializer import (
     WorkflowSerializer,
+    WorkflowSummarySerializer,
     NodeSerializer,
+    NodeValuesSerializer,
     EdgeSerializer,
     EdgeDetailSerializer,
+    EdgeValuesSerializer,
     MessageSerializer,
+    MessageValuesSerializer,
     MessageDetailSerializer,
     StatusSerializer,
+    WebhookSubscriptionSerializer,
+)
+
+
+GRAPH_PARAMETER = OpenApiParameter(
+    name=GRAPH_PARAM,
+    type=OpenApiTypes.STR,
+    enum=[CSR],
+    description='return the graph as node id, offset and target arrays, '
+                'packed with Accept: application/vnd.flexflow.csr',
+    required=False,
+    location=OpenApiParameter.QUERY,
 )
 
 
+@extend_schema_view(list=extend_schema(parameters=[GRAPH_PARAMETER]))
 class EdgeViewSet(
+    GraphVersionETagMixin,
+    GraphResponseCacheMixin,
+    SparseFieldsViewMixin,
+    CSRGraphMixin,
+    ValuesListMixin,
     viewsets.ModelViewSet
 ):
     queryset = Edge.objects.all()
     serializer_class = EdgeSerializer
-    authentication_classes = (TokenAuthentication,)
+    values_serializer_class = EdgeValuesSerializer
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
-    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CSRRenderer]
 
     def get_serializer_class(self, *args, **kwargs):
         if self.action in ["retrieve", 'list']:
@@ -56,11 +107,19 @@ class EdgeViewSet(
 
 
 class NodeViewSet(
+    GraphVersionETagMixin,
+    GraphResponseCacheMixin,
+    SparseFieldsViewMixin,
+    ValuesListMixin,
     viewsets.ModelViewSet
 ):
     queryset = Node.objects.all()
     serializer_class = NodeSerializer
-    authentication_classes = (TokenAuthentication,)
+    values_serializer_class = NodeValuesSerializer
+    authentication_classes = (
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    )
     permission_classes = (IsAuthenticated,)
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
@@ -71,14 +130,133 @@ class NodeViewSet(
         return Node.objects
 
 
-class WorkflowViewSet(viewsets.ModelViewSet):
+def _count_per_workflow(queryset, workflow_field):
+    """Correlated subquery counting rows of ``queryset`` per workflow"""
+    counts = queryset.filter(
+        **{workflow_field: OuterRef('pk')}
+    ).order_by().values(workflow_field).annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(
+        Subquery(counts, output_field=IntegerField()),
+        0,
+    )
+
+
+@extend_schema_view(
+    list=extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='summary',
+                type=OpenApiTypes.BOOL,
+                description='return node, edge and pending message counts '
+                            'instead of node ids',
+                required=False,
+                location=OpenApiParameter.QUERY,
+            ),
+        ]
+    ),
+    retrieve=extend_schema(parameters=[GRAPH_PARAMETER]),
+)
+class WorkflowViewSet(
+    GraphResponseCacheMixin,
+    SparseFieldsViewMixin,
+    CSRGraphMixin,
+    viewsets.ModelViewSet
+):
     queryset = Workflow.objects.all()
     serializer_class = WorkflowSerializer
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, CSRRenderer]
+    graph_cache_actions = ('retrieve',)
+    csr_actions = ('retrieve',)
+    graph_workflow_kwarg = 'pk'
+    shard_kwarg = 'pk'
     permission_classes = [IsAuthenticated, IsOwnerOfObject]
-    authentication_classes = [TokenAuthentication, ]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+
+    def _wants_summary(self):
+        return self.action == 'list' and \
+            self.request.query_params.get('summary') in ('1', 'true')
+
+    def get_queryset(self):
+        if self._wants_summary():
+            return Workflow.objects.annotate(
+                node_count=_count_per_workflow(
+                    Node.objects.all(), 'workflow'
+                ),
+                edge_count=_count_per_workflow(
+                    Edge.objects.all(), 'workflow'
+                ),
+                pending_count=_count_per_workflow(
+                    MessageHolder.objects.filter(
+                        status=MessageHolder.StatusChoices.PENDING,
+                    ),
+                    'current_node__workflow',
+                ),
+            )
+        prefetch = self._nodes_prefetch()
+        if prefetch is None or (
+            self.action == 'list' and sharding.sharding_enabled()
+        ):
+            # listed workflows live on different shards, see
+            # paginate_queryset
+            return Workflow.objects.all()
+        return Workflow.objects.prefetch_related(prefetch)
+
+    def _nodes_prefetch(self):
+        if self.wants_csr():
+            return None
+        fields = self.get_requested_fields()
+        if fields is not None and 'nodes' not in fields:
+            return None
+        if 'nodes' in self.get_requested_expansions():
+            return 'nodes'
+        return Prefetch('nodes', queryset=Node.objects.only('id', 'workflow'))
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        prefetch = self._nodes_prefetch()
+        if page is None or prefetch is None or \
+                not sharding.sharding_enabled():
+            return page
+        by_shard = {}
+        for workflow in page:
+            by_shard.setdefault(
+                workflow.shard or DEFAULT_DB_ALIAS, []
+            ).append(workflow)
+        for alias, workflows in by_shard.items():
+            with sharding.use_shard(alias):
+                prefetch_related_objects(workflows, prefetch)
+        return page
+
+    def get_serializer_class(self):
+        if self._wants_summary():
+            return WorkflowSummarySerializer
+        return self.serializer_class
+
+    @extend_schema(responses=AuditEntrySerializer(many=True))
+    @action(detail=True, methods=['GET'])
+    def audit(self, request, *args, **kwargs):
+        """Who changed the workflow, its nodes and edges, owner only"""
+        if not Workflow.objects.filter(
+            pk=kwargs['pk'],
+            create_by=request.user,
+        ).exists():
+            raise NotFound()
+        queryset = AuditEntry.objects.filter(workflow_id=kwargs['pk'])
+        # not the workflow pages of paginate_queryset
+        page = self.paginator.paginate_queryset(queryset, request, view=self)
+        serializer = AuditEntrySerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 class MessageViewSet(
+    StreamingListMixin,
+    SparseFieldsViewMixin,
+    ValuesListMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -86,8 +264,12 @@ class MessageViewSet(
 ):
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
+    values_serializer_class = MessageValuesSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication, ]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
 
     def get_queryset(self):
         workflow_id = str(self.kwargs['workflow_pk'])
@@ -106,6 +288,7 @@ class MessageViewSet(
             return MessageDetailSerializer
         return self.serializer_class
 
+    @extend_schema(parameters=ENTRY_PARAMETERS)
     @action(detail=True, methods=['GET'], name='history')
     def history(self, request, *args, **kwargs):
         workflow_id = str(kwargs['workflow_pk'])
@@ -120,7 +303,9 @@ class MessageViewSet(
             object_id=messages_id,
             content_type=ContentType.objects.get_for_model(Message)
         )
-        serializer = HistorySerializer(history, many=True)
+        history = load_histories(history, request.query_params)
+        serializer_class = history_serializer_class(request.query_params)
+        serializer = serializer_class(history, many=True)
         return Response(serializer.data,)
 
 
@@ -150,5 +335,34 @@ class StatusView(
 ):
     serializer_class = StatusSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication, ]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+
+
+class WebhookSubscriptionViewSet(viewsets.ModelViewSet):
+    """Webhooks receiving the events of a workflow, owner only"""
+    queryset = WebhookSubscription.objects.all()
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [
+        CachedTokenAuthentication,
+        SignedTokenAuthentication,
+    ]
+
+    def get_queryset(self):
+        return WebhookSubscription.objects.filter(
+            workflow_id=self.kwargs['workflow_pk'],
+            workflow__create_by=self.request.user,
+        )
+
+    def perform_create(self, serializer):
+        workflow = Workflow.objects.filter(
+            pk=self.kwargs['workflow_pk'],
+            create_by=self.request.user,
+        ).first()
+        if workflow is None:
+            raise NotFound()
+        serializer.save(workflow=workflow)